@@ -0,0 +1,185 @@
+import re
+from typing import List, Optional, Tuple
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+# "Solve: 3x + 4 = 19", "Solve: x - 2 = 9", "Solve: 5x = 25"
+_LINEAR = re.compile(
+    r'^\s*(?:solve:\s*)?(-?\d*)\s*([a-z])\s*(?:([+-])\s*(\d+(?:\.\d+)?))?\s*=\s*(-?\d+(?:\.\d+)?)\s*$'
+)
+
+
+def parse_answer_values(answer: str) -> Optional[List[float]]:
+    """Numbers in an answer such as '5', 'x = 5', 'x=-2,-6' or 'x=6,y=4'; None if non-numeric"""
+    text = str(answer).strip().lower().replace(' ', '')
+    if not text:
+        return None
+
+    values = []
+    for part in text.split(','):
+        if '=' in part:
+            part = part.split('=', 1)[1]
+        try:
+            values.append(float(part))
+        except ValueError:
+            return None
+    return values
+
+
+def parse_number(text: str) -> Optional[float]:
+    """A decimal or a fraction such as '14/3'; None if it is neither"""
+    numerator, _, denominator = str(text).strip().partition('/')
+    try:
+        value = float(numerator)
+        return value / float(denominator) if denominator else value
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def parse_linear_equation(question: str) -> Optional[Tuple[str, float, float, float]]:
+    """Parse 'a·x ± b = c' into (variable, a, b, c) with the sign folded into b"""
+    match = _LINEAR.match(question.strip().lower())
+    if not match:
+        return None
+
+    coefficient, variable, sign, constant, rhs = match.groups()
+    a = float(coefficient) if coefficient not in ('', '-') else (-1.0 if coefficient == '-' else 1.0)
+    b = float(constant) if constant else 0.0
+    if sign == '-':
+        b = -b
+    return variable, a, b, float(rhs)
+
+
+def format_number(value: float) -> str:
+    """Render 5.0 as '5' and keep real fractions"""
+    if abs(value - round(value)) < 1e-9:
+        return str(int(round(value)))
+    return f"{value:.4g}"
+
+
+# Signed terms such as "5x", "- x", "+ 4", "-2y", "+ 2/3"
+_TERM = re.compile(r'([+-]?)\s*((?:\d+(?:\.\d+)?|\.\d+)(?:/\d+(?:\.\d+)?)?)?\s*([a-z]?)')
+
+# "x² + 8x + 12 = 0", "x² - 16 = 0"
+_QUADRATIC = re.compile(
+    r'^\s*(?:solve:\s*)?([a-z])²\s*(?:([+-])\s*(\d*)\s*\1)?\s*(?:([+-])\s*(\d+))?\s*=\s*0\s*$'
+)
+
+# "If x = 5, what is 2x + 1?", "If z=2, evaluate: 5z + 8"
+_EVALUATE = re.compile(r'^\s*if\s+([a-z])\s*=\s*(-?\d+(?:\.\d+)?)\s*,\s*(?:what is|evaluate:)\s*(.+?)\??\s*$')
+
+
+def parse_terms(expression: str) -> Optional[List[Tuple[float, Optional[str]]]]:
+    """Split a sum of linear terms into (coefficient, variable-or-None) pairs"""
+    text = expression.strip().lower()
+    terms = []
+    position = 0
+    while position < len(text):
+        if text[position].isspace():
+            position += 1
+            continue
+        match = _TERM.match(text, position)
+        if not match or match.end() == position or not (match.group(2) or match.group(3)):
+            return None
+        sign, number, variable = match.groups()
+        coefficient = parse_number(number) if number else 1.0
+        if coefficient is None:
+            return None
+        terms.append((-coefficient if sign == '-' else coefficient, variable or None))
+        position = match.end()
+    return terms or None
+
+
+def parse_quadratic(question: str) -> Optional[Tuple[str, float, float]]:
+    """Parse monic 'x² + p·x + q = 0' into (variable, p, q)"""
+    match = _QUADRATIC.match(question.strip().lower())
+    if not match:
+        return None
+    variable, p_sign, p_value, q_sign, q_value = match.groups()
+    p = 0.0
+    if p_sign:
+        p = float(p_value) if p_value else 1.0
+        p = -p if p_sign == '-' else p
+    q = float(q_value) if q_value else 0.0
+    q = -q if q_sign == '-' else q
+    return variable, p, q
+
+
+def quadratic_roots(p: float, q: float) -> Optional[List[float]]:
+    """Real roots of x² + p·x + q = 0"""
+    discriminant = p * p - 4 * q
+    if discriminant < 0:
+        return None
+    root = discriminant ** 0.5
+    return [(-p + root) / 2, (-p - root) / 2]
+
+
+def parse_system(question: str) -> Optional[Tuple[Tuple[str, str], Tuple[float, float, float], Tuple[float, float, float]]]:
+    """Parse 'a1·x + b1·y = c1, a2·x + b2·y = c2' into ((x, y), row1, row2)"""
+    text = question.strip().lower()
+    if text.startswith('solve:'):
+        text = text[len('solve:'):]
+    equations = text.split(',')
+    if len(equations) != 2:
+        return None
+
+    rows = []
+    variables: List[str] = []
+    for equation in equations:
+        if equation.count('=') != 1:
+            return None
+        left, right = equation.split('=')
+        terms = parse_terms(left)
+        try:
+            constant = float(right.strip())
+        except ValueError:
+            return None
+        if not terms:
+            return None
+        coefficients = {}
+        for coefficient, variable in terms:
+            if variable is None:
+                return None
+            coefficients[variable] = coefficients.get(variable, 0.0) + coefficient
+            if variable not in variables:
+                variables.append(variable)
+        rows.append((coefficients, constant))
+
+    if len(variables) != 2:
+        return None
+    x, y = variables
+    row1, row2 = [(coefficients.get(x, 0.0), coefficients.get(y, 0.0), constant) for coefficients, constant in rows]
+    return (x, y), row1, row2
+
+
+def solve_system(row1: Tuple[float, float, float], row2: Tuple[float, float, float]) -> Optional[Tuple[float, float]]:
+    """Cramer's rule for a 2×2 linear system"""
+    a1, b1, c1 = row1
+    a2, b2, c2 = row2
+    determinant = a1 * b2 - a2 * b1
+    if determinant == 0:
+        return None
+    return (c1 * b2 - c2 * b1) / determinant, (a1 * c2 - a2 * c1) / determinant
+
+
+def parse_evaluation(question: str) -> Optional[Tuple[str, float, str]]:
+    """Parse 'If x = 5, what is <expression>?' into (variable, value, expression)"""
+    match = _EVALUATE.match(question.strip().lower())
+    if not match:
+        return None
+    return match.group(1), float(match.group(2)), match.group(3).strip()
+
+
+def format_linear_expression(coefficient: float, variable: str, constant: float) -> str:
+    """Render k·v + c the way answers are written ('8x + 2', '7y - 7', '5x')"""
+    if coefficient == 1:
+        text = variable
+    elif coefficient == -1:
+        text = f"-{variable}"
+    else:
+        text = f"{format_number(coefficient)}{variable}"
+    if constant > 0:
+        text += f" + {format_number(constant)}"
+    elif constant < 0:
+        text += f" - {format_number(-constant)}"
+    return text
@@ -0,0 +1,259 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from backend.etl import QuizResultsETL
+
+SNAPSHOT_BATCH_ROWS = 50000
+SQLITE_TIMESTAMP = '%Y-%m-%d %H:%M:%S'
+# There is no teacher role in the students table; teachers are the usernames listed here
+TEACHER_USERNAMES = frozenset(
+    name.strip() for name in os.environ.get('ITS_TEACHERS', '').split(',') if name.strip()
+)
+
+# snapshot name -> (query against the ETL's analytics database, schema); booleans are stored as int8 so they can be averaged
+SNAPSHOT_TABLES = {
+    'quiz_results': (
+        'SELECT username, lesson_id, score, total_questions, passed, taken_at FROM quiz_facts',
+        pa.schema([
+            ('username', pa.string()),
+            ('lesson_id', pa.string()),
+            ('score', pa.int32()),
+            ('total_questions', pa.int32()),
+            ('passed', pa.int8()),
+            ('timestamp', pa.string()),
+        ]),
+    ),
+    'students': (
+        'SELECT username, level, performance_score, lessons_completed FROM student_dim',
+        pa.schema([
+            ('username', pa.string()),
+            ('level', pa.string()),
+            ('performance_score', pa.float64()),
+            ('lessons_completed', pa.int32()),
+        ]),
+    ),
+    'question_attempts': (
+        'SELECT username, lesson_id, question_id, question_type, correct, taken_at FROM question_facts',
+        pa.schema([
+            ('username', pa.string()),
+            ('lesson_id', pa.string()),
+            ('question_id', pa.string()),
+            ('question_type', pa.string()),
+            ('correct', pa.int8()),
+            ('timestamp', pa.string()),
+        ]),
+    ),
+    'lessons': (
+        'SELECT lesson_id, title, level FROM lesson_dim',
+        pa.schema([
+            ('lesson_id', pa.string()),
+            ('title', pa.string()),
+            ('level', pa.string()),
+        ]),
+    ),
+}
+
+
+def is_teacher(username: str) -> bool:
+    return username in TEACHER_USERNAMES
+
+
+def _aggregate(table: pa.Table, keys, aggregations) -> pa.Table:
+    """group_by().aggregate() with (column, function, output name) aggregations.
+
+    Outputs are picked by their "<column>_<function>" names, since pyarrow
+    versions disagree on whether key columns come before or after them.
+    """
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    grouped = table.group_by(keys).aggregate([(column, function) for column, function, _ in aggregations])
+    columns = {key: grouped[key] for key in keys}
+    columns.update({name: grouped[f'{column}_{function}'] for column, function, name in aggregations})
+    return pa.table(columns)
+
+
+class SnapshotExporter:
+    """Export the analytics tables into Arrow IPC files.
+
+    Tables are read from the ETL's analytics database, brought up to date
+    first, so exports never hold read locks on the live database. Files are
+    uncompressed Arrow so readers can memory-map them. Each file is written
+    under a temporary name and swapped in with os.replace, so a reader never
+    sees a half-written snapshot.
+    """
+
+    def __init__(self, db_manager, directory: Optional[str] = None):
+        self.db = db_manager
+        self.etl = QuizResultsETL(db_manager)
+        self.directory = directory or os.path.join(
+            os.path.dirname(os.path.abspath(db_manager.db_path)), 'analytics_snapshots'
+        )
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, 'manifest.json')
+
+    def table_path(self, name: str) -> str:
+        return os.path.join(self.directory, f'{name}.arrow')
+
+    def read_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def export(self) -> Dict:
+        """Write a fresh snapshot of every table and return its manifest"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.etl.run_once()
+        conn = self.etl.get_connection()
+        cursor = conn.cursor()
+
+        row_counts = {}
+        for name, (query, schema) in SNAPSHOT_TABLES.items():
+            cursor.execute(query)
+            temp_path = self.table_path(name) + '.tmp'
+            rows_written = 0
+            with pa.OSFile(temp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, schema) as writer:
+                    while True:
+                        rows = cursor.fetchmany(SNAPSHOT_BATCH_ROWS)
+                        if not rows:
+                            break
+                        columns = list(zip(*rows))
+                        writer.write_batch(pa.RecordBatch.from_arrays(
+                            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                            schema=schema
+                        ))
+                        rows_written += len(rows)
+            os.replace(temp_path, self.table_path(name))
+            row_counts[name] = rows_written
+
+        conn.close()
+
+        manifest = {'exported_at': time.time(), 'rows': row_counts}
+        temp_manifest = self.manifest_path + '.tmp'
+        with open(temp_manifest, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temp_manifest, self.manifest_path)
+        print(f"📦 Analytics snapshot exported: {row_counts}")
+        return manifest
+
+
+class TeacherAnalytics:
+    """Class-level aggregates computed with Arrow compute kernels over the latest snapshot.
+
+    The snapshot is re-exported when it is older than `max_age_seconds`, and
+    the memory-mapped tables are reused until a newer snapshot appears.
+    """
+
+    def __init__(self, db_manager, directory: Optional[str] = None, max_age_seconds: int = 600):
+        self.exporter = SnapshotExporter(db_manager, directory)
+        self.max_age_seconds = max_age_seconds
+        self._tables: Dict[str, pa.Table] = {}
+        self._loaded_at: Optional[float] = None
+
+    def refresh(self) -> Dict:
+        """Export a new snapshot now"""
+        manifest = self.exporter.export()
+        self._tables = {}
+        self._loaded_at = None
+        return manifest
+
+    def snapshot_time(self) -> Optional[float]:
+        manifest = self.exporter.read_manifest()
+        return manifest['exported_at'] if manifest else None
+
+    def tables(self) -> Dict[str, pa.Table]:
+        manifest = self.exporter.read_manifest()
+        if not manifest or time.time() - manifest['exported_at'] > self.max_age_seconds:
+            manifest = self.refresh()
+
+        if self._loaded_at != manifest['exported_at']:
+            tables = {}
+            for name in SNAPSHOT_TABLES:
+                # Zero-copy: column buffers point straight into the mapped file
+                with pa.memory_map(self.exporter.table_path(name), 'r') as source:
+                    tables[name] = pa.ipc.open_file(source).read_all()
+            self._tables = tables
+            self._loaded_at = manifest['exported_at']
+        return self._tables
+
+    def _for_level(self, table: pa.Table, level: Optional[str]) -> pa.Table:
+        if not level:
+            return table
+        students = self.tables()['students']
+        usernames = students.filter(pc.equal(students['level'], level))['username']
+        return table.filter(pc.is_in(table['username'], value_set=usernames.combine_chunks()))
+
+    def _with_titles(self, table: pa.Table) -> pa.Table:
+        lessons = self.tables()['lessons'].select(['lesson_id', 'title'])
+        return table.join(lessons, keys='lesson_id', join_type='left outer')
+
+    def lesson_pass_rates(self, level: Optional[str] = None):
+        """Per lesson: quiz attempts, pass rate and mean score percent"""
+        quizzes = self._for_level(self.tables()['quiz_results'], level)
+        quizzes = quizzes.append_column('score_percent', self._score_percent(quizzes))
+        summary = _aggregate(quizzes, 'lesson_id', [
+            ('passed', 'count', 'attempts'),
+            ('passed', 'mean', 'pass_rate'),
+            ('score_percent', 'mean', 'mean_score_percent'),
+        ])
+        return self._with_titles(summary).sort_by('lesson_id').to_pandas()
+
+    def score_distribution(self, level: Optional[str] = None):
+        """Score percent of every quiz attempt, for histograms"""
+        quizzes = self._for_level(self.tables()['quiz_results'], level)
+        scores = pa.table({
+            'lesson_id': quizzes['lesson_id'],
+            'score_percent': self._score_percent(quizzes),
+        })
+        return self._with_titles(scores).to_pandas()
+
+    def question_difficulty(self, question_type: Optional[str] = None, min_attempts: int = 3, limit: int = 20):
+        """Hardest questions first, by share of correct attempts"""
+        attempts = self.tables()['question_attempts']
+        if question_type:
+            attempts = attempts.filter(pc.equal(attempts['question_type'], question_type))
+        summary = _aggregate(attempts, ['question_id', 'question_type', 'lesson_id'], [
+            ('correct', 'count', 'attempts'),
+            ('correct', 'mean', 'correct_rate'),
+        ])
+        summary = summary.filter(pc.greater_equal(summary['attempts'], min_attempts))
+        return summary.sort_by([('correct_rate', 'ascending'), ('attempts', 'descending')]).slice(0, limit).to_pandas()
+
+    def time_to_mastery(self, level: Optional[str] = None):
+        """Per student and lesson: hours from first quiz attempt to first pass, and attempts needed"""
+        quizzes = self._for_level(self.tables()['quiz_results'], level)
+        quizzes = quizzes.append_column(
+            'taken_at', pc.strptime(quizzes['timestamp'], format=SQLITE_TIMESTAMP, unit='s')
+        )
+        keys = ['username', 'lesson_id']
+
+        first_attempt = _aggregate(quizzes, keys, [('taken_at', 'min', 'first_attempt')])
+        passes = quizzes.filter(pc.equal(quizzes['passed'], 1))
+        first_pass = _aggregate(passes, keys, [('taken_at', 'min', 'first_pass')])
+
+        mastered = first_attempt.join(first_pass, keys=keys, join_type='inner')
+        seconds = pc.cast(pc.subtract(mastered['first_pass'], mastered['first_attempt']), pa.int64())
+        mastered = mastered.append_column('hours_to_mastery', pc.divide(pc.cast(seconds, pa.float64()), 3600.0))
+
+        # Attempts up to and including the first pass
+        upto_pass = quizzes.join(first_pass, keys=keys, join_type='inner')
+        upto_pass = upto_pass.filter(pc.less_equal(upto_pass['taken_at'], upto_pass['first_pass']))
+        attempts = _aggregate(upto_pass, keys, [('taken_at', 'count', 'attempts_to_pass')])
+
+        result = mastered.join(attempts, keys=keys, join_type='inner') \
+            .select(['username', 'lesson_id', 'hours_to_mastery', 'attempts_to_pass'])
+        return self._with_titles(result).to_pandas()
+
+    def _score_percent(self, quizzes: pa.Table):
+        return pc.multiply(
+            pc.divide(pc.cast(quizzes['score'], pa.float64()), pc.cast(quizzes['total_questions'], pa.float64())),
+            100.0
+        )
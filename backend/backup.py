@@ -0,0 +1,148 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0.005
+BACKUP_MAX_RESTARTS = 3
+BACKUP_SUFFIX = '.db.gz'
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class BackupManager:
+    """Online backups and restores of the live database.
+
+    backup() copies the database with SQLite's backup API, a bounded number
+    of pages per step, and sleeps between steps so writers such as
+    save_quiz_results can take the write lock. If a writer changes the
+    source mid-copy, SQLite restarts the copy, so every snapshot is
+    consistent as of one moment; after `max_restarts` the rest is copied in
+    one step so a busy database still gets backed up. The copy is
+    integrity-checked and gzip-compressed into a timestamped archive.
+    restore() streams an archive back into the live file through the same
+    API, so open connections keep working and see the restored data.
+    """
+
+    def __init__(self, db_manager, backup_dir: Optional[str] = None):
+        # A plain path works too, for a file SQLiteManager can't open (e.g. before a reset)
+        self.db = db_manager
+        self.db_path = os.path.abspath(db_manager if isinstance(db_manager, str) else db_manager.db_path)
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(self.db_path), 'backups')
+
+    def _archive_name(self, label: str) -> str:
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        return f"{stem}-{label}-{stamp}{BACKUP_SUFFIX}"
+
+    def backup(self, label: str = 'manual', pages: int = BACKUP_PAGES_PER_STEP,
+               sleep: float = BACKUP_STEP_SLEEP, max_restarts: int = BACKUP_MAX_RESTARTS) -> Dict:
+        """Take a compressed point-in-time snapshot; returns {'path', 'bytes', 'pages', 'restarts', 'seconds'}"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        start = time.perf_counter()
+        archive = os.path.join(self.backup_dir, self._archive_name(label))
+        temp_db = archive + '.tmp.db'
+        progress = {'remaining': None, 'restarts': 0, 'pages': 0}
+
+        def on_step(status, remaining, total):
+            # Remaining pages only go up when a concurrent write restarted the copy
+            if progress['remaining'] is not None and remaining > progress['remaining']:
+                progress['restarts'] += 1
+                if progress['restarts'] > max_restarts:
+                    raise _TooManyRestarts()
+            progress['remaining'] = remaining
+            progress['pages'] = total
+
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(temp_db)
+        try:
+            try:
+                source.backup(target, pages=pages, progress=on_step, sleep=sleep)
+            except _TooManyRestarts:
+                # Writers outpace the stepped copy; finish in one step, which makes them wait for its duration
+                source.backup(target)
+            check = target.execute('PRAGMA quick_check').fetchone()[0]
+            if check != 'ok':
+                raise sqlite3.DatabaseError(f"backup failed integrity check: {check}")
+        except Exception:
+            target.close()
+            os.remove(temp_db)
+            raise
+        finally:
+            target.close()
+            source.close()
+
+        try:
+            with open(temp_db, 'rb') as raw, gzip.open(archive + '.tmp', 'wb', compresslevel=6) as compressed:
+                shutil.copyfileobj(raw, compressed, 1024 * 1024)
+            os.replace(archive + '.tmp', archive)
+        finally:
+            for leftover in (temp_db, archive + '.tmp'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        result = {
+            'path': archive,
+            'bytes': os.path.getsize(archive),
+            'pages': progress['pages'],
+            'restarts': progress['restarts'],
+            'seconds': time.perf_counter() - start
+        }
+        print(f"💾 Backup written to {archive} ({result['bytes'] // 1024} KB, {result['seconds']:.2f}s)")
+        return result
+
+    def list_backups(self) -> List[Dict]:
+        """Archives for this database, newest first"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        backups = []
+        for name in os.listdir(self.backup_dir):
+            if name.startswith(f"{stem}-") and name.endswith(BACKUP_SUFFIX):
+                path = os.path.join(self.backup_dir, name)
+                backups.append({'name': name, 'path': path, 'bytes': os.path.getsize(path),
+                                'created': os.path.getmtime(path)})
+        return sorted(backups, key=lambda backup: (backup['created'], backup['name']), reverse=True)
+
+    def prune(self, keep: int = 10) -> int:
+        """Delete all but the newest `keep` archives; returns how many were removed"""
+        old = self.list_backups()[keep:]
+        for backup in old:
+            os.remove(backup['path'])
+        return len(old)
+
+    def restore(self, archive: str, safety_backup: bool = True) -> Dict:
+        """Replace the live database with an archive's contents"""
+        start = time.perf_counter()
+        if safety_backup and os.path.exists(self.db_path):
+            self.backup(label='pre-restore')
+
+        temp_db = os.path.join(os.path.dirname(self.db_path), f".restore-{os.getpid()}.db")
+        try:
+            with gzip.open(archive, 'rb') as compressed, open(temp_db, 'wb') as raw:
+                shutil.copyfileobj(compressed, raw, 1024 * 1024)
+
+            source = sqlite3.connect(temp_db)
+            target = sqlite3.connect(self.db_path)
+            try:
+                check = source.execute('PRAGMA quick_check').fetchone()[0]
+                if check != 'ok':
+                    raise sqlite3.DatabaseError(f"archive failed integrity check: {check}")
+                # One step: restores hold the write lock briefly rather than interleaving with writers
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+        finally:
+            if os.path.exists(temp_db):
+                os.remove(temp_db)
+
+        seconds = time.perf_counter() - start
+        print(f"♻️  Restored {self.db_path} from {archive} ({seconds:.2f}s)")
+        return {'path': archive, 'seconds': seconds}
@@ -0,0 +1,140 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import List, Dict, Optional, Tuple
+
+from backend.csp_solver import _topic_priority_for_tags
+from backend.randomness import student_rng
+from backend.rules import RulesEngine
+
+
+def build_curriculum(lessons: List[Dict], rules: RulesEngine) -> Dict:
+    """Compile lessons into bitmask form shared by every student in a batch.
+
+    Each lesson gets a bit. `prereq_masks[i]` holds the bits of lesson i's
+    prerequisites, `level_masks[level]` the lessons open at that student
+    level, and `scores[level][i]` the static part of CSPSolver's ranking.
+    """
+    ids = [lesson['lesson_id'] for lesson in lessons]
+    index = {lesson_id: i for i, lesson_id in enumerate(ids)}
+
+    prereq_masks = []
+    for lesson in lessons:
+        mask = 0
+        for prereq in lesson.get('prerequisites', []):
+            # A missing prerequisite can never be satisfied
+            mask |= 1 << index.get(prereq, len(ids))
+        prereq_masks.append(mask)
+
+    level_masks = {}
+    scores = {}
+    for level in rules.levels:
+        level_masks[level] = sum(1 << i for i, lesson in enumerate(lessons)
+                                 if rules.level_allows(level, lesson['level']))
+        scores[level] = [
+            (10 if lesson['level'] == level else 0)
+            + _topic_priority_for_tags(tuple(lesson.get('tags', [])))
+            + max(0, 5 - len(lesson.get('prerequisites', [])))
+            for lesson in lessons
+        ]
+
+    return {'ids': ids, 'index': index, 'prereq_masks': prereq_masks,
+            'level_masks': level_masks, 'scores': scores, 'lowest_level': rules.levels[0]}
+
+
+def completed_mask(curriculum: Dict, completed_lessons) -> int:
+    index = curriculum['index']
+    mask = 0
+    for lesson_id in completed_lessons:
+        if lesson_id in index:
+            mask |= 1 << index[lesson_id]
+    return mask
+
+
+def accessible_mask(curriculum: Dict, level: str, completed: int) -> int:
+    """Lessons whose level is in reach and whose prerequisites are all in `completed`"""
+    mask = curriculum['level_masks'].get(level, curriculum['level_masks'][curriculum['lowest_level']])
+    accessible = 0
+    for i, prereqs in enumerate(curriculum['prereq_masks']):
+        if mask >> i & 1 and prereqs & ~completed == 0:
+            accessible |= 1 << i
+    return accessible
+
+
+def _rank_students(curriculum: Dict, students: List[Tuple[str, str, int]], max_lessons: int,
+                   day: Optional[date] = None) -> List[Tuple[str, List[str]]]:
+    """Rank open lessons for (username, level, completed_mask) rows; runs in worker processes"""
+    ids = curriculum['ids']
+    accessible_cache = {}
+    paths = []
+
+    for username, level, completed in students:
+        key = (level, completed)
+        if key not in accessible_cache:
+            accessible_cache[key] = accessible_mask(curriculum, level, completed)
+        available = accessible_cache[key] & ~completed
+
+        scores = curriculum['scores'].get(level, curriculum['scores'][curriculum['lowest_level']])
+        # Same stream and draw order as generate_learning_path, so both give the same path
+        rng = student_rng(username, 'learning_path', day)
+        scored = []
+        i = 0
+        while available:
+            if available & 1:
+                # Small random factor for variety, as in CSPSolver
+                scored.append((scores[i] + rng.uniform(0, 1), i))
+            available >>= 1
+            i += 1
+
+        paths.append((username, [ids[i] for _, i in heapq.nlargest(max_lessons, scored)]))
+    return paths
+
+
+class ClassPathGenerator:
+    """Generate learning paths for a whole class in one pass.
+
+    Loads the curriculum and every student with two queries, turns both into
+    bitmasks, and ranks each student's open lessons with the same scoring as
+    CSPSolver.generate_learning_path. Large classes can be split across a
+    process pool.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def load(self, usernames: Optional[List[str]] = None) -> Tuple[Dict, List[Tuple[str, str, int]]]:
+        curriculum = build_curriculum(self.db.get_all_lessons(), self.db.get_rules_engine())
+        students = [
+            (student['username'], student['level'], completed_mask(curriculum, student['completed_lessons']))
+            for student in self.db.get_students_progress(usernames)
+        ]
+        return curriculum, students
+
+    def accessibility_matrix(self, usernames: Optional[List[str]] = None) -> Tuple[List[str], List[str], List[int]]:
+        """Return (usernames, lesson_ids, masks); bit i of a student's mask means lesson_ids[i] is accessible"""
+        curriculum, students = self.load(usernames)
+        masks = [accessible_mask(curriculum, level, completed) for _, level, completed in students]
+        return [student[0] for student in students], curriculum['ids'], masks
+
+    def generate(self, usernames: Optional[List[str]] = None, max_lessons: int = 5,
+                 processes: Optional[int] = None, chunk_size: int = 500) -> Dict[str, List[str]]:
+        """Return {username: [lesson_id, ...]} for every requested student.
+
+        `processes` > 1 ranks chunks of `chunk_size` students in a process pool.
+        """
+        curriculum, students = self.load(usernames)
+        if not students:
+            return {}
+
+        # Pin the day so every worker draws from the same daily streams
+        day = date.today()
+        if not processes or processes <= 1 or len(students) <= chunk_size:
+            return dict(_rank_students(curriculum, students, max_lessons, day))
+
+        chunks = [students[i:i + chunk_size] for i in range(0, len(students), chunk_size)]
+        paths = {}
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for result in executor.map(_rank_students, [curriculum] * len(chunks), chunks,
+                                       [max_lessons] * len(chunks), [day] * len(chunks)):
+                paths.update(result)
+        return paths
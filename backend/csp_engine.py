@@ -0,0 +1,427 @@
+from typing import List, Dict, Tuple, Optional, Callable, Hashable, Iterable
+
+from backend.rules import RulesEngine
+
+# Value meaning "not placed in this schedule"; always tried last
+UNSCHEDULED = -1
+
+
+# Declarative access rules shared by CSPSolver and the scheduling model;
+# level checks are RulesEngine.level_allows
+
+def prerequisites_met(lesson: Dict, completed_lessons) -> bool:
+    """All prerequisites must already be completed"""
+    return all(prereq in completed_lessons for prereq in lesson.get('prerequisites', []))
+
+
+class Constraint:
+    """An n-ary constraint over a scope of variables.
+
+    `predicate` receives the current (possibly partial) assignment and must
+    return False only when the assigned values already violate the constraint.
+    """
+
+    def __init__(self, scope: Iterable[Hashable], predicate: Callable[[Dict], bool], name: str = ''):
+        self.scope = tuple(scope)
+        self.predicate = predicate
+        self.name = name
+
+    def satisfied(self, assignment: Dict) -> bool:
+        return self.predicate(assignment)
+
+    def consistent(self, var, assignment: Dict) -> bool:
+        """Check the constraint right after `var` was assigned"""
+        return self.predicate(assignment)
+
+    def reset(self):
+        """Clear any incremental state before a new search"""
+
+    def assigned(self, var, value):
+        """Hook for incremental state when `var` takes `value`"""
+
+    def unassigned(self, var, value):
+        """Hook for incremental state when `var` gives up `value`"""
+
+    def forward_check(self, var, assignment: Dict, domains: Dict[Hashable, List]) -> Optional[List[Tuple]]:
+        """Prune neighbour values inconsistent with `var`'s new value.
+
+        Returns the (variable, value) pairs removed, or None on a domain wipeout.
+        """
+        removed = []
+        for other in self.scope:
+            if other == var or other in assignment:
+                continue
+            for value in list(domains[other]):
+                assignment[other] = value
+                consistent = self.predicate(assignment)
+                del assignment[other]
+                if not consistent:
+                    domains[other].remove(value)
+                    removed.append((other, value))
+            if not domains[other]:
+                return _restore(domains, removed)
+        return removed
+
+
+class BinaryConstraint(Constraint):
+    """Relation between two variables; the only kind AC-3 propagates"""
+
+    def __init__(self, x, y, relation: Callable[[object, object], bool], name: str = ''):
+        self.x, self.y, self.relation = x, y, relation
+        super().__init__((x, y), self._check, name)
+
+    def _check(self, assignment: Dict) -> bool:
+        if self.x in assignment and self.y in assignment:
+            return self.relation(assignment[self.x], assignment[self.y])
+        return True
+
+    def allows(self, var, value, other_value) -> bool:
+        if var == self.x:
+            return self.relation(value, other_value)
+        return self.relation(other_value, value)
+
+    def revise(self, var, domains: Dict[Hashable, List]) -> List:
+        """Values of `var` supported by some value of the other variable"""
+        other = self.y if var == self.x else self.x
+        return [value for value in domains[var]
+                if any(self.allows(var, value, other_value) for other_value in domains[other])]
+
+
+def _precedes(before_week, week) -> bool:
+    return week == UNSCHEDULED or UNSCHEDULED < before_week < week
+
+
+class PrecedenceConstraint(BinaryConstraint):
+    """`before` takes an earlier week than `after`, or `after` stays UNSCHEDULED.
+
+    Support only depends on the other domain's earliest or latest week, so
+    AC-3 revises an arc in O(domain) rather than O(domain²).
+    """
+
+    def __init__(self, before, after, name: str = ''):
+        super().__init__(before, after, _precedes, name)
+
+    def revise(self, var, domains):
+        if var == self.y:
+            placed = [week for week in domains[self.x] if week != UNSCHEDULED]
+            earliest = min(placed) if placed else None
+            return [week for week in domains[var]
+                    if week == UNSCHEDULED or (earliest is not None and week > earliest)]
+        if UNSCHEDULED in domains[self.y]:
+            return list(domains[var])
+        latest = max(domains[self.y], default=UNSCHEDULED)
+        return [week for week in domains[var] if UNSCHEDULED < week < latest]
+
+    def forward_check(self, var, assignment, domains):
+        week = assignment[var]
+        if var == self.x:
+            other = self.y
+            if other in assignment:
+                return []
+            pruned = [value for value in domains[other]
+                      if value != UNSCHEDULED and (week == UNSCHEDULED or value <= week)]
+        else:
+            other = self.x
+            if other in assignment or week == UNSCHEDULED:
+                return []
+            pruned = [value for value in domains[other] if value == UNSCHEDULED or value >= week]
+        removed = []
+        for value in pruned:
+            domains[other].remove(value)
+            removed.append((other, value))
+        if not domains[other]:
+            return _restore(domains, removed)
+        return removed
+
+
+class CapacityConstraint(Constraint):
+    """Total weight of variables sharing a value may not exceed `capacity`.
+
+    Models per-week budgets: each lesson variable takes a week value and its
+    weight is its duration (time budget) or 1 (lessons per week).
+    """
+
+    def __init__(self, scope: Iterable[Hashable], weights: Dict, capacity: float,
+                 exempt=(UNSCHEDULED,), name: str = ''):
+        self.weights = weights
+        self.capacity = capacity
+        self._heaviest = max(weights.values(), default=0)
+        self.exempt = set(exempt)
+        self._loads = {}
+        super().__init__(scope, self._check, name)
+
+    def _check(self, assignment: Dict) -> bool:
+        loads = {}
+        for var in self.scope:
+            value = assignment.get(var, UNSCHEDULED)
+            if value in self.exempt:
+                continue
+            loads[value] = loads.get(value, 0) + self.weights[var]
+            if loads[value] > self.capacity:
+                return False
+        return True
+
+    def consistent(self, var, assignment):
+        value = assignment[var]
+        return value in self.exempt or self._loads.get(value, 0) <= self.capacity
+
+    def reset(self):
+        self._loads = {}
+
+    def assigned(self, var, value):
+        if value not in self.exempt:
+            self._loads[value] = self._loads.get(value, 0) + self.weights[var]
+
+    def unassigned(self, var, value):
+        if value not in self.exempt:
+            self._loads[value] -= self.weights[var]
+
+    def forward_check(self, var, assignment, domains):
+        value = assignment[var]
+        if value in self.exempt:
+            return []
+        load = self._loads.get(value, 0)
+        if load + self._heaviest <= self.capacity:
+            # Nothing can overflow this value yet
+            return []
+
+        removed = []
+        for other in self.scope:
+            if other in assignment or value not in domains[other]:
+                continue
+            if load + self.weights[other] > self.capacity:
+                domains[other].remove(value)
+                removed.append((other, value))
+                if not domains[other]:
+                    return _restore(domains, removed)
+        return removed
+
+
+def _restore(domains, removed):
+    for var, value in removed:
+        domains[var].append(value)
+    return None
+
+
+class CSP:
+    """Variables with finite domains, solved by AC-3 plus backtracking.
+
+    Search uses forward checking with minimum-remaining-values variable
+    ordering by default; MRV ties go to the variable declared first. With
+    `ordering='declared'` variables are taken strictly in declaration order.
+    Values are tried in domain order, so callers declare variables and values
+    in preference order. `max_assignments` bounds the search; when it is hit
+    `solve` returns None and `stats['exhausted']` is set.
+    """
+
+    def __init__(self, ordering: str = 'mrv', max_assignments: Optional[int] = None):
+        self.domains: Dict[Hashable, List] = {}
+        self.constraints: List[Constraint] = []
+        self.ordering = ordering
+        self.max_assignments = max_assignments
+        self._by_var: Dict[Hashable, List[Constraint]] = {}
+        self._declared: Dict[Hashable, int] = {}
+        self.stats = {'assignments': 0, 'backtracks': 0, 'pruned': 0, 'exhausted': False}
+
+    def add_variable(self, var, domain: Iterable):
+        self.domains[var] = list(domain)
+        self._by_var.setdefault(var, [])
+        self._declared.setdefault(var, len(self._declared))
+
+    def add_unary(self, var, predicate: Callable[[object], bool]):
+        """Node consistency is enforced immediately by filtering the domain"""
+        self.domains[var] = [value for value in self.domains[var] if predicate(value)]
+
+    def add_constraint(self, constraint: Constraint):
+        self.constraints.append(constraint)
+        for var in constraint.scope:
+            self._by_var.setdefault(var, []).append(constraint)
+
+    def ac3(self, domains: Optional[Dict[Hashable, List]] = None) -> bool:
+        """Make every binary constraint arc consistent; False if a domain empties"""
+        domains = self.domains if domains is None else domains
+        # Arcs are (variable, other variable, constraint); constraints hash by identity
+        queue = []
+        neighbours: Dict[Hashable, List[Tuple]] = {}
+        for constraint in self.constraints:
+            if isinstance(constraint, BinaryConstraint):
+                x, y = constraint.x, constraint.y
+                queue.append((x, y, constraint))
+                queue.append((y, x, constraint))
+                neighbours.setdefault(x, []).append((y, constraint))
+                neighbours.setdefault(y, []).append((x, constraint))
+
+        # The queue is a stack; reversed, arcs pop in declaration order, so prerequisite-first
+        # models revise each dependent after its prerequisites instead of over and over
+        queue.reverse()
+        queued = set(queue)
+        while queue:
+            arc = queue.pop()
+            queued.discard(arc)
+            x, _, constraint = arc
+
+            revised = constraint.revise(x, domains)
+            if len(revised) == len(domains[x]):
+                continue
+
+            self.stats['pruned'] += len(domains[x]) - len(revised)
+            domains[x][:] = revised
+            if not revised:
+                return False
+
+            for z, neighbour in neighbours[x]:
+                if neighbour is not constraint:
+                    arc = (z, x, neighbour)
+                    if arc not in queued:
+                        queue.append(arc)
+                        queued.add(arc)
+        return True
+
+    def solve(self) -> Optional[Dict]:
+        """Return a complete consistent assignment, or None if none exists"""
+        domains = {var: list(values) for var, values in self.domains.items()}
+        # Pruning and restoring reorders domains; remember the preferred order
+        self._rank = {var: {value: i for i, value in enumerate(values)} for var, values in domains.items()}
+        self._order = list(self.domains)
+        for constraint in self.constraints:
+            constraint.reset()
+        if not self.ac3(domains):
+            return None
+        return self._backtrack({}, domains)
+
+    def _backtrack(self, assignment: Dict, domains: Dict[Hashable, List]) -> Optional[Dict]:
+        if len(assignment) == len(domains):
+            return dict(assignment)
+
+        declared = self._declared
+        if self.ordering == 'mrv':
+            # MRV, ties broken by declaration order
+            var = min((v for v in domains if v not in assignment),
+                      key=lambda v: (len(domains[v]), declared[v]))
+        else:
+            var = self._order[len(assignment)]
+
+        rank = self._rank[var]
+        constraints = self._by_var[var]
+        for value in sorted(domains[var], key=rank.__getitem__):
+            if self.max_assignments is not None and self.stats['assignments'] >= self.max_assignments:
+                self.stats['exhausted'] = True
+                return None
+            assignment[var] = value
+            self.stats['assignments'] += 1
+            for constraint in constraints:
+                constraint.assigned(var, value)
+
+            if all(constraint.consistent(var, assignment) for constraint in constraints):
+                saved = domains[var]
+                domains[var] = [value]
+                removed_all = []
+                wiped_out = False
+                for constraint in constraints:
+                    removed = constraint.forward_check(var, assignment, domains)
+                    if removed is None:
+                        wiped_out = True
+                        break
+                    removed_all.extend(removed)
+
+                if not wiped_out:
+                    result = self._backtrack(assignment, domains)
+                    if result is not None:
+                        return result
+
+                _restore(domains, removed_all)
+                domains[var] = saved
+
+            for constraint in constraints:
+                constraint.unassigned(var, value)
+            del assignment[var]
+            self.stats['backtracks'] += 1
+        return None
+
+
+def build_schedule_csp(lessons: List[Dict], rules: RulesEngine, student_level: str, completed_lessons,
+                       weeks: int = 4, minutes_per_week: int = 180,
+                       max_lessons_per_week: int = 3, require_all: bool = False,
+                       max_assignments: Optional[int] = 100000) -> CSP:
+    """Model a study schedule: one variable per open lesson, valued by week.
+
+    A lesson is open when its level allows it and each prerequisite is
+    completed or itself open; lessons that can never be opened get no
+    variable, so they are simply absent from the solution.
+
+    Constraints:
+      * prereq  - a prerequisite is completed or scheduled in an earlier week
+      * budget  - weekly `duration_minutes` total within `minutes_per_week`
+      * cadence - at most `max_lessons_per_week` lessons in any week
+    With `require_all`, every open lesson must be placed or there is no solution.
+
+    Without `require_all` every lesson can fall back to UNSCHEDULED, and
+    taking variables prerequisites-first never needs to backtrack, whereas MRV
+    would grab deep dependents (smallest domains) first and thrash. MRV is
+    kept for the strict model, where it detects dead ends early.
+    """
+    completed = set(completed_lessons)
+    pending = []
+    pending_ids = set()
+    for lesson in _topological_order([lesson for lesson in lessons if lesson['lesson_id'] not in completed]):
+        if rules.level_allows(student_level, lesson['level']) and all(
+                prereq in completed or prereq in pending_ids for prereq in lesson.get('prerequisites', [])):
+            pending.append(lesson)
+            pending_ids.add(lesson['lesson_id'])
+
+    week_values = list(range(weeks))
+    csp = CSP(ordering='mrv' if require_all else 'declared', max_assignments=max_assignments)
+    for lesson in pending:
+        csp.add_variable(lesson['lesson_id'], week_values if require_all else week_values + [UNSCHEDULED])
+
+    for lesson in pending:
+        lesson_id = lesson['lesson_id']
+        for prereq in lesson.get('prerequisites', []):
+            if prereq in completed:
+                continue
+            csp.add_constraint(PrecedenceConstraint(prereq, lesson_id, name=f"prereq:{prereq}->{lesson_id}"))
+
+    scope = [lesson['lesson_id'] for lesson in pending]
+    csp.add_constraint(CapacityConstraint(
+        scope, {lesson['lesson_id']: lesson.get('duration_minutes') or 0 for lesson in pending},
+        minutes_per_week, name='budget'
+    ))
+    csp.add_constraint(CapacityConstraint(
+        scope, {lesson_id: 1 for lesson_id in scope}, max_lessons_per_week, name='cadence'
+    ))
+    return csp
+
+
+def _topological_order(lessons: List[Dict]) -> List[Dict]:
+    """Order lessons prerequisites-first (Kahn); lessons on a cycle go last"""
+    by_id = {lesson['lesson_id']: lesson for lesson in lessons}
+    indegree = {lesson_id: 0 for lesson_id in by_id}
+    dependents = {lesson_id: [] for lesson_id in by_id}
+    for lesson in lessons:
+        for prereq in lesson.get('prerequisites', []):
+            if prereq in by_id:
+                indegree[lesson['lesson_id']] += 1
+                dependents[prereq].append(lesson['lesson_id'])
+
+    ready = [lesson_id for lesson_id, degree in indegree.items() if degree == 0]
+    ordered = []
+    while ready:
+        lesson_id = ready.pop(0)
+        ordered.append(lesson_id)
+        for dependent in dependents[lesson_id]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                ready.append(dependent)
+
+    seen = set(ordered)
+    ordered.extend(lesson_id for lesson_id in by_id if lesson_id not in seen)
+    return [by_id[lesson_id] for lesson_id in ordered]
+
+
+def schedule_by_week(assignment: Optional[Dict], weeks: int) -> Dict[int, List[str]]:
+    """Group a solved assignment into {week: [lesson_id, ...]}"""
+    schedule = {week: [] for week in range(weeks)}
+    for lesson_id, week in sorted((assignment or {}).items()):
+        if week != UNSCHEDULED:
+            schedule[week].append(lesson_id)
+    return schedule
@@ -1,10 +1,54 @@
 import random
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional
 import re
 
+from backend.path_planner import LearningPathPlanner
+from backend.csp_engine import prerequisites_met, build_schedule_csp, schedule_by_week
+from backend.randomness import student_rng, stream_rng
+from backend.feedback import FeedbackRenderer
+from backend.misconceptions import MisconceptionDetector
+from backend.step_solver import check_step, solution_steps
+
+# Ordered by algebra topic importance; the first topic found in a tag wins
+TOPIC_PRIORITIES = (
+    ('variables', 8),
+    ('basic equations', 7),
+    ('expressions', 6),
+    ('two-step equations', 5),
+    ('word problems', 4),
+    ('systems', 3),
+    ('quadratic', 2),
+    ('advanced', 1)
+)
+
+@lru_cache(maxsize=1024)
+def _topic_priority_for_tags(tags: Tuple[str, ...]) -> int:
+    for tag in tags:
+        tag = tag.lower()
+        for topic, priority in TOPIC_PRIORITIES:
+            if topic in tag:
+                return priority
+    return 1  # Default priority
+
 class CSPSolver:
     def __init__(self, db_manager):
         self.db = db_manager
+        self.planner = LearningPathPlanner(db_manager)
+        self.feedback = FeedbackRenderer()
+        self.misconceptions = MisconceptionDetector(db_manager)
+        self._curriculum = None
+    
+    @property
+    def curriculum(self):
+        """Compiled prerequisite graph, loaded once; call refresh_curriculum() after lessons change"""
+        if self._curriculum is None:
+            self._curriculum = self.db.get_compiled_curriculum()
+        return self._curriculum
+    
+    def refresh_curriculum(self):
+        self._curriculum = None
+        self.planner.refresh()
     
     def can_access_lesson(self, username: str, lesson_id: str) -> bool:
         """Check if student can access a lesson based on CSP constraints"""
@@ -12,27 +56,9 @@ class CSPSolver:
         if not student:
             return False
         
-        lesson = self.db.get_lesson(lesson_id)
-        if not lesson:
-            return False
-        
-        # Check level appropriateness
-        level_weights = {'beginner': 0, 'intermediate': 1, 'advanced': 2}
-        student_level_num = level_weights.get(student['level'], 0)
-        lesson_level_num = level_weights.get(lesson['level'], 0)
-        
-        if lesson_level_num > student_level_num + 1:
-            return False
-        
-        # All prerequisites must be completed
-        prerequisites = lesson.get('prerequisites', [])
-        completed_lessons = set(student.get('completed_lessons', []))
-        
-        for prereq in prerequisites:
-            if prereq not in completed_lessons:
-                return False
-        
-        return True
+        # Level and prerequisites come from the compiled graph, so no lesson lookup is needed
+        return self.curriculum.can_access(lesson_id, student['level'], set(student.get('completed_lessons', [])),
+                                          self.db.get_rules_engine())
     
     def can_take_quiz(self, username: str, lesson_id: str) -> bool:
         """Check if student can take quiz for a lesson"""
@@ -48,16 +74,13 @@ class CSPSolver:
         if not student:
             return []
         
-        all_lessons = self.db.get_all_lessons()
-        accessible_lessons = []
-        
-        for lesson in all_lessons:
-            if self.can_access_lesson(username, lesson['lesson_id']):
-                accessible_lessons.append(lesson)
-        
-        return accessible_lessons
+        # One student read and one metadata scan instead of two lookups per lesson
+        accessible = set(self.curriculum.accessible(student['level'], student.get('completed_lessons', []),
+                                                    self.db.get_rules_engine()))
+        return [lesson for lesson in self.db.get_all_lessons() if lesson['lesson_id'] in accessible]
 
-    def generate_learning_path(self, username: str, max_lessons: int = 5) -> List[str]:
+    def generate_learning_path(self, username: str, max_lessons: int = 5,
+                               rng: Optional[random.Random] = None) -> List[str]:
         """Generate personalized algebra learning path with CSP enforcement"""
         student = self.db.get_student(username)
         if not student:
@@ -75,37 +98,73 @@ class CSPSolver:
             return []
         
         # Prioritize lessons based on algebra learning sequence
-        learning_path = self._prioritize_algebra_lessons(available_lessons, student['level'], max_lessons)
+        # Per-student daily stream keeps the path stable across reruns
+        rng = rng or student_rng(username, 'learning_path')
+        learning_path = self._prioritize_algebra_lessons(available_lessons, student['level'], max_lessons, rng)
         
         return learning_path
+
+    def generate_class_learning_paths(self, usernames: Optional[List[str]] = None, max_lessons: int = 5,
+                                      processes: Optional[int] = None) -> Dict[str, List[str]]:
+        """Generate learning paths for a whole class (every student by default) in one pass"""
+        from backend.class_paths import ClassPathGenerator
+        return ClassPathGenerator(self.db).generate(usernames, max_lessons, processes)
+
+    def plan_learning_path(self, username: str, target_lesson: Optional[str] = None,
+                           target_level: Optional[str] = None) -> List[str]:
+        """Plan the full ordered lesson sequence to a target lesson or level (next level by default)"""
+        return self.planner.plan_path(username, target_lesson, target_level)
+    
+    def schedule_lessons(self, username: str, weeks: int = 4, minutes_per_week: int = 180,
+                         max_lessons_per_week: int = 3) -> Dict[int, List[str]]:
+        """Solve a weekly study schedule for one student as a constraint problem"""
+        return self.schedule_class([username], weeks, minutes_per_week, max_lessons_per_week).get(username, {})
+
+    def schedule_class(self, usernames: List[str], weeks: int = 4, minutes_per_week: int = 180,
+                       max_lessons_per_week: int = 3) -> Dict[str, Dict[int, List[str]]]:
+        """Solve schedules for a whole class, loading the curriculum once.
+
+        Students with the same level and completed lessons share one solve.
+        """
+        lessons = self.db.get_all_lessons()
+        rules = self.db.get_rules_engine()
+        solved = {}
+        schedules = {}
+        for student in self.db.get_students_progress(usernames):
+            username = student['username']
+            completed = frozenset(student.get('completed_lessons', []))
+            key = (student['level'], completed)
+            if key not in solved:
+                csp = build_schedule_csp(lessons, rules, student['level'], completed,
+                                         weeks, minutes_per_week, max_lessons_per_week)
+                solved[key] = schedule_by_week(csp.solve(), weeks)
+            schedules[username] = solved[key]
+        return schedules
     
     def _filter_algebra_lessons(self, all_lessons: List[Dict], completed_lessons: set, student_level: str) -> List[Dict]:
         """Filter algebra lessons based on level and prerequisites - ENHANCED with CSP"""
-        level_weights = {'beginner': 0, 'intermediate': 1, 'advanced': 2}
-        student_level_num = level_weights.get(student_level, 0)
-        
         accessible_lessons = []
+        rules = self.db.get_rules_engine()
         
         for lesson in all_lessons:
             # Skip completed lessons
             if lesson['lesson_id'] in completed_lessons:
                 continue
             
-            # Check level appropriateness 
-            lesson_level_num = level_weights.get(lesson['level'], 0)
-            if lesson_level_num > student_level_num: 
+            # Check level appropriateness (no lookahead)
+            if not rules.level_allows(student_level, lesson['level'], lookahead=0):
                 continue
             
             # Check prerequisites - ALL must be completed
-            prerequisites_met = all(prereq in completed_lessons for prereq in lesson.get('prerequisites', []))
-            if not prerequisites_met:
+            if not prerequisites_met(lesson, completed_lessons):
                 continue
             
             accessible_lessons.append(lesson)
         
         return accessible_lessons
     
-    def _prioritize_algebra_lessons(self, available_lessons: List[Dict], student_level: str, max_lessons: int) -> List[str]:
+    def _prioritize_algebra_lessons(self, available_lessons: List[Dict], student_level: str, max_lessons: int,
+                                    rng: Optional[random.Random] = None) -> List[str]:
         """Prioritize algebra lessons for optimal learning sequence with CSP"""
         if not available_lessons:
             return []
@@ -128,7 +187,7 @@ class CSPSolver:
             score += max(0, 5 - prereq_count) 
             
             # Small random factor for variety
-            score += random.uniform(0, 1)
+            score += (rng or random).uniform(0, 1)
             
             scored_lessons.append((score, lesson))
         
@@ -140,24 +199,8 @@ class CSPSolver:
     
     def _get_topic_priority(self, lesson: Dict) -> int:
         """Get priority score based on algebra topic importance"""
-        topic_priorities = {
-            'variables': 8,
-            'basic equations': 7,
-            'expressions': 6,
-            'two-step equations': 5,
-            'word problems': 4,
-            'systems': 3,
-            'quadratic': 2,
-            'advanced': 1
-        }
-        
-        # Check lesson tags for topic matches
-        for tag in lesson.get('tags', []):
-            for topic, priority in topic_priorities.items():
-                if topic in tag.lower():
-                    return priority
-        
-        return 1  # Default priority
+        # Tag sets repeat across calls, so the tag/topic scan is memoized
+        return _topic_priority_for_tags(tuple(lesson.get('tags', [])))
     
     def get_recommended_lessons(self, username: str, count: int = 3) -> List[Dict]:
         """Get recommended lessons for quick start with CSP enforcement"""
@@ -172,20 +215,35 @@ class CSPSolver:
         
         return recommended
 
-    def check_exercise_answer(self, exercise: Dict, student_answer: str) -> Tuple[bool, str]:
+    def check_exercise_answer(self, exercise: Dict, student_answer: str,
+                              rng: Optional[random.Random] = None) -> Tuple[bool, str]:
         """Enhanced answer checking with intelligent feedback"""
         correct_answer = str(exercise.get('answer', '')).strip().lower()
         student_answer_clean = str(student_answer).strip().lower()
         
         is_correct = self._flexible_answer_match(student_answer_clean, correct_answer)
         
+        # Without a caller stream, the same answer to the same question always reads the same
+        question_id = exercise.get('question_id') or exercise.get('ex_id', '')
+        rng = rng or stream_rng('feedback', question_id, student_answer_clean)
+        
         if is_correct:
-            feedback = self._generate_correct_feedback(exercise, student_answer)
+            feedback = self._generate_correct_feedback(exercise, student_answer, rng)
         else:
-            feedback = self._generate_incorrect_feedback(exercise, student_answer, correct_answer)
+            misconception = self.misconceptions.classify(question_id, student_answer_clean, correct_answer)
+            feedback = self._generate_incorrect_feedback(exercise, student_answer, correct_answer, rng,
+                                                         misconception)
         
         return is_correct, feedback
     
+    def get_solution_steps(self, exercise: Dict) -> List[Dict[str, str]]:
+        """Worked steps for an exercise's equation, derived once per distinct equation"""
+        return solution_steps(exercise.get('question', ''), exercise.get('answer'))
+
+    def check_solution_step(self, exercise: Dict, student_step: str, current_step: int = 0) -> Dict:
+        """Validate one line of a student's working against the valid next states"""
+        return check_step(exercise.get('question', ''), student_step, current_step, exercise.get('answer'))
+
     def _flexible_answer_match(self, student_answer: str, correct_answer: str) -> bool:
         """Enhanced flexible answer matching to handle different formats"""
         
@@ -270,28 +328,13 @@ class CSPSolver:
         except:
             return False
     
-    def _generate_correct_feedback(self, exercise: Dict, student_answer: str) -> str:
+    def _generate_correct_feedback(self, exercise: Dict, student_answer: str,
+                                   rng: Optional[random.Random] = None) -> str:
         """Generate encouraging feedback for correct answers"""
-        
-        explanations = [
-            f"🎉 **Excellent work!** Your answer '{student_answer}' is correct!\n\n{exercise.get('explanation', '')}",
-            f"🌟 **Perfect!** '{student_answer}' is the right answer!\n\n{exercise.get('explanation', '')}",
-            f"✅ **Correct!** Great job solving this algebra problem!\n\n{exercise.get('explanation', '')}",
-            f"💡 **Brilliant thinking!** You got it right with '{student_answer}'!\n\n{exercise.get('explanation', '')}"
-        ]
-        
-        return random.choice(explanations)
+        return self.feedback.render_correct(exercise, student_answer, rng)
     
-    def _generate_incorrect_feedback(self, exercise: Dict, student_answer: str, correct_answer: str) -> str:
-        """Generate helpful feedback for incorrect answers"""
-        
-        hint = exercise.get('hint', '')
-        explanation = exercise.get('explanation', '')
-        
-        feedback_templates = [
-            f"🤔 Not quite. You answered '{student_answer}', but let's think this through.\n\n**Hint:** {hint}\n\n**Correct Answer:** {correct_answer}\n\n**Explanation:** {explanation}",
-            f"📚 Good attempt! The answer was '{student_answer}', but we need '{correct_answer}'.\n\n**Hint:** {hint}\n\n**Explanation:** {explanation}",
-            f"💭 Let's review this together. You said '{student_answer}', but here's the approach:\n\n**Hint:** {hint}\n\n**Correct Answer:** {correct_answer}\n\n**Explanation:** {explanation}"
-        ]
-        
-        return random.choice(feedback_templates)
\ No newline at end of file
+    def _generate_incorrect_feedback(self, exercise: Dict, student_answer: str, correct_answer: str,
+                                     rng: Optional[random.Random] = None,
+                                     misconception: Optional[str] = None) -> str:
+        """Generate helpful feedback for incorrect answers, targeted when the error type is recognised"""
+        return self.feedback.render_incorrect(exercise, student_answer, correct_answer, rng, misconception)
\ No newline at end of file
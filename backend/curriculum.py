@@ -0,0 +1,209 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from backend.rules import RulesEngine
+
+
+def _strongly_connected(count: int, unlocks: List[List[int]]) -> List[List[int]]:
+    """Tarjan's algorithm, iterative so deep prerequisite chains can't hit the recursion limit"""
+    index = [None] * count
+    lowlink = [0] * count
+    on_stack = [False] * count
+    stack: List[int] = []
+    components = []
+    counter = 0
+
+    for root in range(count):
+        if index[root] is not None:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            if child < len(unlocks[node]):
+                work.append((node, child + 1))
+                nxt = unlocks[node][child]
+                if index[nxt] is None:
+                    work.append((nxt, 0))
+                elif on_stack[nxt]:
+                    lowlink[node] = min(lowlink[node], index[nxt])
+                continue
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+def validate_curriculum(lessons: Iterable[Mapping], rules: RulesEngine) -> Dict:
+    """Check the prerequisite graph in O(lessons + prerequisites).
+
+    Returns {'valid', 'order', 'cycles', 'dangling', 'unreachable',
+    'level_inversions'}. Cycles and dangling references make a curriculum
+    invalid; unreachable lessons follow from them, and level inversions (a
+    prerequisite ranked above the lesson's own level by `rules`) are
+    reported as warnings.
+    `order` is a topological study order of every lesson that can be reached.
+    """
+    lessons = list(lessons)
+    ids = [lesson['lesson_id'] for lesson in lessons]
+    position = {lesson_id: i for i, lesson_id in enumerate(ids)}
+
+    unlocks: List[List[int]] = [[] for _ in ids]
+    waiting = [0] * len(ids)
+    dangling = []
+    level_inversions = []
+    self_loops = set()
+    for i, lesson in enumerate(lessons):
+        for prerequisite in lesson.get('prerequisites', []):
+            j = position.get(prerequisite)
+            if j is None:
+                dangling.append((ids[i], prerequisite))
+                continue
+            if i == j:
+                self_loops.add(i)
+            unlocks[j].append(i)
+            waiting[i] += 1
+            if rules.rank(lessons[j]['level']) > rules.rank(lesson['level']):
+                level_inversions.append((ids[i], prerequisite, lesson['level'], lessons[j]['level']))
+
+    cycles = sorted(
+        sorted(ids[i] for i in component)
+        for component in _strongly_connected(len(ids), unlocks)
+        if len(component) > 1 or component[0] in self_loops
+    )
+
+    # Kahn's algorithm; lessons behind a cycle or a dangling reference are never released
+    blocked = {position[lesson_id] for lesson_id, _ in dangling}
+    ready = [i for i in range(len(ids)) if waiting[i] == 0 and i not in blocked]
+    order = []
+    while ready:
+        i = ready.pop()
+        order.append(ids[i])
+        for j in unlocks[i]:
+            waiting[j] -= 1
+            if waiting[j] == 0 and j not in blocked:
+                ready.append(j)
+    released = set(order)
+
+    return {
+        'valid': not cycles and not dangling,
+        'order': order,
+        'cycles': cycles,
+        'dangling': dangling,
+        'unreachable': sorted(lesson_id for lesson_id in ids if lesson_id not in released),
+        'level_inversions': level_inversions
+    }
+
+
+def curriculum_fingerprint(lessons: Iterable[Mapping], rules: RulesEngine) -> str:
+    """Hash of everything the compiled graph depends on, to tell when it is stale"""
+    canonical = sorted(
+        (lesson['lesson_id'], lesson['level'], list(lesson.get('prerequisites', [])),
+         lesson.get('duration_minutes') or 0, list(lesson.get('tags', [])))
+        for lesson in lessons
+    )
+    # Level ranks decide which prerequisites count as level inversions
+    canonical.append(sorted(rules.ranks.items()))
+    return hashlib.sha256(json.dumps(canonical).encode('utf-8')).hexdigest()
+
+
+class CompiledCurriculum:
+    """Validated prerequisite graph the solver loads without touching the lessons table.
+
+    Lessons are stored in topological order; unreachable lessons come last
+    and are never reported as accessible.
+    """
+
+    __slots__ = ('fingerprint', 'ids', 'index', 'levels', 'prerequisites', 'durations', 'reachable', 'report')
+
+    def __init__(self, fingerprint: str, ids: List[str], levels: List[str], prerequisites: List[Tuple[str, ...]],
+                 durations: List[int], reachable: List[bool], report: Dict):
+        self.fingerprint = fingerprint
+        self.ids = ids
+        self.index = {lesson_id: i for i, lesson_id in enumerate(ids)}
+        self.levels = levels
+        self.prerequisites = prerequisites
+        self.durations = durations
+        self.reachable = reachable
+        self.report = report
+
+    @classmethod
+    def compile(cls, lessons: Iterable[Mapping], rules: RulesEngine) -> 'CompiledCurriculum':
+        lessons = list(lessons)
+        report = validate_curriculum(lessons, rules)
+        by_id = {lesson['lesson_id']: lesson for lesson in lessons}
+        ids = report['order'] + report['unreachable']
+        return cls(
+            fingerprint=curriculum_fingerprint(lessons, rules),
+            ids=ids,
+            levels=[by_id[lesson_id]['level'] for lesson_id in ids],
+            prerequisites=[tuple(by_id[lesson_id].get('prerequisites', [])) for lesson_id in ids],
+            durations=[by_id[lesson_id].get('duration_minutes') or 0 for lesson_id in ids],
+            reachable=[True] * len(report['order']) + [False] * len(report['unreachable']),
+            report=report
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'fingerprint': self.fingerprint,
+            'ids': self.ids,
+            'levels': self.levels,
+            'prerequisites': self.prerequisites,
+            'durations': self.durations,
+            'reachable': self.reachable,
+            'report': self.report
+        })
+
+    @classmethod
+    def from_json(cls, text: str) -> 'CompiledCurriculum':
+        data = json.loads(text)
+        data['prerequisites'] = [tuple(prerequisites) for prerequisites in data['prerequisites']]
+        return cls(**data)
+
+    def can_access(self, lesson_id: str, student_level: str, completed, rules: RulesEngine) -> bool:
+        """Same rule as CSPSolver.can_access_lesson, answered from the compiled graph"""
+        i = self.index.get(lesson_id)
+        if i is None or not self.reachable[i]:
+            return False
+        if not rules.level_allows(student_level, self.levels[i]):
+            return False
+        return all(prerequisite in completed for prerequisite in self.prerequisites[i])
+
+    def accessible(self, student_level: str, completed, rules: RulesEngine) -> List[str]:
+        """Accessible lesson ids in study order"""
+        completed = set(completed)
+        return [lesson_id for lesson_id in self.ids if self.can_access(lesson_id, student_level, completed, rules)]
+
+
+def describe_problems(report: Dict) -> List[str]:
+    """Human-readable lines for the errors in a validation report"""
+    problems = []
+    for cycle in report['cycles']:
+        problems.append(f"Prerequisite cycle: {' -> '.join(cycle + cycle[:1])}")
+    for lesson_id, prerequisite in report['dangling']:
+        problems.append(f"{lesson_id} requires missing lesson {prerequisite}")
+    if report['unreachable']:
+        problems.append(f"Unreachable lessons: {', '.join(report['unreachable'])}")
+    return problems
+
+
+def describe_warnings(report: Dict) -> List[str]:
+    """Human-readable lines for the warnings in a validation report"""
+    return [
+        f"{lesson_id} ({level}) requires {prerequisite} ({prerequisite_level})"
+        for lesson_id, prerequisite, level, prerequisite_level in report['level_inversions']
+    ]
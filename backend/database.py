@@ -2,14 +2,111 @@ import sqlite3
 import json
 import uuid
 import random
+import re
+
+from backend.misconceptions import buggy_answers
+from backend.models import Lesson, Question, Student
+from backend.curriculum import CompiledCurriculum, curriculum_fingerprint, describe_problems, describe_warnings
+from backend.events import append_events, project_student
+from backend.review import REVIEWS_PER_LESSON, schedule_lesson_reviews
+from backend.rules import DEFAULT_LEVEL_RULES, RULE_FIELDS, RulesEngine
+from backend.security import hash_password, needs_rehash, verify_password
+
+# Seconds a connection waits for another writer's lock before raising "database is locked"
+DB_BUSY_TIMEOUT = 30
+
+# Lesson columns every Lesson record carries; content and examples are loaded on demand
+LESSON_COLUMNS = 'lesson_id, title, level, prerequisites, duration_minutes, tags'
+
+# Full-text indexes over the catalog: index -> (content table, indexed columns, bm25 column weights)
+SEARCH_INDEXES = {
+    'lessons_fts': ('lessons', ('title', 'content', 'examples', 'tags'), (10.0, 1.0, 2.0, 5.0)),
+    'practice_questions_fts': ('practice_questions', ('question', 'hint', 'explanation'), (5.0, 1.0, 1.0)),
+    'quiz_questions_fts': ('quiz_questions', ('question', 'hint', 'explanation'), (5.0, 1.0, 1.0)),
+}
+
+# Sort orders accepted by browse_lessons; each is paired with lesson_id for a stable keyset
+BROWSE_SORT_KEYS = {
+    'level': 'level_rank',
+    'title': 'title',
+    'duration': 'duration_minutes',
+    'relevance': 'match_rank',
+}
+
+BROWSE_STATUS_FILTERS = {
+    'completed': 'completed',
+    'accessible': 'accessible AND NOT completed',
+    'locked': 'NOT accessible',
+    'quiz_passed': 'quiz_passed',
+}
+
+# Per-lesson progress for one student; parameters are (username, username)
+LESSON_PROGRESS_QUERY = '''
+    WITH student AS (
+        SELECT completed_lessons, practice_sessions FROM students WHERE username = ?
+    ),
+    done AS (
+        SELECT value AS lesson_id FROM student, json_each(student.completed_lessons)
+    ),
+    practice AS (
+        SELECT key AS lesson_id, COALESCE(json_array_length(value, '$.used_questions'), 0) AS practice_count
+        FROM student, json_each(student.practice_sessions)
+        WHERE json_type(value) = 'object'
+    ),
+    quizzes AS (
+        SELECT lesson_id, score, total_questions, passed,
+               ROW_NUMBER() OVER (PARTITION BY lesson_id ORDER BY timestamp DESC, id DESC) AS recency,
+               COUNT(*) OVER (PARTITION BY lesson_id) AS attempts,
+               MAX(score * 100.0 / NULLIF(total_questions, 0)) OVER (PARTITION BY lesson_id) AS best_percent
+        FROM quiz_results
+        WHERE username = ?
+    )
+    SELECT l.lesson_id, l.title, l.level,
+           l.lesson_id IN (SELECT lesson_id FROM done) AS completed,
+           COALESCE(q.passed, 0) AS quiz_passed,
+           q.score AS latest_score,
+           q.total_questions AS latest_total,
+           q.best_percent AS best_percent,
+           COALESCE(q.attempts, 0) AS quiz_attempts,
+           COALESCE(p.practice_count, 0) AS practice_count
+    FROM lessons l
+    CROSS JOIN student
+    LEFT JOIN quizzes q ON q.lesson_id = l.lesson_id AND q.recency = 1
+    LEFT JOIN practice p ON p.lesson_id = l.lesson_id
+'''
+
+# Leaderboard metrics -> materialized column; boards rank highest first, ties by username
+LEADERBOARD_METRICS = {
+    'performance': 'performance_score',
+    'lessons': 'lessons_completed',
+    'pass_rate': 'pass_rate',
+}
+
+# Tables the app cannot run without; checked by get_catalog_stats
+REQUIRED_TABLES = ('students', 'lessons', 'practice_questions', 'quiz_questions', 'quiz_results',
+                   'question_attempts', 'progress_events')
+
+# Every score change is one clamped UPDATE, so concurrent writers can't lose each other's updates
+CLAMPED_SCORE_UPDATE = 'MIN(100, MAX(0, COALESCE(performance_score, 0) + ?))'
+
+# Adds `?` to a JSON list column unless it is already present, inside the UPDATE itself
+JSON_SET_ADD = '''CASE WHEN EXISTS (SELECT 1 FROM json_each({column}) WHERE value = ?) THEN {column}
+    ELSE json_insert(COALESCE({column}, '[]'), '$[#]', ?) END'''
+
+# Columns that may be written by compare_and_set_student
+VERSIONED_STUDENT_COLUMNS = ('name', 'level', 'age')
+
+QUESTION_POOLS = (('practice', 'practice_questions'), ('quiz', 'quiz_questions'))
 
 class SQLiteManager:
     def __init__(self, db_path="math_its.db"):
         self.db_path = db_path
+        self._rules_engine = None
+        self._rules_rows = None
         self._init_database()
     
     def _init_database(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -25,7 +122,8 @@ class SQLiteManager:
                 completed_exercises TEXT DEFAULT '[]',
                 seen_questions TEXT DEFAULT '[]',
                 practice_sessions TEXT DEFAULT '{}',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                version INTEGER NOT NULL DEFAULT 0
             )
         ''')
         
@@ -67,6 +165,15 @@ class SQLiteManager:
                 FOREIGN KEY (lesson_id) REFERENCES lessons (lesson_id)
             )
         ''')
+
+        # No covering index on lesson metadata: SQLite would scan it in lesson_id order instead of
+        # curriculum (rowid) order, and the lessons table is small enough to scan directly
+        cursor.execute('DROP INDEX IF EXISTS idx_lessons_metadata')
+        # Covering indexes so pool counts never read question text
+        for table in ('practice_questions', 'quiz_questions'):
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_{table}_lesson ON {table} (lesson_id, difficulty)
+            ''')
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS quiz_results (
@@ -80,8 +187,80 @@ class SQLiteManager:
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        
+
+        # Per-question attempt log used to calibrate item difficulty
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_attempts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL,
+                lesson_id TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                question_type TEXT NOT NULL,
+                correct BOOLEAN NOT NULL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_question_attempts_lesson
+            ON question_attempts (question_type, lesson_id, question_id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_question_attempts_student
+            ON question_attempts (username, lesson_id)
+        ''')
+
+        # Wrong answers produced by known buggy rules, precomputed per question
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_misconceptions (
+                question_id TEXT NOT NULL,
+                answer_key TEXT NOT NULL,
+                misconception TEXT NOT NULL,
+                PRIMARY KEY (question_id, answer_key)
+            )
+        ''')
+
+        # Validated prerequisite graph, recompiled whenever the lesson metadata changes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS curriculum_graph (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                fingerprint TEXT NOT NULL,
+                artifact TEXT NOT NULL,
+                compiled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Cached dashboard totals per student, refreshed whenever their progress is written
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_progress_summary (
+                username TEXT PRIMARY KEY,
+                total_lessons INTEGER NOT NULL,
+                completed_lessons INTEGER NOT NULL,
+                quizzes_passed INTEGER NOT NULL,
+                quiz_attempts INTEGER NOT NULL,
+                practice_count INTEGER NOT NULL,
+                average_best_score REAL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Every total depends on the lesson set, so any change to it (seeding, imports, direct SQL)
+        # drops the cached rows; get_progress_totals recomputes each on its student's next read
+        for event in ('INSERT', 'DELETE', 'UPDATE OF lesson_id'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS progress_summary_lessons_{event.split()[0].lower()}
+                AFTER {event} ON lessons BEGIN
+                    DELETE FROM student_progress_summary;
+                END
+            ''')
+
+        self._init_search_indexes(cursor)
+        self._init_student_versions(cursor)
+        self._init_leaderboard(cursor)
+        self._init_level_rules(cursor)
+        self._init_event_log(cursor)
         self._init_sample_data(cursor)
+        self._init_reviews(cursor)
+        self._init_misconceptions(cursor)
+        self._compile_curriculum(cursor)
         conn.commit()
         conn.close()
     
@@ -544,8 +723,467 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
                 quiz_questions
             )
         
+    def _init_student_versions(self, cursor):
+        """Add the optimistic-concurrency counter to students tables created before it existed"""
+        cursor.execute('PRAGMA table_info(students)')
+        if 'version' not in {column[1] for column in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE students ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+    def _init_search_indexes(self, cursor):
+        """FTS5 indexes over lessons and questions, kept in sync with their tables by triggers"""
+        for index, (table, columns, _) in SEARCH_INDEXES.items():
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (index,))
+            existed = cursor.fetchone() is not None
+
+            column_list = ', '.join(columns)
+            new_values = ', '.join(f'new.{column}' for column in columns)
+            old_values = ', '.join(f'old.{column}' for column in columns)
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {index}
+                USING fts5({column_list}, content='{table}', tokenize='porter unicode61')
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {index} (rowid, {column_list}) VALUES (new.rowid, {new_values});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {index} ({index}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE ON {table} BEGIN
+                    INSERT INTO {index} ({index}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values});
+                    INSERT INTO {index} (rowid, {column_list}) VALUES (new.rowid, {new_values});
+                END
+            ''')
+
+            # Index rows that predate the index
+            if not existed:
+                cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+    def _init_leaderboard(self, cursor):
+        """Materialized per-student ranking metrics, maintained by triggers on students and quiz_results"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leaderboard'")
+        existed = cursor.fetchone() is not None
+
+        # `seq` increases on every change so in-memory rankings can catch up incrementally
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard (
+                username TEXT PRIMARY KEY,
+                name TEXT,
+                level TEXT,
+                performance_score INTEGER NOT NULL DEFAULT 0,
+                lessons_completed INTEGER NOT NULL DEFAULT 0,
+                quiz_attempts INTEGER NOT NULL DEFAULT 0,
+                quizzes_passed INTEGER NOT NULL DEFAULT 0,
+                pass_rate REAL,
+                active BOOLEAN NOT NULL DEFAULT 1,
+                seq INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        for metric, column in LEADERBOARD_METRICS.items():
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_leaderboard_{metric}
+                ON leaderboard (active, {column} DESC, username)
+            ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_leaderboard_seq ON leaderboard (seq)')
+
+        next_seq = '(SELECT COALESCE(MAX(seq), 0) + 1 FROM leaderboard)'
+        lessons_completed = (
+            "CASE WHEN json_valid(new.completed_lessons) THEN json_array_length(new.completed_lessons) ELSE 0 END"
+        )
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_student_insert AFTER INSERT ON students BEGIN
+                INSERT OR REPLACE INTO leaderboard
+                    (username, name, level, performance_score, lessons_completed, quiz_attempts, quizzes_passed,
+                     pass_rate, active, seq)
+                VALUES (new.username, new.name, new.level, COALESCE(new.performance_score, 0),
+                        {lessons_completed}, 0, 0, NULL, 1, {next_seq});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_student_update
+            AFTER UPDATE OF name, level, performance_score, completed_lessons ON students BEGIN
+                UPDATE leaderboard
+                SET name = new.name, level = new.level, performance_score = COALESCE(new.performance_score, 0),
+                    lessons_completed = {lessons_completed}, seq = {next_seq}
+                WHERE username = new.username;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_student_delete AFTER DELETE ON students BEGIN
+                UPDATE leaderboard SET active = 0, seq = {next_seq} WHERE username = old.username;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_quiz_insert AFTER INSERT ON quiz_results BEGIN
+                UPDATE leaderboard
+                SET quiz_attempts = quiz_attempts + 1,
+                    quizzes_passed = quizzes_passed + (new.passed != 0),
+                    pass_rate = (quizzes_passed + (new.passed != 0)) * 1.0 / (quiz_attempts + 1),
+                    seq = {next_seq}
+                WHERE username = new.username;
+            END
+        ''')
+
+        # Materialize students that predate the table
+        if not existed:
+            cursor.execute('''
+                INSERT INTO leaderboard
+                    (username, name, level, performance_score, lessons_completed, quiz_attempts, quizzes_passed,
+                     pass_rate, active, seq)
+                SELECT s.username, s.name, s.level, COALESCE(s.performance_score, 0),
+                       CASE WHEN json_valid(s.completed_lessons) THEN json_array_length(s.completed_lessons) ELSE 0 END,
+                       COALESCE(q.attempts, 0), COALESCE(q.passed, 0),
+                       q.passed * 1.0 / q.attempts, 1, ROW_NUMBER() OVER (ORDER BY s.username)
+                FROM students s
+                LEFT JOIN (
+                    SELECT username, COUNT(*) AS attempts, SUM(passed != 0) AS passed
+                    FROM quiz_results GROUP BY username
+                ) q ON q.username = s.username
+            ''')
+
+    def _init_level_rules(self, cursor):
+        """Level progression rules, one row per level; compiled by get_rules_engine"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS level_rules (
+                level TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                next_level TEXT,
+                min_lessons INTEGER NOT NULL DEFAULT 0,
+                min_score REAL NOT NULL DEFAULT 0,
+                required_lessons TEXT NOT NULL DEFAULT '[]',
+                target_score REAL,
+                description TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("SELECT COUNT(*) FROM level_rules")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany('''
+                INSERT INTO level_rules
+                    (level, position, next_level, min_lessons, min_score, required_lessons, target_score, description)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(rule['level'], position, rule['next_level'], rule['min_lessons'], rule['min_score'],
+                   json.dumps(rule['required_lessons']), rule['target_score'], rule['description'])
+                  for position, rule in enumerate(DEFAULT_LEVEL_RULES)])
+
+    def _read_level_rules(self, cursor):
+        cursor.execute('''
+            SELECT level, next_level, min_lessons, min_score, required_lessons, target_score, description
+            FROM level_rules ORDER BY position
+        ''')
+        return [{'level': row[0], 'next_level': row[1], 'min_lessons': row[2], 'min_score': row[3],
+                 'required_lessons': json.loads(row[4]), 'target_score': row[5], 'description': row[6]}
+                for row in cursor.fetchall()]
+
+    def get_level_rules(self):
+        """Progression rules in level order"""
+        conn = self.get_connection()
+        rules = self._read_level_rules(conn.cursor())
+        conn.close()
+        return rules
+
+    def get_rules_engine(self, refresh=False):
+        """Compiled progression rules, recompiled whenever the level_rules rows change.
+
+        The rows are re-read on every call, which is cheap for a handful of
+        levels, so direct edits to the table are picked up too. The engine
+        object only changes when the rules do, so callers can memoize on it.
+        """
+        rows = self.get_level_rules()
+        if self._rules_engine is None or refresh or rows != self._rules_rows:
+            try:
+                engine = RulesEngine(rows)
+            except ValueError as e:
+                if self._rules_engine is None:
+                    raise
+                # A hand edit that doesn't compile; keep the last good rules rather than failing every request
+                print(f"⚠️  Level rules not reloaded: {e}")
+                self._rules_rows = rows
+                return self._rules_engine
+            self._rules_engine = engine
+            self._rules_rows = rows
+        return self._rules_engine
+
+    def set_level_rule(self, level, **fields):
+        """Create or change the rule for a level; rejected if the resulting rule set doesn't compile"""
+        unknown = set(fields) - set(RULE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown level rule fields: {', '.join(sorted(unknown))}")
+        if 'required_lessons' in fields:
+            fields['required_lessons'] = json.dumps(list(fields['required_lessons'] or []))
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                INSERT OR IGNORE INTO level_rules (level, position)
+                SELECT ?, COALESCE(MAX(position), -1) + 1 FROM level_rules
+            ''', (level,))
+            if fields:
+                assignments = ', '.join(f"{column} = ?" for column in fields)
+                cursor.execute(f'''
+                    UPDATE level_rules SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE level = ?
+                ''', list(fields.values()) + [level])
+            rows = self._read_level_rules(cursor)
+            engine = RulesEngine(rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        self._rules_engine = engine
+        self._rules_rows = rows
+        return engine
+
+    def reevaluate_levels(self, rules=None):
+        """Promote every student the rules say has earned it, set-based in SQL.
+
+        Each pass is one UPDATE moving all eligible students up a level and
+        logging a level_changed event for each; passes repeat until nobody
+        moves, so a lowered threshold can carry a student several levels.
+        Promoted students' projections and progress summaries are then
+        brought up to date, as _record_events would for a single change.
+        Students are never demoted. Returns the number of promotions.
+        """
+        rules = rules or self.get_rules_engine()
+        compiled = rules.promotion_sql()
+        if not compiled:
+            return 0
+        new_level, case_params, where, where_params = compiled
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        promoted = 0
+        usernames = set()
+        for _ in range(len(rules.rules)):
+            cursor.execute(f'''
+                INSERT INTO progress_events (username, event_type, payload)
+                SELECT username, 'level_changed', json_object('level', {new_level}, 'previous', level, 'reason', 'rules')
+                FROM students WHERE {where}
+                ORDER BY username
+            ''', case_params + where_params)
+            if cursor.rowcount == 0:
+                break
+            cursor.execute(f'''
+                UPDATE students SET level = {new_level}, version = version + 1
+                WHERE {where}
+                RETURNING username
+            ''', case_params + where_params)
+            moved = [row[0] for row in cursor.fetchall()]
+            promoted += len(moved)
+            usernames.update(moved)
+        for username in sorted(usernames):
+            project_student(cursor, username, rules)
+            self._refresh_progress_summary(cursor, username)
+        conn.commit()
+        conn.close()
+        return promoted
+
+    def _init_event_log(self, cursor):
+        """Append-only progress history and the per-student projection folded from it"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'progress_events'")
+        existed = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS progress_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_progress_events_student ON progress_events (username, seq)')
+        for action in ('UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS progress_events_no_{action.lower()} BEFORE {action} ON progress_events
+                BEGIN
+                    SELECT RAISE(ABORT, 'progress_events is append-only');
+                END
+            ''')
+
+        # `last_seq` is the newest event folded into the row; projections catch up from there
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_projections (
+                username TEXT PRIMARY KEY,
+                level TEXT NOT NULL,
+                completed_lessons TEXT NOT NULL DEFAULT '[]',
+                performance_score REAL NOT NULL DEFAULT 0,
+                quiz_attempts INTEGER NOT NULL DEFAULT 0,
+                quizzes_passed INTEGER NOT NULL DEFAULT 0,
+                practice_answered INTEGER NOT NULL DEFAULT 0,
+                practice_correct INTEGER NOT NULL DEFAULT 0,
+                last_seq INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS projection_checkpoints (
+                projection TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                events_applied INTEGER NOT NULL,
+                completed BOOLEAN NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Seed the log for databases that predate it: quiz history, then each student's current state
+        if not existed:
+            cursor.execute('''
+                INSERT INTO progress_events (username, event_type, payload, created_at)
+                SELECT username, 'quiz_submitted',
+                       json_object('lesson_id', lesson_id, 'score', score, 'total_questions', total_questions,
+                                   'passed', CASE WHEN passed THEN json('true') ELSE json('false') END),
+                       timestamp
+                FROM quiz_results ORDER BY id
+            ''')
+            cursor.execute('''
+                INSERT INTO progress_events (username, event_type, payload, created_at)
+                SELECT username, 'student_enrolled',
+                       json_object('level', level, 'performance_score', COALESCE(performance_score, 0),
+                                   'completed_lessons',
+                                   json(CASE WHEN json_valid(completed_lessons) THEN completed_lessons ELSE '[]' END)),
+                       COALESCE(created_at, CURRENT_TIMESTAMP)
+                FROM students ORDER BY rowid
+            ''')
+
+    def _record_events(self, cursor, events):
+        """Append events and fold them into the affected students' projections, in the caller's transaction"""
+        append_events(cursor, events)
+        rules = self.get_rules_engine()
+        for username in dict.fromkeys(username for username, _, _ in events):
+            project_student(cursor, username, rules)
+
+    def _init_reviews(self, cursor):
+        """Spaced-repetition schedule per (student, practice question)"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'review_items'")
+        existed = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_items (
+                username TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                lesson_id TEXT NOT NULL,
+                easiness REAL NOT NULL DEFAULT 2.5,
+                interval_days REAL NOT NULL DEFAULT 0,
+                repetitions INTEGER NOT NULL DEFAULT 0,
+                lapses INTEGER NOT NULL DEFAULT 0,
+                due_at TIMESTAMP NOT NULL,
+                last_reviewed_at TIMESTAMP,
+                PRIMARY KEY (username, question_id)
+            )
+        ''')
+        # "What's due now" is a range scan on this index
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_items_due ON review_items (username, due_at)')
+
+        if not existed:
+            self._schedule_completed_reviews(cursor)
+
+    def _schedule_completed_reviews(self, cursor, usernames=None):
+        """Enroll lessons completed outside the normal flow (earlier data, roster imports); they are due straight away"""
+        student_filter = 'WHERE s.username IN (SELECT value FROM json_each(?))' if usernames is not None else ''
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO review_items (username, question_id, lesson_id, due_at)
+            SELECT username, question_id, lesson_id, CURRENT_TIMESTAMP FROM (
+                SELECT s.username, q.question_id, q.lesson_id,
+                       ROW_NUMBER() OVER (PARTITION BY s.username, q.lesson_id ORDER BY q.question_id) AS n
+                FROM students s
+                JOIN json_each(CASE WHEN json_valid(s.completed_lessons) THEN s.completed_lessons ELSE '[]' END) l
+                JOIN practice_questions q ON q.lesson_id = l.value
+                {student_filter}
+            )
+            WHERE n <= ?
+        ''', ([json.dumps(list(usernames))] if usernames is not None else []) + [REVIEWS_PER_LESSON])
+
+    def _init_misconceptions(self, cursor):
+        cursor.execute("SELECT COUNT(*) FROM question_misconceptions")
+        if cursor.fetchone()[0] == 0:
+            self._build_misconceptions(cursor)
+
+    def _build_misconceptions(self, cursor):
+        rows = []
+        for table in ('practice_questions', 'quiz_questions'):
+            cursor.execute(f'SELECT question_id, question, answer FROM {table}')
+            for question_id, question, answer in cursor.fetchall():
+                rows.extend((question_id, key, misconception)
+                            for key, misconception in buggy_answers(question, answer).items())
+        cursor.executemany(
+            'INSERT OR REPLACE INTO question_misconceptions (question_id, answer_key, misconception) VALUES (?,?,?)',
+            rows
+        )
+        return len(rows)
+
+    def rebuild_misconceptions(self):
+        """Recompute the misconception table after the question bank changes"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM question_misconceptions')
+        count = self._build_misconceptions(cursor)
+        conn.commit()
+        conn.close()
+        print(f"🧩 Precomputed {count} misconception answers")
+        return count
+
+    def get_misconception_map(self):
+        """Get {question_id: {answer_key: misconception}} for every question"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT question_id, answer_key, misconception FROM question_misconceptions')
+
+        answers = {}
+        for question_id, key, misconception in cursor.fetchall():
+            answers.setdefault(question_id, {})[key] = misconception
+        conn.close()
+        return answers
+
+    def _compile_curriculum(self, cursor, force=False):
+        """Validate the prerequisite graph and store the compiled artifact if the lessons changed"""
+        cursor.execute(f'SELECT {LESSON_COLUMNS} FROM lessons ORDER BY rowid')
+        lessons = [self._lesson_from_row(row) for row in cursor.fetchall()]
+        # Read through this cursor: during _init_database the rules aren't committed yet
+        rules = RulesEngine(self._read_level_rules(cursor))
+        fingerprint = curriculum_fingerprint(lessons, rules)
+
+        cursor.execute('SELECT fingerprint, artifact FROM curriculum_graph WHERE id = 1')
+        row = cursor.fetchone()
+        if row and row[0] == fingerprint and not force:
+            return CompiledCurriculum.from_json(row[1])
+
+        compiled = CompiledCurriculum.compile(lessons, rules)
+        cursor.execute('''
+            INSERT OR REPLACE INTO curriculum_graph (id, fingerprint, artifact, compiled_at)
+            VALUES (1, ?, ?, CURRENT_TIMESTAMP)
+        ''', (compiled.fingerprint, compiled.to_json()))
+        for problem in describe_problems(compiled.report):
+            print(f"❌ Curriculum: {problem}")
+        for warning in describe_warnings(compiled.report):
+            print(f"⚠️  Curriculum: {warning}")
+        return compiled
+
+    def rebuild_curriculum_graph(self):
+        """Revalidate and recompile the curriculum graph, e.g. after importing lessons"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        compiled = self._compile_curriculum(cursor, force=True)
+        conn.commit()
+        conn.close()
+        return compiled
+
+    def get_compiled_curriculum(self):
+        """The stored curriculum graph, recompiled first if the lessons changed since"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        compiled = self._compile_curriculum(cursor)
+        conn.commit()
+        conn.close()
+        return compiled
+
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        return sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT)
     
     def add_student(self, name, level, username, age=15, password=""):
         """Add a new student with password"""
@@ -556,12 +1194,68 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
         cursor.execute('''
             INSERT INTO students (student_id, name, username, password, level, age, performance_score, completed_lessons, completed_exercises, seen_questions, practice_sessions) 
             VALUES (?,?,?,?,?,?,?,?,?,?,?)
-        ''', (student_id, name, username, password, level, age, 0, '[]', '[]', '[]', '{}'))
+        ''', (student_id, name, username, hash_password(password), level, age, 0, '[]', '[]', '[]', '{}'))
+        self._record_events(cursor, [(username, 'student_enrolled', {'level': level, 'completed_lessons': []})])
         
         conn.commit()
         conn.close()
         return student_id
 
+    def add_students(self, students, chunk_size=5000):
+        """Insert many students in one transaction, skipping usernames that already exist.
+
+        `students` is an iterable of dicts with name, username, password
+        (already hashed), level, age and completed_lessons. Returns
+        (imported, conflicts) where conflicts lists the skipped usernames.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        imported = 0
+        conflicts = []
+
+        try:
+            chunk = []
+            for student in students:
+                chunk.append(student)
+                if len(chunk) >= chunk_size:
+                    imported += self._insert_student_chunk(cursor, chunk, conflicts)
+                    chunk = []
+            if chunk:
+                imported += self._insert_student_chunk(cursor, chunk, conflicts)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return imported, conflicts
+
+    def _insert_student_chunk(self, cursor, chunk, conflicts):
+        cursor.execute('''
+            SELECT username FROM students WHERE username IN (SELECT value FROM json_each(?))
+        ''', (json.dumps([student['username'] for student in chunk]),))
+        existing = {row[0] for row in cursor.fetchall()}
+
+        rows = []
+        for student in chunk:
+            if student['username'] in existing:
+                conflicts.append(student['username'])
+                continue
+            existing.add(student['username'])
+            rows.append((str(uuid.uuid4()), student['name'], student['username'], student['password'],
+                         student.get('level', 'beginner'), student.get('age', 15), 0,
+                         json.dumps(student.get('completed_lessons', [])), '[]', '[]', '{}'))
+
+        cursor.executemany('''
+            INSERT INTO students (student_id, name, username, password, level, age, performance_score, completed_lessons, completed_exercises, seen_questions, practice_sessions)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?)
+        ''', rows)
+        # Projections for imported students are built on their first read or write
+        append_events(cursor, [(row[2], 'student_enrolled', {'level': row[4], 'completed_lessons': json.loads(row[7])})
+                               for row in rows])
+        self._schedule_completed_reviews(cursor, [row[2] for row in rows if row[7] != '[]'])
+        return len(rows)
+
     def get_student(self, username):
         """Get student by username with password"""
         conn = self.get_connection()
@@ -571,7 +1265,9 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
         conn.close()
         if not row: 
             return None
-        
+        return self._student_from_row(row)
+
+    def _student_from_row(self, row):
         # Parse practice_sessions if it exists, otherwise use empty dict
         practice_sessions = {}
         if len(row) > 10:  
@@ -580,147 +1276,508 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
             except:
                 practice_sessions = {}
         
-        return {
-            'student_id': row[0], 
-            'name': row[1], 
-            'username': row[2], 
-            'password': row[3],
-            'level': row[4], 
-            'age': row[5], 
-            'performance_score': row[6], 
-            'completed_lessons': json.loads(row[7]) if row[7] else [],
-            'completed_exercises': json.loads(row[8]) if row[8] else [],
-            'seen_questions': json.loads(row[9]) if row[9] else [],
-            'practice_sessions': practice_sessions
-        }
+        return Student(
+            student_id=row[0],
+            name=row[1],
+            username=row[2],
+            password=row[3],
+            level=row[4],
+            age=row[5],
+            performance_score=row[6],
+            completed_lessons=json.loads(row[7]) if row[7] else [],
+            completed_exercises=json.loads(row[8]) if row[8] else [],
+            seen_questions=json.loads(row[9]) if row[9] else [],
+            practice_sessions=practice_sessions,
+            version=row[12] if len(row) > 12 else 0
+        )
+
+    def get_students_progress(self, usernames=None):
+        """Get level and completed lessons for many students in one query (all students by default)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if usernames is None:
+            cursor.execute('SELECT username, level, performance_score, completed_lessons FROM students')
+        else:
+            # Usernames travel as one JSON array so the class size is not bound by SQLite's parameter limit
+            cursor.execute('''
+                SELECT username, level, performance_score, completed_lessons
+                FROM students
+                WHERE username IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(list(usernames)),))
+
+        students = []
+        for row in cursor.fetchall():
+            students.append({
+                'username': row[0],
+                'level': row[1],
+                'performance_score': row[2],
+                'completed_lessons': json.loads(row[3]) if row[3] else []
+            })
+
+        conn.close()
+        return students
+
+    def authenticate_student(self, username, password):
+        """Check a login with one lookup and return the student, or None.
+
+        Plaintext and outdated hashes are rehashed on a successful login.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM students WHERE username = ?', (username,))
+        row = cursor.fetchone()
+        if not row or not verify_password(password, row[3]):
+            conn.close()
+            return None
+        
+        student = self._student_from_row(row)
+        if needs_rehash(row[3]):
+            student.password = hash_password(password)
+            cursor.execute('UPDATE students SET password = ? WHERE username = ? AND password = ?',
+                           (student.password, username, row[3]))
+            conn.commit()
+        conn.close()
+        return student
 
     def verify_student_password(self, username, password):
         """Verify student username and password"""
-        student = self.get_student(username)
-        if not student:
-            return False
-        return student['password'] == password
+        return self.authenticate_student(username, password) is not None
 
     def update_student_progress(self, username, completed_lesson=None, completed_exercise=None, correct=None):
         """Update student progress - automatically mark lessons as complete"""
+        updates, params = [], []
+        
+        if completed_lesson:
+            updates.append(f"completed_lessons = {JSON_SET_ADD.format(column='completed_lessons')}")
+            params.extend([completed_lesson, completed_lesson])
+        
+        if completed_exercise:
+            updates.append(f"completed_exercises = {JSON_SET_ADD.format(column='completed_exercises')}")
+            params.extend([completed_exercise, completed_exercise])
+        
+        if correct is not None:
+            delta = 6 if correct else -3
+            updates.append(f"performance_score = {CLAMPED_SCORE_UPDATE}")
+            params.append(delta)
+        
+        if not updates:
+            return
+        
+        # One atomic statement; the new score comes back without a second read
         conn = self.get_connection()
         cursor = conn.cursor()
-        student = self.get_student(username)
-        if not student: 
-            conn.close()
+        cursor.execute(f'''
+            UPDATE students SET {', '.join(updates)}, version = version + 1
+            WHERE username = ?
+            RETURNING performance_score
+        ''', params + [username])
+        row = cursor.fetchone()
+        if row:
+            self._refresh_progress_summary(cursor, username)
+            events = []
+            if completed_lesson:
+                events.append((username, 'lesson_completed', {'lesson_id': completed_lesson}))
+                schedule_lesson_reviews(cursor, username, completed_lesson)
+            # Answers are counted by record_question_attempts; only the score change is logged here
+            if correct is not None:
+                events.append((username, 'score_adjusted', {'exercise_id': completed_exercise, 'delta': delta}))
+            if events:
+                self._record_events(cursor, events)
+        conn.commit()
+        conn.close()
+        if not row:
             return
         
-        updates, params = [], []
-        
         if completed_lesson:
-            lessons = set(student.get('completed_lessons', []))
-            lessons.add(completed_lesson)
-            updates.append("completed_lessons = ?")
-            params.append(json.dumps(list(lessons)))
             print(f"✅ Lesson automatically completed: {completed_lesson} for {username}")
-        
         if completed_exercise:
-            exercises = set(student.get('completed_exercises', []))
-            exercises.add(completed_exercise)
-            updates.append("completed_exercises = ?")
-            params.append(json.dumps(list(exercises)))
             print(f"✅ Exercise completed: {completed_exercise} for {username}")
-        
         if correct is not None:
-            current = student.get('performance_score', 0)
-            if correct:
-                new_score = min(100, current + 6) 
-            else:
-                new_score = max(0, current - 3) 
-            updates.append("performance_score = ?")
-            params.append(new_score)
-            print(f"📈 Performance update: {current}% -> {new_score}% for {username}")
-        
-        if updates:
-            query = f"UPDATE students SET {', '.join(updates)} WHERE username = ?"
-            params.append(username)
-            cursor.execute(query, params)
+            print(f"📈 Performance update: {delta:+d} -> {row[0]}% for {username}")
+    
+    def adjust_performance_score(self, username, delta):
+        """Atomically add `delta` to a student's score, clamped to 0-100; returns (new score, version) or None"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE students SET performance_score = {CLAMPED_SCORE_UPDATE}, version = version + 1
+            WHERE username = ?
+            RETURNING performance_score, version
+        ''', (delta, username))
+        row = cursor.fetchone()
+        conn.commit()
+        conn.close()
+        return tuple(row) if row else None
+    
+    def compare_and_set_student(self, username, expected_version, **fields):
+        """Write values computed from a read of the student, only if nobody changed it since.
         
+        Returns the new version, or None when the row's version no longer matches
+        and the caller should re-read and retry.
+        """
+        unknown = set(fields) - set(VERSIONED_STUDENT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot compare-and-set students columns: {', '.join(sorted(unknown))}")
+        assignments = ''.join(f"{column} = ?, " for column in fields)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE students SET {assignments}version = version + 1
+            WHERE username = ? AND version = ?
+            RETURNING version
+        ''', list(fields.values()) + [username, expected_version])
+        row = cursor.fetchone()
+        if row and 'level' in fields:
+            self._record_events(cursor, [(username, 'level_changed', {'level': fields['level']})])
         conn.commit()
         conn.close()
+        return row[0] if row else None
     
     def get_lesson(self, lesson_id):
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM lessons WHERE lesson_id = ?', (lesson_id,))
+        cursor.execute(f'SELECT {LESSON_COLUMNS}, content, examples FROM lessons WHERE lesson_id = ?', (lesson_id,))
         row = cursor.fetchone()
         conn.close()
         if not row: 
             return None
-        return {
-            'lesson_id': row[0], 'title': row[1], 'level': row[2], 'prerequisites': json.loads(row[3]),
-            'content': row[4], 'duration_minutes': row[5], 'examples': json.loads(row[6]), 'tags': json.loads(row[7])
-        }
+        return self._lesson_from_row(row, content=row[6], examples=json.loads(row[7]))
     
     def get_lessons_by_level(self, level):
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM lessons WHERE level = ?', (level,))
-        lessons = []
-        for row in cursor.fetchall():
-            lessons.append({
-                'lesson_id': row[0], 'title': row[1], 'level': row[2], 'prerequisites': json.loads(row[3]),
-                'content': row[4], 'duration_minutes': row[5], 'examples': json.loads(row[6]), 'tags': json.loads(row[7])
-            })
+        cursor.execute(f'SELECT {LESSON_COLUMNS} FROM lessons WHERE level = ? ORDER BY rowid', (level,))
+        lessons = [self._lesson_from_row(row) for row in cursor.fetchall()]
         conn.close()
         return lessons
     
     def get_all_lessons(self):
+        """All lessons without their content and examples, which load on first access"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {LESSON_COLUMNS} FROM lessons ORDER BY rowid')
+        lessons = [self._lesson_from_row(row) for row in cursor.fetchall()]
+        conn.close()
+        return lessons
+
+    def _lesson_from_row(self, row, **loaded):
+        return Lesson(
+            lesson_id=row[0], title=row[1], level=row[2], prerequisites=json.loads(row[3]),
+            duration_minutes=row[4], tags=json.loads(row[5]), loader=self.get_lesson_content, **loaded
+        )
+
+    def get_lesson_metadata(self, lesson_id):
+        """Lesson without content or examples, for access checks and lists"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {LESSON_COLUMNS} FROM lessons WHERE lesson_id = ?', (lesson_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return self._lesson_from_row(row) if row else None
+
+    def get_lesson_index(self):
+        """lesson_id -> metadata-only Lesson, read from the covering index"""
+        return {lesson.lesson_id: lesson for lesson in self.get_all_lessons()}
+
+    def count_lessons(self, level=None):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        if level:
+            cursor.execute('SELECT COUNT(*) FROM lessons WHERE level = ?', (level,))
+        else:
+            cursor.execute('SELECT COUNT(*) FROM lessons')
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+    def get_question_counts(self):
+        """{lesson_id: {'practice': n, 'quiz': n}} for every lesson, grouped on the lesson_id indexes"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT lesson_id FROM lessons ORDER BY lesson_id')
+        counts = {row[0]: {'practice': 0, 'quiz': 0} for row in cursor.fetchall()}
+        for kind, table in (('practice', 'practice_questions'), ('quiz', 'quiz_questions')):
+            cursor.execute(f'SELECT lesson_id, COUNT(*) FROM {table} GROUP BY lesson_id')
+            for lesson_id, count in cursor.fetchall():
+                counts.setdefault(lesson_id, {'practice': 0, 'quiz': 0})[kind] = count
+        conn.close()
+        return counts
+
+    def get_catalog_stats(self):
+        """Question pool sizes per lesson plus catalog integrity checks, in a handful of aggregate queries.
+
+        Returns {'lessons': [{lesson_id, title, level, practice, quiz, difficulty}],
+        'totals', 'orphan_questions', 'curriculum', 'missing_tables'} where
+        'curriculum' is the prerequisite graph's validation report.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        existing_tables = {row[0] for row in cursor.fetchall()}
+        missing_tables = [table for table in REQUIRED_TABLES if table not in existing_tables]
+
+        cursor.execute('SELECT lesson_id, title, level FROM lessons ORDER BY lesson_id')
+        lessons = {}
+        for lesson_id, title, level in cursor.fetchall():
+            lessons[lesson_id] = {
+                'lesson_id': lesson_id, 'title': title, 'level': level, 'practice': 0, 'quiz': 0,
+                'difficulty': {kind: {} for kind, _ in QUESTION_POOLS}
+            }
+
+        # Pool sizes by difficulty, straight off the (lesson_id, difficulty) indexes
+        cursor.execute(' UNION ALL '.join(
+            f"SELECT '{kind}', lesson_id, COALESCE(difficulty, 'medium'), COUNT(*) FROM {table} GROUP BY lesson_id, difficulty"
+            for kind, table in QUESTION_POOLS
+        ))
+        for kind, lesson_id, difficulty, count in cursor.fetchall():
+            lesson = lessons.get(lesson_id)
+            if lesson:
+                lesson[kind] += count
+                lesson['difficulty'][kind][difficulty] = lesson['difficulty'][kind].get(difficulty, 0) + count
+
+        cursor.execute(' UNION ALL '.join(
+            f'''SELECT '{kind}', question_id, lesson_id FROM {table} q
+                WHERE NOT EXISTS (SELECT 1 FROM lessons l WHERE l.lesson_id = q.lesson_id)'''
+            for kind, table in QUESTION_POOLS
+        ))
+        orphan_questions = cursor.fetchall()
+
+        compiled = self._compile_curriculum(cursor)
+        conn.commit()
+        conn.close()
+
+        rows = list(lessons.values())
+        return {
+            'lessons': rows,
+            'totals': {
+                'lessons': len(rows),
+                'practice': sum(lesson['practice'] for lesson in rows),
+                'quiz': sum(lesson['quiz'] for lesson in rows)
+            },
+            'orphan_questions': orphan_questions,
+            'curriculum': compiled.report,
+            'missing_tables': missing_tables
+        }
+
+    def get_lesson_content(self, lesson_id):
+        """(content, examples) for a lesson; the heavy fields Lesson loads lazily"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM lessons')
+        cursor.execute('SELECT content, examples FROM lessons WHERE lesson_id = ?', (lesson_id,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row:
+            return '', []
+        return row[0], json.loads(row[1]) if row[1] else []
+
+    def browse_lessons(self, username, level=None, status=None, sort='level', after=None, limit=20,
+                       lesson_ids=None):
+        """One page of lessons with the student's status, computed in a single query.
+
+        `status` is one of BROWSE_STATUS_FILTERS, `sort` one of BROWSE_SORT_KEYS.
+        Pass the returned 'next_cursor' back as `after` for the following page.
+        `lesson_ids` restricts the page to those lessons; with sort='relevance'
+        they keep the order given.
+        """
+        if sort not in BROWSE_SORT_KEYS or (sort == 'relevance' and lesson_ids is None):
+            sort = 'level'
+        sort_column = BROWSE_SORT_KEYS[sort]
+
+        rules = self.get_rules_engine()
+        lesson_rank, lesson_rank_params = rules.rank_sql('l.level')
+        # Same check as CompiledCurriculum.can_access and the planner, lookahead included
+        level_open, level_open_params = rules.level_allows_sql('student.level', 'l.level')
+        params = [username, username] + lesson_rank_params + level_open_params
+        if lesson_ids is not None:
+            match_join = 'JOIN json_each(?) m ON m.value = l.lesson_id'
+            match_rank = 'm.key'
+            params.append(json.dumps(list(lesson_ids)))
+        else:
+            match_join = ''
+            match_rank = '0'
+
+        filters = []
+        if level:
+            filters.append('level = ?')
+            params.append(level)
+        if status in BROWSE_STATUS_FILTERS:
+            filters.append(BROWSE_STATUS_FILTERS[status])
+
+        keyset = ''
+        if after:
+            last_value, last_lesson_id = json.loads(after)
+            keyset = f'WHERE ({sort_column}, lesson_id) > (?, ?)'
+            params.extend([last_value, last_lesson_id])
+        # One extra row tells whether another page follows
+        params.append(limit + 1)
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            WITH student AS (
+                SELECT level, completed_lessons FROM students WHERE username = ?
+            ),
+            done AS (
+                SELECT value AS lesson_id FROM student, json_each(student.completed_lessons)
+            ),
+            passed AS (
+                -- Latest attempt per lesson, the same rule as has_passed_quiz and the dashboard
+                SELECT lesson_id FROM (
+                    SELECT lesson_id, passed,
+                           ROW_NUMBER() OVER (PARTITION BY lesson_id ORDER BY timestamp DESC, id DESC) AS recency
+                    FROM quiz_results
+                    WHERE username = ?
+                )
+                WHERE recency = 1 AND passed = 1
+            ),
+            browse AS (
+                SELECT l.lesson_id, l.title, l.level, l.prerequisites, l.duration_minutes, l.tags,
+                       {lesson_rank} AS level_rank,
+                       {match_rank} AS match_rank,
+                       l.lesson_id IN (SELECT lesson_id FROM done) AS completed,
+                       l.lesson_id IN (SELECT lesson_id FROM passed) AS quiz_passed,
+                       ({level_open}
+                        AND NOT EXISTS (
+                            SELECT 1 FROM json_each(l.prerequisites) p
+                            WHERE p.value NOT IN (SELECT lesson_id FROM done)
+                        )) AS accessible
+                FROM lessons l
+                CROSS JOIN student
+                {match_join}
+            ),
+            filtered AS (
+                SELECT *, COUNT(*) OVER () AS total
+                FROM browse
+                {'WHERE ' + ' AND '.join(filters) if filters else ''}
+            )
+            SELECT lesson_id, title, level, prerequisites, duration_minutes, tags,
+                   completed, accessible, quiz_passed, total, {sort_column}
+            FROM filtered
+            {keyset}
+            ORDER BY {sort_column}, lesson_id
+            LIMIT ?
+        ''', params)
+        rows = cursor.fetchall()
+        conn.close()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         lessons = []
-        for row in cursor.fetchall():
+        for row in rows:
+            completed, accessible = bool(row[6]), bool(row[7])
             lessons.append({
                 'lesson_id': row[0], 'title': row[1], 'level': row[2], 'prerequisites': json.loads(row[3]),
-                'content': row[4], 'duration_minutes': row[5], 'examples': json.loads(row[6]), 'tags': json.loads(row[7])
+                'duration_minutes': row[4], 'tags': json.loads(row[5]),
+                'completed': completed, 'accessible': accessible, 'quiz_passed': bool(row[8]),
+                'status': 'completed' if completed else ('accessible' if accessible else 'locked')
             })
+
+        next_cursor = None
+        if has_more:
+            next_cursor = json.dumps([rows[-1][10], rows[-1][0]])
+        return {
+            'lessons': lessons,
+            'total': rows[0][9] if rows else 0,
+            'next_cursor': next_cursor
+        }
+
+    def get_leaderboard_page(self, metric='performance', level=None, after=None, limit=20):
+        """Top of a leaderboard, served from its index; pass 'next_cursor' back as `after` for the next page"""
+        column = LEADERBOARD_METRICS[metric]
+        filters = ['active = 1', f'{column} IS NOT NULL']
+        params = []
+        if level:
+            filters.append('level = ?')
+            params.append(level)
+        if after:
+            last_value, last_username = json.loads(after)
+            filters.append(f'({column} < ? OR ({column} = ? AND username > ?))')
+            params.extend([last_value, last_value, last_username])
+        params.append(limit + 1)
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT username, name, level, performance_score, lessons_completed,
+                   quiz_attempts, quizzes_passed, pass_rate
+            FROM leaderboard
+            WHERE {' AND '.join(filters)}
+            ORDER BY active DESC, {column} DESC, username
+            LIMIT ?
+        ''', params)
+        rows = cursor.fetchall()
         conn.close()
-        return lessons
-    
-    def get_quiz_questions(self, lesson_id, count=5, exclude_previous=None):
-        """Get quiz questions for a lesson with optional exclusion of previous attempts"""
+
+        entries = [self._leaderboard_entry(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = entries[-1]
+            next_cursor = json.dumps([last[column], last['username']])
+        return {'entries': entries, 'next_cursor': next_cursor}
+
+    def get_leaderboard_changes(self, since_seq=0):
+        """Leaderboard rows changed after `since_seq`, as (seq, active, entry) in change order"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        exclude_previous = exclude_previous or []
-        placeholders = ','.join(['?'] * len(exclude_previous)) if exclude_previous else 'NULL'
-        
-        if exclude_previous:
-            query = f'''
-                SELECT question_id, question, answer, hint, explanation, difficulty 
-                FROM quiz_questions 
-                WHERE lesson_id = ? AND question_id NOT IN ({placeholders})
-                ORDER BY RANDOM() 
-                LIMIT ?
-            '''
-            params = [lesson_id] + exclude_previous + [count]
-        else:
-            query = '''
-                SELECT question_id, question, answer, hint, explanation, difficulty 
-                FROM quiz_questions 
-                WHERE lesson_id = ? 
-                ORDER BY RANDOM() 
+        cursor.execute('''
+            SELECT username, name, level, performance_score, lessons_completed,
+                   quiz_attempts, quizzes_passed, pass_rate, active, seq
+            FROM leaderboard
+            WHERE seq > ?
+            ORDER BY seq
+        ''', (since_seq,))
+        changes = [(row[9], bool(row[8]), self._leaderboard_entry(row)) for row in cursor.fetchall()]
+        conn.close()
+        return changes
+
+    def _leaderboard_entry(self, row):
+        return {
+            'username': row[0],
+            'name': row[1],
+            'level': row[2],
+            'performance_score': row[3],
+            'lessons_completed': row[4],
+            'quiz_attempts': row[5],
+            'quizzes_passed': row[6],
+            'pass_rate': row[7]
+        }
+
+    def _sample_question_rows(self, cursor, table, lesson_id, count, exclude, rng):
+        """Draw up to `count` question rows, reproducibly when an RNG stream is given"""
+        exclude = list(exclude or [])
+        exclusion = f"AND question_id NOT IN ({','.join(['?'] * len(exclude))})" if exclude else ''
+        columns = 'question_id, question, answer, hint, explanation, difficulty'
+
+        if rng is None:
+            cursor.execute(f'''
+                SELECT {columns}
+                FROM {table}
+                WHERE lesson_id = ? {exclusion}
+                ORDER BY RANDOM()
                 LIMIT ?
-            '''
-            params = [lesson_id, count]
+            ''', [lesson_id] + exclude + [count])
+            return cursor.fetchall()
+
+        # Stable order first so the same stream always yields the same draw
+        cursor.execute(f'''
+            SELECT {columns}
+            FROM {table}
+            WHERE lesson_id = ? {exclusion}
+            ORDER BY question_id
+        ''', [lesson_id] + exclude)
+        rows = cursor.fetchall()
+        return rng.sample(rows, min(count, len(rows)))
+
+    def get_quiz_questions(self, lesson_id, count=5, exclude_previous=None, rng=None):
+        """Get quiz questions for a lesson with optional exclusion of previous attempts"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        cursor.execute(query, params)
-        questions = []
-        for row in cursor.fetchall():
-            questions.append({
-                'ex_id': row[0],  # Using ex_id for compatibility
-                'question': row[1],
-                'answer': row[2],
-                'hint': row[3],
-                'explanation': row[4],
-                'difficulty': row[5]
-            })
+        rows = self._sample_question_rows(cursor, 'quiz_questions', lesson_id, count, exclude_previous, rng)
+        # Question records also answer to 'ex_id', the key quiz code uses
+        questions = [Question(*row) for row in rows]
         
         conn.close()
         return questions
@@ -755,6 +1812,10 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
             INSERT INTO quiz_results (username, lesson_id, score, total_questions, passed, quiz_data)
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (username, lesson_id, score, total_questions, passed, quiz_data))
+        self._refresh_progress_summary(cursor, username)
+        self._record_events(cursor, [(username, 'quiz_submitted', {
+            'lesson_id': lesson_id, 'score': score, 'total_questions': total_questions, 'passed': bool(passed)
+        })])
         
         conn.commit()
         conn.close()
@@ -767,7 +1828,7 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
         cursor.execute('''
             SELECT passed FROM quiz_results 
             WHERE username = ? AND lesson_id = ? 
-            ORDER BY timestamp DESC 
+            ORDER BY timestamp DESC, id DESC 
             LIMIT 1
         ''', (username, lesson_id))
         
@@ -802,67 +1863,124 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
         conn.close()
         return history
 
+    def get_progress_summary(self, username):
+        """Per-lesson completion, quiz and practice progress for a student in one query"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(LESSON_PROGRESS_QUERY + ' ORDER BY l.rowid', (username, username))
+
+        progress = {}
+        for row in cursor.fetchall():
+            progress[row[0]] = {
+                'title': row[1],
+                'level': row[2],
+                'completed': bool(row[3]),
+                'quiz_passed': bool(row[4]),
+                'latest_score': row[5],
+                'latest_total': row[6],
+                'best_score_percent': row[7],
+                'quiz_attempts': row[8],
+                'practice_count': row[9]
+            }
+
+        conn.close()
+        return progress
+
+    def _refresh_progress_summary(self, cursor, username):
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO student_progress_summary
+                (username, total_lessons, completed_lessons, quizzes_passed, quiz_attempts,
+                 practice_count, average_best_score, updated_at)
+            SELECT ?, COUNT(*), SUM(completed), SUM(quiz_passed), SUM(quiz_attempts),
+                   SUM(practice_count), AVG(best_percent), CURRENT_TIMESTAMP
+            FROM ({LESSON_PROGRESS_QUERY})
+            HAVING COUNT(*) > 0
+        ''', (username, username, username))
+
+    def refresh_progress_summary(self, username):
+        """Recompute a student's cached dashboard totals"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        self._refresh_progress_summary(cursor, username)
+        conn.commit()
+        conn.close()
+
+    def get_student_projection(self, username):
+        """A student's state folded from the event log, caught up to the newest event"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1 FROM students WHERE username = ?', (username,))
+        if not cursor.fetchone():
+            conn.close()
+            return None
+        state = project_student(cursor, username, self.get_rules_engine())
+        conn.commit()
+        conn.close()
+        return state
+
+    def get_progress_events(self, username, limit=50):
+        """A student's newest events, newest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT seq, event_type, payload, created_at FROM progress_events
+            WHERE username = ?
+            ORDER BY seq DESC
+            LIMIT ?
+        ''', (username, limit))
+        events = [{'seq': row[0], 'event_type': row[1], 'payload': json.loads(row[2]), 'created_at': row[3]}
+                  for row in cursor.fetchall()]
+        conn.close()
+        return events
+
+    def get_progress_totals(self, username):
+        """Cached dashboard totals for a student, computed on first request"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        query = '''
+            SELECT total_lessons, completed_lessons, quizzes_passed, quiz_attempts,
+                   practice_count, average_best_score
+            FROM student_progress_summary WHERE username = ?
+        '''
+        cursor.execute(query, (username,))
+        row = cursor.fetchone()
+        if not row:
+            self._refresh_progress_summary(cursor, username)
+            conn.commit()
+            cursor.execute(query, (username,))
+            row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        return {
+            'total_lessons': row[0],
+            'completed_lessons': row[1],
+            'quizzes_passed': row[2],
+            'quiz_attempts': row[3],
+            'practice_count': row[4],
+            'average_best_score': row[5]
+        }
+
     def get_lesson_progress(self, username):
         """Get detailed lesson progress"""
-        student = self.get_student(username)
-        if not student:
-            return {}
-        
-        all_lessons = self.get_all_lessons()
-        progress = {}
-        
-        for lesson in all_lessons:
-            lesson_id = lesson['lesson_id']
-            completed = lesson_id in student.get('completed_lessons', [])
-            quiz_passed = self.has_passed_quiz(username, lesson_id)
-            
-            progress[lesson_id] = {
-                'completed': completed,
-                'quiz_passed': quiz_passed,
+        return {
+            lesson_id: {
+                'completed': lesson['completed'],
+                'quiz_passed': lesson['quiz_passed'],
                 'title': lesson['title'],
                 'level': lesson['level']
             }
-        
-        return progress
+            for lesson_id, lesson in self.get_progress_summary(username).items()
+        }
     
-    def get_practice_questions(self, lesson_id, count=3, exclude_used=None):
+    def get_practice_questions(self, lesson_id, count=3, exclude_used=None, rng=None):
         """Get practice questions for a lesson"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        exclude_used = exclude_used or []
-        placeholders = ','.join(['?'] * len(exclude_used)) if exclude_used else 'NULL'
-        
-        if exclude_used:
-            query = f'''
-                SELECT question_id, question, answer, hint, explanation, difficulty 
-                FROM practice_questions 
-                WHERE lesson_id = ? AND question_id NOT IN ({placeholders})
-                ORDER BY RANDOM() 
-                LIMIT ?
-            '''
-            params = [lesson_id] + exclude_used + [count]
-        else:
-            query = '''
-                SELECT question_id, question, answer, hint, explanation, difficulty 
-                FROM practice_questions 
-                WHERE lesson_id = ? 
-                ORDER BY RANDOM() 
-                LIMIT ?
-            '''
-            params = [lesson_id, count]
-        
-        cursor.execute(query, params)
-        questions = []
-        for row in cursor.fetchall():
-            questions.append({
-                'question_id': row[0],
-                'question': row[1],
-                'answer': row[2],
-                'hint': row[3],
-                'explanation': row[4],
-                'difficulty': row[5]
-            })
+        rows = self._sample_question_rows(cursor, 'practice_questions', lesson_id, count, exclude_used, rng)
+        questions = [Question(*row) for row in rows]
         
         conn.close()
         return questions
@@ -878,16 +1996,7 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
             WHERE lesson_id = ?
         ''', (lesson_id,))
         
-        questions = []
-        for row in cursor.fetchall():
-            questions.append({
-                'question_id': row[0],
-                'question': row[1],
-                'answer': row[2],
-                'hint': row[3],
-                'explanation': row[4],
-                'difficulty': row[5]
-            })
+        questions = [Question(*row) for row in cursor.fetchall()]
         
         conn.close()
         return questions
@@ -903,20 +2012,124 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
             WHERE lesson_id = ?
         ''', (lesson_id,))
         
-        questions = []
-        for row in cursor.fetchall():
-            questions.append({
-                'question_id': row[0],
-                'question': row[1],
-                'answer': row[2],
-                'hint': row[3],
-                'explanation': row[4],
-                'difficulty': row[5]
-            })
+        questions = [Question(*row) for row in cursor.fetchall()]
         
         conn.close()
         return questions
 
+    def search_catalog(self, query, kinds=('lesson', 'practice', 'quiz'), limit=20):
+        """Ranked full-text search over lessons and questions with highlighted snippets"""
+        # Quote every word so punctuation like '+' or '=' can't break FTS syntax; last word matches as a prefix
+        words = re.findall(r'\w+', str(query).lower())
+        if not words or not kinds:
+            return []
+        expression = ' '.join(f'"{word}"' for word in words) + '*'
+
+        sources = {
+            'lesson': ('lessons_fts', '''
+                SELECT 'lesson', l.lesson_id, l.lesson_id, l.title,
+                       snippet(lessons_fts, -1, char(2), char(3), '…', 12), bm25(lessons_fts, {weights})
+                FROM lessons_fts
+                JOIN lessons l ON l.rowid = lessons_fts.rowid
+                WHERE lessons_fts MATCH ?
+            '''),
+            'practice': ('practice_questions_fts', '''
+                SELECT 'practice', q.question_id, q.lesson_id, l.title,
+                       snippet(practice_questions_fts, -1, char(2), char(3), '…', 12), bm25(practice_questions_fts, {weights})
+                FROM practice_questions_fts
+                JOIN practice_questions q ON q.rowid = practice_questions_fts.rowid
+                JOIN lessons l ON l.lesson_id = q.lesson_id
+                WHERE practice_questions_fts MATCH ?
+            '''),
+            'quiz': ('quiz_questions_fts', '''
+                SELECT 'quiz', q.question_id, q.lesson_id, l.title,
+                       snippet(quiz_questions_fts, -1, char(2), char(3), '…', 12), bm25(quiz_questions_fts, {weights})
+                FROM quiz_questions_fts
+                JOIN quiz_questions q ON q.rowid = quiz_questions_fts.rowid
+                JOIN lessons l ON l.lesson_id = q.lesson_id
+                WHERE quiz_questions_fts MATCH ?
+            '''),
+        }
+        selects = []
+        for kind in kinds:
+            index, select = sources[kind]
+            weights = ', '.join(str(weight) for weight in SEARCH_INDEXES[index][2])
+            selects.append(select.format(weights=weights))
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            ' UNION ALL '.join(selects) + ' ORDER BY 6 LIMIT ?',
+            [expression] * len(selects) + [limit]
+        )
+
+        results = []
+        for row in cursor.fetchall():
+            # Drop the content's own markdown so only the matched words end up bold
+            snippet = re.sub(r'[*#`]+', '', row[4]).replace('\x02', '**').replace('\x03', '**')
+            results.append({
+                'kind': row[0],
+                'id': row[1],
+                'lesson_id': row[2],
+                'title': row[3],
+                'snippet': ' '.join(snippet.split()),
+                'rank': row[5]
+            })
+
+        conn.close()
+        return results
+
+    def record_question_attempts(self, username, lesson_id, question_type, results):
+        """Record per-question outcomes as (question_id, correct) pairs"""
+        if not results:
+            return
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO question_attempts (username, lesson_id, question_id, question_type, correct)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(username, lesson_id, question_id, question_type, bool(correct))
+              for question_id, correct in results])
+        if question_type == 'practice':
+            self._record_events(cursor, [
+                (username, 'practice_answered', {'lesson_id': lesson_id, 'question_id': question_id, 'correct': bool(correct)})
+                for question_id, correct in results
+            ])
+        conn.commit()
+        conn.close()
+
+    def get_question_attempt_stats(self, question_type, lesson_id):
+        """Get {question_id: (attempts, correct)} for every attempted question in a lesson"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT question_id, COUNT(*), SUM(correct)
+            FROM question_attempts
+            WHERE question_type = ? AND lesson_id = ?
+            GROUP BY question_id
+        ''', (question_type, lesson_id))
+
+        stats = {row[0]: (row[1], row[2] or 0) for row in cursor.fetchall()}
+        conn.close()
+        return stats
+
+    def get_student_attempt_counts(self, username, lesson_id):
+        """Get (attempts, correct) for a student's answered questions in a lesson"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT COUNT(*), SUM(correct)
+            FROM question_attempts
+            WHERE username = ? AND lesson_id = ?
+        ''', (username, lesson_id))
+
+        row = cursor.fetchone()
+        conn.close()
+        return row[0], row[1] or 0
+
     def get_student_practice_session(self, username, lesson_id):
         """Get student's practice session data for a lesson"""
         student = self.get_student(username)
@@ -965,9 +2178,10 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute(
-            "UPDATE students SET practice_sessions = ? WHERE username = ?",
+            "UPDATE students SET practice_sessions = ?, version = version + 1 WHERE username = ?",
             (json.dumps(practice_sessions), username)  # Always store as JSON string
         )
+        self._refresh_progress_summary(cursor, username)
         conn.commit()
         conn.close()
 
@@ -1012,8 +2226,8 @@ Equations of the form `ax² + bx + c = 0` where a ≠ 0.
         cursor = conn.cursor()
         
         cursor.execute(
-            "UPDATE students SET password = ? WHERE username = ?",
-            (new_password, username)
+            "UPDATE students SET password = ?, version = version + 1 WHERE username = ?",
+            (hash_password(new_password), username)
         )
         conn.commit()
         conn.close()
@@ -0,0 +1,301 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from backend.database import DB_BUSY_TIMEOUT
+
+# Append-only sources tailed by id -> columns copied from the live database
+TAILED_SOURCES = {
+    'quiz_results': 'id, username, lesson_id, score, total_questions, passed, quiz_data, timestamp',
+    'question_attempts': 'id, username, lesson_id, question_id, question_type, correct, timestamp',
+}
+
+
+class QuizResultsETL:
+    """Incrementally copy quiz results and question attempts into a separate analytics database.
+
+    Rows are tailed by `id`. SQLite allows a single writer, so AUTOINCREMENT
+    ids become visible in order and a high-water mark never skips a row. Each
+    batch and its checkpoint commit in the same analytics transaction, so an
+    interrupted run resumes exactly where it stopped. The small, mutable
+    students and lessons tables are copied whole on every run. Reports read
+    only the analytics database, which runs in WAL mode so they never block
+    the loader.
+    """
+
+    SOURCE = 'quiz_results'
+
+    def __init__(self, db_manager, analytics_path: Optional[str] = None, batch_size: int = 1000):
+        self.db = db_manager
+        if analytics_path is None:
+            base, _ = os.path.splitext(os.path.abspath(db_manager.db_path))
+            analytics_path = f"{base}_analytics.db"
+        self.analytics_path = analytics_path
+        self.batch_size = batch_size
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._run_lock = threading.Lock()
+        self._init_analytics_database()
+
+    def get_connection(self):
+        return sqlite3.connect(self.analytics_path)
+
+    def _source_connection(self):
+        # Read-only, so the loader can never write to or lock the live database for writing
+        return sqlite3.connect(f"file:{os.path.abspath(self.db.db_path)}?mode=ro", uri=True,
+                               timeout=DB_BUSY_TIMEOUT)
+
+    def _init_analytics_database(self):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS etl_checkpoints (
+                source TEXT PRIMARY KEY,
+                high_water_mark INTEGER NOT NULL DEFAULT 0,
+                rows_loaded INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_facts (
+                result_id INTEGER PRIMARY KEY,
+                username TEXT NOT NULL,
+                lesson_id TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                total_questions INTEGER NOT NULL,
+                passed INTEGER NOT NULL,
+                score_percent REAL,
+                question_count INTEGER NOT NULL DEFAULT 0,
+                taken_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_quiz_facts_lesson ON quiz_facts (lesson_id, passed)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_quiz_facts_student ON quiz_facts (username, lesson_id)')
+
+        # quiz_data's question_ids, one row per question served
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_fact_questions (
+                result_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                question_id TEXT NOT NULL,
+                PRIMARY KEY (result_id, position)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_quiz_fact_questions_question ON quiz_fact_questions (question_id)')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_facts (
+                attempt_id INTEGER PRIMARY KEY,
+                username TEXT NOT NULL,
+                lesson_id TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                question_type TEXT NOT NULL,
+                correct INTEGER NOT NULL,
+                taken_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_question_facts_question ON question_facts (question_type, question_id)')
+
+        # Snapshots of the live dimension tables, replaced on every run
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_dim (
+                username TEXT PRIMARY KEY,
+                level TEXT NOT NULL,
+                performance_score REAL,
+                lessons_completed INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lesson_dim (
+                lesson_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                level TEXT NOT NULL
+            )
+        ''')
+
+        cursor.executemany('INSERT OR IGNORE INTO etl_checkpoints (source) VALUES (?)',
+                           [(source,) for source in TAILED_SOURCES])
+        conn.commit()
+        conn.close()
+
+    def get_checkpoint(self, source: str = SOURCE) -> Dict:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT high_water_mark, rows_loaded, updated_at FROM etl_checkpoints WHERE source = ?
+        ''', (source,))
+        high_water_mark, rows_loaded, updated_at = cursor.fetchone()
+        conn.close()
+        return {'high_water_mark': high_water_mark, 'rows_loaded': rows_loaded, 'updated_at': updated_at}
+
+    @staticmethod
+    def _decode_question_ids(quiz_data) -> List[str]:
+        try:
+            data = json.loads(quiz_data) if quiz_data else {}
+        except (TypeError, ValueError):
+            return []
+        question_ids = data.get('question_ids', []) if isinstance(data, dict) else []
+        return [str(question_id) for question_id in question_ids]
+
+    def _reset(self, cursor, source: str):
+        """Forget everything loaded from `source`; used when it was rebuilt"""
+        if source == 'quiz_results':
+            cursor.execute('DELETE FROM quiz_fact_questions')
+            cursor.execute('DELETE FROM quiz_facts')
+        else:
+            cursor.execute('DELETE FROM question_facts')
+        cursor.execute('''
+            UPDATE etl_checkpoints SET high_water_mark = 0, rows_loaded = 0, updated_at = CURRENT_TIMESTAMP
+            WHERE source = ?
+        ''', (source,))
+
+    def _load_quiz_results(self, cursor, rows):
+        facts = []
+        questions = []
+        for result_id, username, lesson_id, score, total, passed, quiz_data, timestamp in rows:
+            question_ids = self._decode_question_ids(quiz_data)
+            facts.append((result_id, username, lesson_id, score, total, 1 if passed else 0,
+                          round(100.0 * score / total, 2) if total else None,
+                          len(question_ids), timestamp))
+            questions.extend((result_id, position, question_id)
+                             for position, question_id in enumerate(question_ids))
+
+        cursor.executemany('''
+            INSERT OR REPLACE INTO quiz_facts
+            (result_id, username, lesson_id, score, total_questions, passed, score_percent, question_count, taken_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', facts)
+        cursor.executemany('''
+            INSERT OR REPLACE INTO quiz_fact_questions (result_id, position, question_id)
+            VALUES (?, ?, ?)
+        ''', questions)
+
+    def _load_question_attempts(self, cursor, rows):
+        cursor.executemany('''
+            INSERT OR REPLACE INTO question_facts
+            (attempt_id, username, lesson_id, question_id, question_type, correct, taken_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(attempt_id, username, lesson_id, question_id, question_type, 1 if correct else 0, timestamp)
+              for attempt_id, username, lesson_id, question_id, question_type, correct, timestamp in rows])
+
+    def _tail(self, source_cursor, target, source: str) -> int:
+        """Load every row of `source` past its checkpoint in batches"""
+        cursor = target.cursor()
+        cursor.execute('SELECT high_water_mark FROM etl_checkpoints WHERE source = ?', (source,))
+        high_water_mark = cursor.fetchone()[0]
+
+        # A reset database restarts ids; reload from scratch instead of missing rows
+        source_cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {source}')
+        if source_cursor.fetchone()[0] < high_water_mark:
+            self._reset(cursor, source)
+            target.commit()
+            high_water_mark = 0
+            print(f"🔁 Source {source} was rebuilt; reloading analytics from scratch")
+
+        load = self._load_quiz_results if source == 'quiz_results' else self._load_question_attempts
+        loaded = 0
+        while True:
+            source_cursor.execute(f'''
+                SELECT {TAILED_SOURCES[source]} FROM {source} WHERE id > ? ORDER BY id LIMIT ?
+            ''', (high_water_mark, self.batch_size))
+            rows = source_cursor.fetchall()
+            if not rows:
+                break
+
+            high_water_mark = rows[-1][0]
+            load(cursor, rows)
+            cursor.execute('''
+                UPDATE etl_checkpoints
+                SET high_water_mark = ?, rows_loaded = rows_loaded + ?, updated_at = CURRENT_TIMESTAMP
+                WHERE source = ?
+            ''', (high_water_mark, len(rows), source))
+            target.commit()
+            loaded += len(rows)
+
+            if len(rows) < self.batch_size:
+                break
+        return loaded
+
+    def _copy_dimensions(self, source_cursor, target):
+        """Replace the students and lessons snapshots in one analytics transaction"""
+        cursor = target.cursor()
+        source_cursor.execute('''
+            SELECT username, level, performance_score,
+                   CASE WHEN json_valid(completed_lessons) THEN json_array_length(completed_lessons) ELSE 0 END
+            FROM students
+        ''')
+        students = source_cursor.fetchall()
+        source_cursor.execute('SELECT lesson_id, title, level FROM lessons ORDER BY rowid')
+        lessons = source_cursor.fetchall()
+
+        cursor.execute('DELETE FROM student_dim')
+        cursor.executemany('INSERT INTO student_dim VALUES (?, ?, ?, ?)', students)
+        cursor.execute('DELETE FROM lesson_dim')
+        cursor.executemany('INSERT INTO lesson_dim VALUES (?, ?, ?)', lessons)
+        target.commit()
+
+    def run_once(self) -> int:
+        """Load new quiz results and question attempts and refresh the dimensions; returns rows loaded"""
+        with self._run_lock:
+            source = self._source_connection()
+            target = self.get_connection()
+            source_cursor = source.cursor()
+
+            loaded = sum(self._tail(source_cursor, target, name) for name in TAILED_SOURCES)
+            self._copy_dimensions(source_cursor, target)
+
+            source.close()
+            target.close()
+            return loaded
+
+    def start(self, interval_seconds: float = 30.0):
+        """Run the loader on a daemon thread every `interval_seconds`"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    loaded = self.run_once()
+                    if loaded:
+                        print(f"📥 Analytics ETL loaded {loaded} rows")
+                except sqlite3.Error as e:
+                    print(f"❌ Analytics ETL error: {e}")
+                self._stop.wait(interval_seconds)
+
+        self._thread = threading.Thread(target=loop, name='quiz-results-etl', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_lesson_report(self) -> List[Dict]:
+        """Attempts, pass rate and mean score per lesson, read from the analytics database only"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT f.lesson_id, l.title, COUNT(*), COUNT(DISTINCT f.username), AVG(f.passed), AVG(f.score_percent)
+            FROM quiz_facts f
+            LEFT JOIN lesson_dim l ON l.lesson_id = f.lesson_id
+            GROUP BY f.lesson_id
+            ORDER BY f.lesson_id
+        ''')
+        report = [{
+            'lesson_id': lesson_id,
+            'title': title,
+            'attempts': attempts,
+            'students': students,
+            'pass_rate': pass_rate,
+            'mean_score_percent': mean_score
+        } for lesson_id, title, attempts, students, pass_rate, mean_score in cursor.fetchall()]
+        conn.close()
+        return report
@@ -0,0 +1,249 @@
+import json
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from backend.rules import RulesEngine
+from backend.student_model import QUIZ_SCORE_DELTAS
+
+EVENT_TYPES = ('student_enrolled', 'lesson_completed', 'quiz_submitted', 'practice_answered', 'level_changed',
+               'score_adjusted')
+REPLAY_BATCH_EVENTS = 20000
+PROJECTION_NAME = 'student_projections'
+
+
+def append_events(cursor, events: Iterable[Tuple[str, str, Dict]]):
+    """Append (username, event_type, payload) events to the log in the caller's transaction"""
+    rows = []
+    for username, event_type, payload in events:
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown progress event type: {event_type}")
+        rows.append((username, event_type, json.dumps(payload)))
+    cursor.executemany('INSERT INTO progress_events (username, event_type, payload) VALUES (?, ?, ?)', rows)
+
+
+def new_state(level: str = 'beginner') -> Dict:
+    return {'level': level, 'completed_lessons': [], 'performance_score': 0, 'quiz_attempts': 0,
+            'quizzes_passed': 0, 'practice_answered': 0, 'practice_correct': 0, 'last_seq': 0}
+
+
+def _adjust_score(state: Dict, delta):
+    state['performance_score'] = min(100, max(0, state['performance_score'] + delta))
+
+
+def _check_level(state: Dict, rules: RulesEngine):
+    next_level = rules.next_level(state)
+    if next_level:
+        state['level'] = next_level
+
+
+def apply_event(state: Dict, seq: int, event_type: str, payload: Dict, rules: RulesEngine) -> Dict:
+    """Fold one event into a projection state; events the state has already seen are skipped.
+
+    A level_changed event sets the level it records, so promotions already
+    made survive a replay under stricter rules; every progress event then
+    re-checks `rules`, which is what lets a replay promote students under
+    looser ones. Quiz scores move by QUIZ_SCORE_DELTAS, as
+    StudentModel.update_performance does, and other score changes by their
+    score_adjusted delta, so score predicates replay too.
+    """
+    if seq <= state['last_seq']:
+        return state
+    if event_type == 'student_enrolled':
+        state['level'] = payload.get('level') or 'beginner'
+        state['completed_lessons'] = list(payload.get('completed_lessons', []))
+        state['performance_score'] = payload.get('performance_score') or 0
+    elif event_type == 'lesson_completed':
+        if payload['lesson_id'] not in state['completed_lessons']:
+            state['completed_lessons'].append(payload['lesson_id'])
+        _check_level(state, rules)
+    elif event_type == 'quiz_submitted':
+        passed = bool(payload.get('passed'))
+        state['quiz_attempts'] += 1
+        state['quizzes_passed'] += passed
+        _adjust_score(state, QUIZ_SCORE_DELTAS[passed])
+        _check_level(state, rules)
+    elif event_type == 'level_changed':
+        state['level'] = payload.get('level') or state['level']
+        _check_level(state, rules)
+    elif event_type == 'practice_answered':
+        state['practice_answered'] += 1
+        state['practice_correct'] += bool(payload.get('correct'))
+        # Older logs carried update_student_progress's score change here instead of in score_adjusted
+        _adjust_score(state, payload.get('score_delta') or 0)
+    elif event_type == 'score_adjusted':
+        _adjust_score(state, payload.get('delta') or 0)
+    state['last_seq'] = seq
+    return state
+
+
+def load_states(cursor, usernames) -> Dict[str, Dict]:
+    cursor.execute('''
+        SELECT username, level, completed_lessons, performance_score, quiz_attempts, quizzes_passed,
+               practice_answered, practice_correct, last_seq
+        FROM student_projections
+        WHERE username IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(list(usernames)),))
+    return {
+        row[0]: {'level': row[1], 'completed_lessons': json.loads(row[2]), 'performance_score': row[3],
+                 'quiz_attempts': row[4], 'quizzes_passed': row[5], 'practice_answered': row[6],
+                 'practice_correct': row[7], 'last_seq': row[8]}
+        for row in cursor.fetchall()
+    }
+
+
+def save_states(cursor, states: Dict[str, Dict]):
+    cursor.executemany('''
+        INSERT OR REPLACE INTO student_projections
+            (username, level, completed_lessons, performance_score, quiz_attempts, quizzes_passed,
+             practice_answered, practice_correct, last_seq)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(username, state['level'], json.dumps(state['completed_lessons']), state['performance_score'],
+           state['quiz_attempts'], state['quizzes_passed'], state['practice_answered'], state['practice_correct'],
+           state['last_seq'])
+          for username, state in states.items()])
+
+
+def project_student(cursor, username: str, rules: RulesEngine) -> Dict:
+    """Bring one student's projection up to date by applying only the events it hasn't seen"""
+    state = load_states(cursor, [username]).get(username) or new_state()
+    cursor.execute('''
+        SELECT seq, event_type, payload FROM progress_events
+        WHERE username = ? AND seq > ?
+        ORDER BY seq
+    ''', (username, state['last_seq']))
+    rows = cursor.fetchall()
+    for seq, event_type, payload in rows:
+        apply_event(state, seq, event_type, json.loads(payload), rules)
+    if rows:
+        save_states(cursor, {username: state})
+    return state
+
+
+class ProgressProjector:
+    """Rebuilds every student's projection by replaying the event log.
+
+    Events are streamed in seq order, `batch_size` at a time. Each batch's
+    projection rows and the checkpoint commit together, so an interrupted
+    rebuild resumes from its last batch. Writers keep projecting their own
+    students incrementally during a rebuild. Every saved row pairs a state
+    with the last event folded into it, and events at or below that seq are
+    skipped, so neither side double counts; a row the rebuild leaves behind
+    a writer's simply catches up on its next read or write.
+    """
+
+    def __init__(self, db_manager, rules: Optional[RulesEngine] = None, batch_size: int = REPLAY_BATCH_EVENTS):
+        self.db = db_manager
+        self.rules = rules or db_manager.get_rules_engine()
+        self.batch_size = batch_size
+
+    def get_checkpoint(self) -> Optional[Dict]:
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT seq, events_applied, completed, updated_at FROM projection_checkpoints WHERE projection = ?
+        ''', (PROJECTION_NAME,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {'seq': row[0], 'events_applied': row[1], 'completed': bool(row[2]), 'updated_at': row[3]}
+
+    def rebuild(self, resume: bool = True) -> Dict:
+        """Replay the log into student_projections; returns {'events', 'students', 'seconds', 'resumed'}"""
+        start = time.perf_counter()
+        checkpoint = self.get_checkpoint()
+        resumed = bool(resume and checkpoint and not checkpoint['completed'])
+
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        if resumed:
+            seq, applied = checkpoint['seq'], checkpoint['events_applied']
+        else:
+            seq, applied = 0, 0
+            cursor.execute('DELETE FROM student_projections')
+            self._save_checkpoint(cursor, seq, applied, completed=False)
+            conn.commit()
+
+        # States stay in memory across batches; each batch saves only the students it touched
+        states: Dict[str, Dict] = {}
+        while True:
+            cursor.execute('''
+                SELECT seq, username, event_type, payload FROM progress_events
+                WHERE seq > ? ORDER BY seq LIMIT ?
+            ''', (seq, self.batch_size))
+            batch = cursor.fetchall()
+            if not batch:
+                break
+
+            usernames = {row[1] for row in batch}
+            unseen = usernames - states.keys()
+            if unseen:
+                states.update(load_states(cursor, unseen))
+                for username in unseen - states.keys():
+                    states[username] = new_state()
+            # One decode for the whole batch instead of one per event
+            payloads = json.loads('[' + ','.join(row[3] for row in batch) + ']')
+            for (event_seq, username, event_type, _), payload in zip(batch, payloads):
+                apply_event(states[username], event_seq, event_type, payload, self.rules)
+
+            seq = batch[-1][0]
+            applied += len(batch)
+            save_states(cursor, {username: states[username] for username in usernames})
+            self._save_checkpoint(cursor, seq, applied, completed=False)
+            conn.commit()
+
+        self._save_checkpoint(cursor, seq, applied, completed=True)
+        conn.commit()
+        conn.close()
+        return {'events': applied, 'students': len(states), 'seconds': time.perf_counter() - start,
+                'resumed': resumed}
+
+    def _save_checkpoint(self, cursor, seq, applied, completed):
+        cursor.execute('''
+            INSERT OR REPLACE INTO projection_checkpoints (projection, seq, events_applied, completed, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (PROJECTION_NAME, seq, applied, completed))
+
+    def level_changes(self):
+        """(username, current level, projected level) for students the rules would promote"""
+        projected_rank, projected_params = self.rules.rank_sql('p.level')
+        current_rank, current_params = self.rules.rank_sql('s.level')
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT s.username, s.level, p.level
+            FROM students s JOIN student_projections p ON p.username = s.username
+            WHERE {projected_rank} > {current_rank}
+            ORDER BY s.username
+        ''', projected_params + current_params)
+        changes = cursor.fetchall()
+        conn.close()
+        return changes
+
+    def apply_levels(self) -> int:
+        """Promote students whose projected level ranks above their current one, logging a level_changed event for each.
+
+        Students are never demoted, matching SQLiteManager.reevaluate_levels.
+        """
+        projected_rank, projected_params = self.rules.rank_sql('p.level')
+        current_rank, current_params = self.rules.rank_sql('students.level')
+        promoted = f"{projected_rank} > {current_rank}"
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            INSERT INTO progress_events (username, event_type, payload)
+            SELECT students.username, 'level_changed',
+                   json_object('level', p.level, 'previous', students.level, 'reason', 'rebuild')
+            FROM students JOIN student_projections p ON p.username = students.username
+            WHERE {promoted}
+            ORDER BY students.username
+        ''', projected_params + current_params)
+        cursor.execute(f'''
+            UPDATE students SET level = p.level, version = students.version + 1
+            FROM student_projections p
+            WHERE p.username = students.username AND {promoted}
+        ''', projected_params + current_params)
+        changed = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return changed
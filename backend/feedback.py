@@ -0,0 +1,124 @@
+import random
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+from backend.algebra import parse_answer_values, parse_linear_equation
+from backend.misconceptions import MISCONCEPTIONS
+
+_FORMATTER = Formatter()
+
+
+class FeedbackTemplate:
+    """A format string split into literal and field parts once, up front"""
+
+    __slots__ = ('parts',)
+
+    def __init__(self, text: str):
+        self.parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in _FORMATTER.parse(text)
+        ]
+
+    def render(self, values: Dict[str, str]) -> str:
+        pieces = []
+        for literal, field in self.parts:
+            pieces.append(literal)
+            if field is not None:
+                pieces.append(values[field])
+        return ''.join(pieces)
+
+
+CORRECT_TEMPLATES = [FeedbackTemplate(text) for text in (
+    "🎉 **Excellent work!** Your answer '{student_answer}' is correct!\n\n{explanation}",
+    "🌟 **Perfect!** '{student_answer}' is the right answer!\n\n{explanation}",
+    "✅ **Correct!** Great job solving this algebra problem!\n\n{explanation}",
+    "💡 **Brilliant thinking!** You got it right with '{student_answer}'!\n\n{explanation}",
+)]
+
+INCORRECT_TEMPLATES = [FeedbackTemplate(text) for text in (
+    "🤔 Not quite. You answered '{student_answer}', but let's think this through.\n\n{hint_md}\n\n**Correct Answer:** {correct_answer}\n\n{explanation_md}",
+    "📚 Good attempt! The answer was '{student_answer}', but we need '{correct_answer}'.\n\n{hint_md}\n\n{explanation_md}",
+    "💭 Let's review this together. You said '{student_answer}', but here's the approach:\n\n{hint_md}\n\n**Correct Answer:** {correct_answer}\n\n{explanation_md}",
+)]
+
+# Targeted feedback for recognised error patterns
+ERROR_TEMPLATES = {
+    'sign_error': FeedbackTemplate(
+        "➖ **Check your signs!** '{student_answer}' has the right size but the wrong sign.\n\n{hint_md}\n\n**Correct Answer:** {correct_answer}\n\n{explanation_md}"
+    ),
+    'inverse_operation': FeedbackTemplate(
+        "🔄 **Undo, don't repeat!** '{student_answer}' comes from applying the same operation again instead of its inverse "
+        "(e.g. adding when you should subtract, or multiplying when you should divide).\n\n{hint_md}\n\n**Correct Answer:** {correct_answer}\n\n{explanation_md}"
+    ),
+}
+
+# Feedback for a misconception found in the precomputed question_misconceptions table
+MISCONCEPTION_TEMPLATE = FeedbackTemplate(
+    "🧩 **{misconception_title}.** {misconception_text}\n\nYou answered '{student_answer}'.\n\n{hint_md}\n\n**Correct Answer:** {correct_answer}\n\n{explanation_md}"
+)
+
+
+def _question_fragments(hint: str, explanation: str) -> Tuple[str, str]:
+    """Rendered hint/explanation markdown for a question"""
+    return f"**Hint:** {hint}", f"**Explanation:** {explanation}"
+
+
+def _close(a: float, b: float) -> bool:
+    return abs(a - b) < 0.001
+
+
+def detect_error_type(exercise: Dict, student_answer: str, correct_answer: str) -> Optional[str]:
+    """Cheaply classify a wrong answer from its parsed value; None if no pattern matches"""
+    student_values = parse_answer_values(student_answer)
+    correct_values = parse_answer_values(correct_answer)
+    if not student_values or not correct_values or len(student_values) != len(correct_values):
+        return None
+
+    # Every value has the right magnitude, at least one has the wrong sign
+    if all(_close(abs(s), abs(c)) for s, c in zip(sorted(student_values, key=abs), sorted(correct_values, key=abs))) \
+            and any(not _close(s, c) for s, c in zip(sorted(student_values), sorted(correct_values))):
+        return 'sign_error'
+
+    equation = parse_linear_equation(exercise.get('question', '').split(':', 1)[-1])
+    if equation and len(student_values) == 1:
+        _, a, b, c = equation
+        value = student_values[0]
+        # a·x + b = c solved with the wrong inverse for either step
+        wrong_inverses = [(c + b) / a, (c - b) * a, (c + b) * a] if a else []
+        if any(_close(value, wrong) for wrong in wrong_inverses) and not _close(value, correct_values[0]):
+            return 'inverse_operation'
+
+    return None
+
+
+class FeedbackRenderer:
+    """Choose a feedback template first, then render only that one"""
+
+    def render_correct(self, exercise: Dict, student_answer: str, rng: Optional[random.Random] = None) -> str:
+        template = (rng or random).choice(CORRECT_TEMPLATES)
+        return template.render({
+            'student_answer': str(student_answer),
+            'explanation': exercise.get('explanation', '') or '',
+        })
+
+    def render_incorrect(self, exercise: Dict, student_answer: str, correct_answer: str,
+                         rng: Optional[random.Random] = None, misconception: Optional[str] = None) -> str:
+        misconception_title, misconception_text = MISCONCEPTIONS.get(misconception, ('', ''))
+        error_type = None if misconception_title else detect_error_type(exercise, student_answer, correct_answer)
+        if misconception_title:
+            template = MISCONCEPTION_TEMPLATE
+        elif error_type:
+            template = ERROR_TEMPLATES[error_type]
+        else:
+            template = (rng or random).choice(INCORRECT_TEMPLATES)
+
+        hint_md, explanation_md = _question_fragments(
+            exercise.get('hint', '') or '', exercise.get('explanation', '') or ''
+        )
+        return template.render({
+            'student_answer': str(student_answer),
+            'correct_answer': correct_answer,
+            'hint_md': hint_md,
+            'explanation_md': explanation_md,
+            'misconception_title': misconception_title,
+            'misconception_text': misconception_text,
+        })
@@ -0,0 +1,138 @@
+import math
+import random
+from bisect import bisect_left
+from typing import List, Dict, Optional, Tuple
+
+from backend.randomness import student_rng
+
+# Prior item difficulty (logit scale) for the seeded `difficulty` labels
+DIFFICULTY_PRIORS = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+
+# Pseudo-attempts that the prior is worth when calibrating against real data
+PRIOR_WEIGHT = 4
+
+# Rebuild a lesson's index once this many new attempts have been recorded
+REFRESH_AFTER_ATTEMPTS = 25
+
+
+def _logistic(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-x))
+
+
+class AdaptiveItemSelector:
+    """Pick the most informative questions for a student's current mastery.
+
+    Items are calibrated on a Rasch (1PL) scale: the probability that a student
+    with mastery theta answers an item of difficulty b correctly is
+    logistic(theta - b), and the item's Fisher information p(1 - p) peaks where
+    b == theta. Each lesson keeps a difficulty-sorted index, so the next items
+    are found by bisecting on theta and walking outwards.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self._index: Dict[Tuple[str, str], Tuple[List[float], List[Dict]]] = {}
+        self._pending: Dict[Tuple[str, str], int] = {}
+
+    def select_quiz_questions(self, username: str, lesson_id: str, count: int = 5,
+                              exclude_previous: Optional[List[str]] = None,
+                              rng: Optional[random.Random] = None) -> List[Dict]:
+        """Adaptive replacement for SQLiteManager.get_quiz_questions"""
+        return self._select('quiz', username, lesson_id, count, exclude_previous, rng)
+
+    def select_practice_questions(self, username: str, lesson_id: str, count: int = 3,
+                                  exclude_used: Optional[List[str]] = None,
+                                  rng: Optional[random.Random] = None) -> List[Dict]:
+        """Adaptive replacement for SQLiteManager.get_practice_questions"""
+        return self._select('practice', username, lesson_id, count, exclude_used, rng)
+
+    def record_attempts(self, username: str, lesson_id: str, question_type: str, results: List[Tuple[str, bool]]):
+        """Store (question_id, correct) outcomes and schedule recalibration"""
+        if not results:
+            return
+        self.db.record_question_attempts(username, lesson_id, question_type, results)
+
+        key = (question_type, lesson_id)
+        self._pending[key] = self._pending.get(key, 0) + len(results)
+        if self._pending[key] >= REFRESH_AFTER_ATTEMPTS:
+            self.invalidate(question_type, lesson_id)
+
+    def invalidate(self, question_type: Optional[str] = None, lesson_id: Optional[str] = None):
+        """Drop cached indexes so they are recalibrated on next use"""
+        for key in list(self._index):
+            if (question_type is None or key[0] == question_type) and (lesson_id is None or key[1] == lesson_id):
+                del self._index[key]
+                self._pending.pop(key, None)
+
+    def estimate_mastery(self, username: str, lesson_id: str) -> float:
+        """Estimate student ability (logit scale) for a lesson"""
+        student = self.db.get_student(username)
+        score = student.get('performance_score', 0) if student else 0
+
+        # Performance score sets the prior, lesson attempts refine it
+        prior = 0.25 + 0.5 * max(0.0, min(100.0, score)) / 100.0
+        attempts, correct = self.db.get_student_attempt_counts(username, lesson_id)
+        wrong = attempts - correct
+
+        return math.log((correct + PRIOR_WEIGHT * prior) / (wrong + PRIOR_WEIGHT * (1 - prior)))
+
+    def item_difficulty(self, question: Dict, stats: Optional[Tuple[int, int]]) -> float:
+        """Calibrate item difficulty from attempt data, shrunk towards the labelled prior"""
+        prior = DIFFICULTY_PRIORS.get(question.get('difficulty') or 'medium', 0.0)
+        attempts, correct = stats or (0, 0)
+
+        p_prior = _logistic(-prior)
+        wrong = attempts - correct
+        return math.log((wrong + PRIOR_WEIGHT * (1 - p_prior)) / (correct + PRIOR_WEIGHT * p_prior))
+
+    def _get_index(self, question_type: str, lesson_id: str) -> Tuple[List[float], List[Dict]]:
+        key = (question_type, lesson_id)
+        if key not in self._index:
+            if question_type == 'quiz':
+                questions = self.db.get_all_quiz_questions(lesson_id)
+            else:
+                questions = self.db.get_all_practice_questions(lesson_id)
+            stats = self.db.get_question_attempt_stats(question_type, lesson_id)
+
+            entries = sorted(
+                ((self.item_difficulty(q, stats.get(q['question_id'])), q['question_id'], q) for q in questions),
+                key=lambda entry: (entry[0], entry[1])
+            )
+            self._index[key] = ([entry[0] for entry in entries], [entry[2] for entry in entries])
+            self._pending[key] = 0
+        return self._index[key]
+
+    def _select(self, question_type: str, username: str, lesson_id: str, count: int,
+                exclude: Optional[List[str]], rng: Optional[random.Random]) -> List[Dict]:
+        difficulties, questions = self._get_index(question_type, lesson_id)
+        if not questions or count <= 0:
+            return []
+
+        theta = self.estimate_mastery(username, lesson_id)
+        excluded = set(exclude or [])
+
+        # Walk outwards from theta, collecting the closest unseen items. A window
+        # of twice the requested size keeps some variety between attempts while
+        # staying near the information peak.
+        window = count * 2
+        candidates = []
+        right = bisect_left(difficulties, theta)
+        left = right - 1
+        while len(candidates) < window and (left >= 0 or right < len(questions)):
+            take_right = left < 0 or (right < len(questions) and
+                                      difficulties[right] - theta <= theta - difficulties[left])
+            if take_right:
+                position = right
+                right += 1
+            else:
+                position = left
+                left -= 1
+            if questions[position]['question_id'] not in excluded:
+                candidates.append(position)
+
+        # Present the chosen items easiest first
+        rng = rng or student_rng(username, f"{question_type}:{lesson_id}")
+        chosen = [questions[position] for position in sorted(rng.sample(candidates, min(count, len(candidates))))]
+
+        # Question records are read-only and answer to 'ex_id' for quiz code, so no copies are needed
+        return chosen
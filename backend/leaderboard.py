@@ -0,0 +1,165 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Metrics are bucketed to small integers so a Fenwick tree can count them
+PASS_RATE_BUCKETS = 1000
+
+
+class FenwickTree:
+    """Counts per integer bucket with O(log n) updates, prefix sums and k-th smallest lookups"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.total = 0
+        self._counts = [0] * size
+        self._tree = [0] * (size + 1)
+
+    def add(self, bucket: int, delta: int):
+        if bucket >= self.size:
+            self._grow(max(bucket + 1, self.size * 2))
+        self._counts[bucket] += delta
+        self.total += delta
+        i = bucket + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, bucket: int) -> int:
+        """Number of items in buckets 0..bucket"""
+        if bucket < 0:
+            return 0
+        i = min(bucket + 1, self.size)
+        count = 0
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+        return count
+
+    def kth(self, k: int) -> int:
+        """Smallest bucket whose prefix count reaches k (1-based)"""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self._tree[nxt] < k:
+                position = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return position
+
+    def _grow(self, size: int):
+        counts = self._counts + [0] * (size - self.size)
+        self.__init__(size)
+        for bucket, count in enumerate(counts):
+            if count:
+                self.add(bucket, count)
+
+
+def _bucket(metric: str, entry: Dict) -> Optional[int]:
+    if metric == 'performance':
+        return min(100, max(0, int(round(entry['performance_score'] or 0))))
+    if metric == 'lessons':
+        return max(0, entry['lessons_completed'] or 0)
+    if entry['pass_rate'] is None:
+        return None
+    return int(round(entry['pass_rate'] * PASS_RATE_BUCKETS))
+
+
+def _value(metric: str, bucket: int) -> float:
+    return bucket / PASS_RATE_BUCKETS if metric == 'pass_rate' else bucket
+
+
+class Leaderboard:
+    """Class rankings over the materialized leaderboard table.
+
+    Top-k pages come straight from the table's indexes. Ranks and cohort
+    percentiles come from in-memory Fenwick trees, one per (metric, cohort),
+    where a cohort is 'all' or a level. Every call first applies the rows
+    whose `seq` moved since the last sync, so the trees stay current without
+    rescanning the table.
+    """
+
+    METRICS = ('performance', 'lessons', 'pass_rate')
+    INITIAL_SIZES = {'performance': 101, 'lessons': 64, 'pass_rate': PASS_RATE_BUCKETS + 1}
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self._seq = 0
+        self._entries: Dict[str, Dict] = {}
+        self._trees: Dict[Tuple[str, str], FenwickTree] = {}
+        self._lock = threading.Lock()
+
+    def _tree(self, metric: str, cohort: str) -> FenwickTree:
+        key = (metric, cohort)
+        if key not in self._trees:
+            self._trees[key] = FenwickTree(self.INITIAL_SIZES[metric])
+        return self._trees[key]
+
+    def _apply(self, entry: Dict, delta: int):
+        for metric in self.METRICS:
+            bucket = _bucket(metric, entry)
+            if bucket is None:
+                continue
+            for cohort in ('all', entry['level']):
+                self._tree(metric, cohort).add(bucket, delta)
+
+    def sync(self):
+        """Fold leaderboard changes since the last sync into the trees"""
+        with self._lock:
+            for seq, active, entry in self.db.get_leaderboard_changes(self._seq):
+                previous = self._entries.pop(entry['username'], None)
+                if previous:
+                    self._apply(previous, -1)
+                if active:
+                    self._entries[entry['username']] = entry
+                    self._apply(entry, 1)
+                self._seq = seq
+
+    def top(self, metric: str = 'performance', level: Optional[str] = None,
+            after: Optional[str] = None, limit: int = 20) -> Dict:
+        """One page of the leaderboard, best first"""
+        return self.db.get_leaderboard_page(metric, level, after, limit)
+
+    def rank(self, username: str, metric: str = 'performance', level: Optional[str] = None) -> Optional[Dict]:
+        """Competition rank (1 = best), cohort size and percentile for a student"""
+        self.sync()
+        with self._lock:
+            entry = self._entries.get(username)
+            if not entry:
+                return None
+            bucket = _bucket(metric, entry)
+            if bucket is None:
+                return None
+            tree = self._tree(metric, level or 'all')
+            if level and entry['level'] != level:
+                return None
+
+            below = tree.prefix(bucket - 1)
+            higher = tree.total - tree.prefix(bucket)
+            return {
+                'rank': higher + 1,
+                'total': tree.total,
+                'value': _value(metric, bucket),
+                'percentile': round(100.0 * below / tree.total, 1) if tree.total else 0.0
+            }
+
+    def percentiles(self, metric: str = 'performance', level: Optional[str] = None,
+                    points: Tuple[int, ...] = (25, 50, 75, 90)) -> Dict[int, float]:
+        """Nearest-rank percentiles of a metric across a cohort"""
+        self.sync()
+        with self._lock:
+            tree = self._tree(metric, level or 'all')
+            if not tree.total:
+                return {}
+            return {
+                point: _value(metric, tree.kth(max(1, math.ceil(point / 100 * tree.total))))
+                for point in points
+            }
+
+    def cohort_sizes(self) -> List[Tuple[str, int]]:
+        """Students per cohort for the performance board"""
+        self.sync()
+        with self._lock:
+            return [(cohort, tree.total) for (metric, cohort), tree in self._trees.items()
+                    if metric == 'performance']
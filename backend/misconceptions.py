@@ -0,0 +1,251 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from backend.algebra import (
+    format_linear_expression,
+    format_number,
+    parse_answer_values,
+    parse_evaluation,
+    parse_linear_equation,
+    parse_quadratic,
+    parse_system,
+    parse_terms,
+    quadratic_roots,
+    solve_system,
+)
+
+# misconception -> (title, explanation shown to the student)
+MISCONCEPTIONS = {
+    'add_subtract_swap': (
+        "Added instead of subtracted",
+        "It looks like addition and subtraction got swapped. To undo '+ n' subtract n, and to undo '- n' add n.",
+    ),
+    'multiply_divide_swap': (
+        "Multiplied instead of divided",
+        "It looks like you multiplied where you needed to divide. Division undoes multiplication.",
+    ),
+    'divided_one_term': (
+        "Divided only one term",
+        "When you divide both sides by the coefficient, every term has to be divided, not just one of them.",
+    ),
+    'sign_flip': (
+        "Sign flipped",
+        "Your answer has the right size but the wrong sign. Track each minus sign as you move terms.",
+    ),
+    'dropped_root': (
+        "Missing a solution",
+        "This quadratic has two solutions. Set each factor equal to zero and solve both.",
+    ),
+    'root_sign_flip': (
+        "Factor numbers used as roots",
+        "Each root is the opposite of the number in its factor: (x + 2) = 0 gives x = -2.",
+    ),
+    'swapped_variables': (
+        "Values in the wrong order",
+        "Both values are right but matched to the wrong variables. Check which variable each one solves for.",
+    ),
+    'concatenated_coefficient': (
+        "Digits written side by side",
+        "A number next to a variable means multiplication: 2y with y = 8 is 2 × 8 = 16, not 28.",
+    ),
+    'combined_unlike_terms': (
+        "Combined unlike terms",
+        "Only like terms combine. Variable terms and plain numbers stay separate.",
+    ),
+    'dropped_lone_variable': (
+        "Lone variable skipped",
+        "A variable on its own, like 'x', has a coefficient of 1, so it still counts.",
+    ),
+}
+
+_ASSIGNMENT = re.compile(r'[a-z]\s*=')
+
+
+def is_ordered_answer(correct_answer: str) -> bool:
+    """Systems ('x=4,y=1') are positional; quadratic roots ('x=-2,-6') are a set"""
+    return len(_ASSIGNMENT.findall(str(correct_answer).lower())) >= 2
+
+
+def answer_key(answer: str, ordered: bool = False) -> str:
+    """Normalise an answer so equivalent spellings share one lookup key"""
+    values = parse_answer_values(answer)
+    if values is None:
+        return str(answer).strip().lower().replace(' ', '')
+    if not ordered:
+        values = sorted(values)
+    return ','.join(format_number(value) for value in values)
+
+
+def _linear_answers(question: str) -> List[Tuple[str, str]]:
+    equation = parse_linear_equation(question.split(':', 1)[-1])
+    if not equation:
+        return []
+    _, a, b, c = equation
+    if not a:
+        return []
+
+    correct = (c - b) / a
+    answers = []
+    if b:
+        answers.append(('add_subtract_swap', format_number((c + b) / a)))
+    if a != 1:
+        answers.append(('multiply_divide_swap', format_number((c - b) * a)))
+        if b:
+            answers.append(('divided_one_term', format_number(c / a - b)))
+    if correct:
+        answers.append(('sign_flip', format_number(-correct)))
+    return answers
+
+
+def _quadratic_answers(question: str) -> List[Tuple[str, str]]:
+    parsed = parse_quadratic(question)
+    if not parsed:
+        return []
+    variable, p, q = parsed
+    roots = quadratic_roots(p, q)
+    if not roots:
+        return []
+
+    answers = [('dropped_root', f"{variable}={format_number(root)}") for root in roots]
+    answers.append(('root_sign_flip', f"{variable}=" + ','.join(format_number(-root) for root in roots)))
+    return answers
+
+
+def _system_answers(question: str, correct_answer: str) -> List[Tuple[str, str]]:
+    parsed = parse_system(question)
+    if not parsed:
+        return []
+    (x, y), row1, row2 = parsed
+    # Variations are built from the stored answer so they line up with what is marked correct
+    solution = parse_answer_values(correct_answer)
+    if not solution or len(solution) != 2:
+        solution = solve_system(row1, row2)
+    if not solution:
+        return []
+
+    x_value, y_value = solution
+    return [
+        ('swapped_variables', f"{x}={format_number(y_value)},{y}={format_number(x_value)}"),
+        ('sign_flip', f"{x}={format_number(x_value)},{y}={format_number(-y_value)}"),
+        ('sign_flip', f"{x}={format_number(-x_value)},{y}={format_number(y_value)}"),
+    ]
+
+
+def _evaluation_answers(question: str) -> List[Tuple[str, str]]:
+    parsed = parse_evaluation(question)
+    if not parsed:
+        return []
+    variable, value, expression = parsed
+
+    if '÷' in expression:
+        left, _, right = expression.partition('÷')
+        try:
+            divisor = float(right.strip())
+        except ValueError:
+            return []
+        return [('multiply_divide_swap', format_number(value * divisor))] if left.strip() == variable else []
+
+    terms = parse_terms(expression)
+    if not terms or any(term_variable not in (None, variable) for _, term_variable in terms):
+        return []
+
+    answers = []
+    constants = [coefficient for coefficient, term_variable in terms if term_variable is None]
+    variable_total = sum(coefficient * value for coefficient, term_variable in terms if term_variable)
+    if constants:
+        answers.append(('add_subtract_swap', format_number(variable_total - sum(constants))))
+
+    if value > 0 and value == int(value):
+        concatenated = 0.0
+        changed = False
+        for coefficient, term_variable in terms:
+            if term_variable is None:
+                concatenated += coefficient
+            elif abs(coefficient) != 1 and coefficient == int(coefficient):
+                sign = -1 if coefficient < 0 else 1
+                concatenated += sign * float(f"{int(abs(coefficient))}{int(value)}")
+                changed = True
+            else:
+                concatenated += coefficient * value
+        if changed:
+            answers.append(('concatenated_coefficient', format_number(concatenated)))
+    return answers
+
+
+def _simplify_answers(question: str) -> List[Tuple[str, str]]:
+    terms = parse_terms(question.split(':', 1)[-1])
+    if not terms:
+        return []
+    variables = {term_variable for _, term_variable in terms if term_variable}
+    if len(variables) != 1:
+        return []
+    variable = variables.pop()
+
+    coefficient = sum(k for k, term_variable in terms if term_variable)
+    constant = sum(k for k, term_variable in terms if term_variable is None)
+    answers = []
+    if constant:
+        answers.append(('combined_unlike_terms', format_linear_expression(coefficient + constant, variable, 0)))
+    if any(term_variable and k < 0 for k, term_variable in terms):
+        magnitude = sum(abs(k) for k, term_variable in terms if term_variable)
+        answers.append(('add_subtract_swap', format_linear_expression(magnitude, variable, constant)))
+    lone = sum(k for k, term_variable in terms if term_variable and abs(k) == 1)
+    if lone:
+        answers.append(('dropped_lone_variable', format_linear_expression(coefficient - lone, variable, constant)))
+    return answers
+
+
+def buggy_answers(question: str, correct_answer: str) -> Dict[str, str]:
+    """Map the answer each known buggy rule produces for a question to its misconception.
+
+    Keys are answer_key()-normalised; answers that coincide with the correct
+    answer are dropped and the first rule to produce an answer wins.
+    """
+    text = str(question).strip()
+    lowered = text.lower()
+    if parse_evaluation(text):
+        candidates = _evaluation_answers(text)
+    elif lowered.startswith('simplify:'):
+        candidates = _simplify_answers(text)
+    elif '²' in text:
+        candidates = _quadratic_answers(text)
+    elif ',' in text:
+        candidates = _system_answers(text, correct_answer)
+    else:
+        candidates = _linear_answers(text)
+
+    ordered = is_ordered_answer(correct_answer)
+    correct_key = answer_key(correct_answer, ordered)
+    misconceptions = {}
+    for misconception, answer in candidates:
+        key = answer_key(answer, ordered)
+        if key != correct_key and key not in misconceptions:
+            misconceptions[key] = misconception
+    return misconceptions
+
+
+class MisconceptionDetector:
+    """Classify wrong answers with a dict lookup into the precomputed table.
+
+    The whole question_misconceptions table is loaded on first use; call
+    refresh() after the question bank changes.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self._answers: Optional[Dict[str, Dict[str, str]]] = None
+
+    def refresh(self):
+        self._answers = None
+
+    def _lookup_table(self) -> Dict[str, Dict[str, str]]:
+        if self._answers is None:
+            self._answers = self.db.get_misconception_map() if self.db else {}
+        return self._answers
+
+    def classify(self, question_id: str, student_answer: str, correct_answer: str) -> Optional[str]:
+        """Misconception behind a wrong answer, or None if it matches no known buggy rule"""
+        answers = self._lookup_table().get(question_id)
+        if not answers:
+            return None
+        return answers.get(answer_key(student_answer, is_ordered_answer(correct_answer)))
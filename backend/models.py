@@ -0,0 +1,119 @@
+from collections.abc import Mapping
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+# Marks a lazy field that has not been read from the database yet
+_UNLOADED = object()
+
+
+class Record(Mapping):
+    """Read-only dict view over a __slots__ record.
+
+    Subclasses list their public fields in FIELDS; `record['title']`,
+    `record.get('title')`, `in`, iteration and `dict(record)` all work, so
+    code written against the old row dicts keeps working unchanged.
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    ALIASES: Dict[str, str] = {}
+    _FIELD_SET: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __getitem__(self, key):
+        name = self.ALIASES.get(key, key)
+        if name not in self._FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, name)
+
+    def __contains__(self, key):
+        return self.ALIASES.get(key, key) in self._FIELD_SET
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self[self.FIELDS[0]]!r})"
+
+
+class Student(Record):
+    FIELDS = ('student_id', 'name', 'username', 'password', 'level', 'age', 'performance_score',
+              'completed_lessons', 'completed_exercises', 'seen_questions', 'practice_sessions', 'version')
+    __slots__ = FIELDS
+
+    def __init__(self, student_id: str, name: str, username: str, password: str, level: str, age: int,
+                 performance_score: float, completed_lessons: List[str], completed_exercises: List[str],
+                 seen_questions: List[str], practice_sessions: Dict, version: int = 0):
+        self.student_id = student_id
+        self.name = name
+        self.username = username
+        self.password = password
+        self.level = level
+        self.age = age
+        self.performance_score = performance_score
+        self.completed_lessons = completed_lessons
+        self.completed_exercises = completed_exercises
+        self.seen_questions = seen_questions
+        self.practice_sessions = practice_sessions
+        self.version = version
+
+
+class Lesson(Record):
+    """Lesson metadata; `content` and `examples` are fetched through `loader` on first access"""
+
+    FIELDS = ('lesson_id', 'title', 'level', 'prerequisites', 'content', 'duration_minutes', 'examples', 'tags')
+    __slots__ = ('lesson_id', 'title', 'level', 'prerequisites', 'duration_minutes', 'tags',
+                 '_content', '_examples', '_loader')
+
+    def __init__(self, lesson_id: str, title: str, level: str, prerequisites: List[str],
+                 duration_minutes: int, tags: List[str], content=_UNLOADED, examples=_UNLOADED,
+                 loader: Optional[Callable[[str], Tuple[str, List]]] = None):
+        self.lesson_id = lesson_id
+        self.title = title
+        self.level = level
+        self.prerequisites = prerequisites
+        self.duration_minutes = duration_minutes
+        self.tags = tags
+        self._content = content
+        self._examples = examples
+        self._loader = loader
+
+    def _load(self):
+        content, examples = self._loader(self.lesson_id) if self._loader else ('', [])
+        self._content, self._examples = content, examples
+        # Loaded once; drop the reference to the database
+        self._loader = None
+
+    @property
+    def content(self) -> str:
+        if self._content is _UNLOADED:
+            self._load()
+        return self._content
+
+    @property
+    def examples(self) -> List:
+        if self._examples is _UNLOADED:
+            self._load()
+        return self._examples
+
+
+class Question(Record):
+    """Practice or quiz question; quiz code reads the id as 'ex_id'"""
+
+    FIELDS = ('question_id', 'question', 'answer', 'hint', 'explanation', 'difficulty')
+    ALIASES = {'ex_id': 'question_id'}
+    __slots__ = FIELDS
+
+    def __init__(self, question_id: str, question: str, answer: str, hint: str, explanation: str,
+                 difficulty: str):
+        self.question_id = question_id
+        self.question = question
+        self.answer = answer
+        self.hint = hint
+        self.explanation = explanation
+        self.difficulty = difficulty
@@ -0,0 +1,302 @@
+import heapq
+from typing import FrozenSet, List, Dict, Optional, Tuple
+
+# A* gives up and falls back to beam search after this many expansions
+MAX_EXPANSIONS = 50000
+DEFAULT_BEAM_WIDTH = 64
+MAX_CACHED_PLANS = 1024
+
+
+class LearningPathPlanner:
+    """Plan the cheapest ordered route through the lesson prerequisite DAG.
+
+    A search state is the set of completed lessons, stored as a bitmask over
+    the curriculum. A lesson can be taken once all its prerequisites are in the
+    set and its level is at most one above the student's level, where the level
+    is promoted as lessons are completed by the rules engine's level rules.
+    Score thresholds are judged on the student's current score, since a plan
+    can't predict quiz results. Edge cost is `duration_minutes`, so A*
+    returns the path to the goal with the least total study time.
+    """
+
+    def __init__(self, db_manager, beam_width: Optional[int] = None):
+        self.db = db_manager
+        self.beam_width = beam_width
+        self._rules = None
+        self._curriculum = None
+        self._plans: Dict[Tuple, List[str]] = {}
+
+    def refresh(self):
+        """Reload the curriculum and drop memoized plans"""
+        self._curriculum = None
+        self._plans.clear()
+
+    def _check_rules(self):
+        # set_level_rule swaps in a new engine, so identity tells when plans went stale
+        rules = self.db.get_rules_engine()
+        if rules is not self._rules:
+            self.refresh()
+            self._rules = rules
+        return rules
+
+    def plan_path(self, username: str, target_lesson: Optional[str] = None,
+                  target_level: Optional[str] = None) -> List[str]:
+        """Plan a path for a stored student"""
+        student = self.db.get_student(username)
+        if not student:
+            return []
+        return self.plan(student.get('completed_lessons', []), student['level'], target_lesson, target_level,
+                         student.get('performance_score') or 0)
+
+    def plan(self, completed_lessons, level: str, target_lesson: Optional[str] = None,
+             target_level: Optional[str] = None, performance_score: float = 0) -> List[str]:
+        """Return lesson ids, in study order, that reach the target at minimum total duration.
+
+        With no target the next level is used. Returns [] when the goal is
+        already met or cannot be reached.
+        """
+        rules = self._check_rules()
+        curriculum = self._load_curriculum()
+        index = curriculum['index']
+
+        completed_mask = 0
+        for lesson_id in completed_lessons:
+            if lesson_id in index:
+                completed_mask |= 1 << index[lesson_id]
+
+        if target_lesson is None and target_level is None:
+            rule = rules.rule(level)
+            target_level = rule.next_level if rule and rule.next_level else level
+
+        if target_lesson is not None and target_lesson not in index:
+            return []
+        if target_level is not None and target_level not in curriculum['ranks']:
+            return []
+
+        # Levels whose promotion the student's score already allows
+        eligible = frozenset(level_name for level_name, promotion in curriculum['promotions'].items()
+                             if performance_score >= promotion[3])
+        key = (completed_mask, level, target_lesson, target_level, eligible)
+        if key not in self._plans:
+            if len(self._plans) >= MAX_CACHED_PLANS:
+                self._plans.clear()
+            self._plans[key] = self._search(completed_mask, level, target_lesson, target_level, eligible)
+        return list(self._plans[key])
+
+    def path_duration(self, path: List[str]) -> int:
+        """Total minutes for a planned path"""
+        self._check_rules()
+        curriculum = self._load_curriculum()
+        return sum(curriculum['durations'][curriculum['index'][lesson_id]] for lesson_id in path)
+
+    def _load_curriculum(self) -> Dict:
+        if self._curriculum is not None:
+            return self._curriculum
+
+        lessons = sorted(self.db.get_all_lessons(), key=lambda lesson: lesson['lesson_id'])
+        index = {lesson['lesson_id']: i for i, lesson in enumerate(lessons)}
+
+        prereq_masks = []
+        for lesson in lessons:
+            mask = 0
+            for prereq in lesson.get('prerequisites', []):
+                # A missing prerequisite can never be satisfied
+                mask |= 1 << index[prereq] if prereq in index else 1 << len(lessons)
+            prereq_masks.append(mask)
+
+        # Ancestor closure (lesson plus everything it transitively needs)
+        closures: List[Optional[int]] = [None] * len(lessons)
+
+        def closure(i, visiting=()):
+            if closures[i] is None:
+                mask = 1 << i
+                for j in range(len(lessons)):
+                    if prereq_masks[i] >> j & 1 and j not in visiting:
+                        mask |= closure(j, visiting + (i,))
+                closures[i] = mask
+            return closures[i]
+
+        for i in range(len(lessons)):
+            closure(i)
+
+        # level -> (next level, lessons needed, required lesson mask, score needed) for every level that promotes
+        promotions = {}
+        for rule in self._rules.rules.values():
+            if not rule.next_level or any(lesson_id not in index for lesson_id in rule.required_lessons):
+                continue
+            required = 0
+            for lesson_id in rule.required_lessons:
+                required |= 1 << index[lesson_id]
+            promotions[rule.level] = (rule.next_level, rule.min_lessons, required, rule.min_score)
+
+        durations = [lesson.get('duration_minutes') or 0 for lesson in lessons]
+        self._curriculum = {
+            'ids': [lesson['lesson_id'] for lesson in lessons],
+            'index': index,
+            'ranks': dict(self._rules.ranks),
+            'promotions': promotions,
+            'levels': [self._rules.rank(lesson['level']) for lesson in lessons],
+            'durations': durations,
+            'prereq_masks': prereq_masks,
+            'closures': closures,
+            'by_duration': sorted(range(len(lessons)), key=lambda i: durations[i]),
+        }
+        return self._curriculum
+
+    def _level_after(self, level: str, mask: int, eligible: FrozenSet[str]) -> int:
+        """Rank of the level the rules promote a student to after completing `mask`"""
+        promotions = self._curriculum['promotions']
+        completed_count = bin(mask).count('1')
+        while level in eligible:
+            next_level, min_lessons, required, _ = promotions[level]
+            if completed_count < min_lessons or required & ~mask:
+                break
+            level = next_level
+        return self._curriculum['ranks'].get(level, 0)
+
+    def _requirements(self, level: str, target_rank: int, eligible: FrozenSet[str]) -> Optional[Tuple[int, int]]:
+        """(lessons needed, closure of required lessons) to be promoted to `target_rank`; None if never"""
+        curriculum = self._curriculum
+        count, required = 0, 0
+        while curriculum['ranks'].get(level, 0) < target_rank:
+            if level not in eligible:
+                return None
+            next_level, min_lessons, required_mask, _ = curriculum['promotions'][level]
+            count = max(count, min_lessons)
+            required |= required_mask
+            level = next_level
+
+        closure = 0
+        for i, lesson_closure in enumerate(curriculum['closures']):
+            if required >> i & 1:
+                closure |= lesson_closure
+        return count, closure
+
+    def _cheapest(self, mask: int, needed: int) -> int:
+        """Lower bound: the `needed` shortest lessons not yet completed"""
+        if needed <= 0:
+            return 0
+        curriculum = self._curriculum
+        total = 0
+        for i in curriculum['by_duration']:
+            if not mask >> i & 1:
+                total += curriculum['durations'][i]
+                needed -= 1
+                if needed == 0:
+                    break
+        return total
+
+    def _search(self, start_mask: int, level: str, target_lesson: Optional[str],
+                target_level: Optional[str], eligible: FrozenSet[str]) -> List[str]:
+        curriculum = self._curriculum
+        count = len(curriculum['ids'])
+        durations = curriculum['durations']
+
+        if target_lesson is not None:
+            target = curriculum['index'][target_lesson]
+            # Reaching the target's level (minus the one-level lookahead) may take extra lessons
+            requirements = self._requirements(level, curriculum['levels'][target] - 1, eligible)
+            if requirements is None:
+                return []
+            required_count, required_closure = requirements
+            goal_mask = curriculum['closures'][target] | required_closure
+
+            def is_goal(mask):
+                return mask >> target & 1
+        else:
+            target_rank = curriculum['ranks'][target_level]
+            if target_rank <= curriculum['ranks'].get(level, 0):
+                return []
+            requirements = self._requirements(level, target_rank, eligible)
+            if requirements is None:
+                return []
+            required_count, goal_mask = requirements
+
+            def is_goal(mask):
+                return self._level_after(level, mask, eligible) >= target_rank
+
+        def heuristic(mask):
+            closure_cost = sum(durations[i] for i in range(count) if goal_mask >> i & 1 and not mask >> i & 1)
+            count_cost = self._cheapest(mask, required_count - bin(mask).count('1'))
+            return max(closure_cost, count_cost)
+
+        def successors(mask):
+            allowed = self._level_after(level, mask, eligible) + 1
+            for i in range(count):
+                if (not mask >> i & 1 and curriculum['levels'][i] <= allowed
+                        and curriculum['prereq_masks'][i] & ~mask == 0):
+                    yield i
+
+        if is_goal(start_mask):
+            return []
+
+        if self.beam_width:
+            steps = self._beam_search(start_mask, is_goal, heuristic, successors, self.beam_width)
+        else:
+            steps = self._astar(start_mask, is_goal, heuristic, successors)
+            if steps is None:
+                steps = self._beam_search(start_mask, is_goal, heuristic, successors, DEFAULT_BEAM_WIDTH)
+
+        return [curriculum['ids'][i] for i in steps or []]
+
+    def _astar(self, start_mask, is_goal, heuristic, successors) -> Optional[List[int]]:
+        durations = self._curriculum['durations']
+        best_cost = {start_mask: 0}
+        parents: Dict[int, Tuple[int, int]] = {}
+        tie = 0
+        # Ties on f are broken towards deeper states so equal-cost orderings
+        # of the same lessons are not all expanded
+        frontier = [(heuristic(start_mask), 0, tie, start_mask)]
+        expansions = 0
+
+        while frontier:
+            _, negative_cost, _, mask = heapq.heappop(frontier)
+            cost = -negative_cost
+            if cost > best_cost.get(mask, float('inf')):
+                continue
+            if is_goal(mask):
+                return self._reconstruct(parents, start_mask, mask)
+
+            expansions += 1
+            if expansions > MAX_EXPANSIONS:
+                return None
+
+            for i in successors(mask):
+                next_mask = mask | 1 << i
+                next_cost = cost + durations[i]
+                if next_cost < best_cost.get(next_mask, float('inf')):
+                    best_cost[next_mask] = next_cost
+                    parents[next_mask] = (mask, i)
+                    tie += 1
+                    heapq.heappush(frontier, (next_cost + heuristic(next_mask), -next_cost, tie, next_mask))
+
+        return []
+
+    def _beam_search(self, start_mask, is_goal, heuristic, successors, width) -> List[int]:
+        durations = self._curriculum['durations']
+        beam = [(0, start_mask, [])]
+
+        while beam:
+            candidates = {}
+            for cost, mask, steps in beam:
+                for i in successors(mask):
+                    next_mask = mask | 1 << i
+                    next_cost = cost + durations[i]
+                    if next_mask not in candidates or next_cost < candidates[next_mask][0]:
+                        candidates[next_mask] = (next_cost, next_mask, steps + [i])
+
+            finished = [entry for entry in candidates.values() if is_goal(entry[1])]
+            if finished:
+                return min(finished, key=lambda entry: entry[0])[2]
+
+            beam = heapq.nsmallest(width, candidates.values(),
+                                   key=lambda entry: entry[0] + heuristic(entry[1]))
+        return []
+
+    def _reconstruct(self, parents, start_mask, mask) -> List[int]:
+        steps = []
+        while mask != start_mask:
+            mask, lesson = parents[mask]
+            steps.append(lesson)
+        steps.reverse()
+        return steps
@@ -0,0 +1,31 @@
+import hashlib
+import os
+import random
+from datetime import date
+from typing import Optional
+
+# Root seed for every stream. Set ITS_RANDOM_SEED to pin draws for load tests
+# or to rotate them for a new deployment.
+GLOBAL_SEED = os.environ.get('ITS_RANDOM_SEED', 'algebra-its')
+
+
+def stream_seed(*parts) -> int:
+    """Derive a stable 64-bit seed from the global seed and any key parts"""
+    key = '\x1f'.join([GLOBAL_SEED] + [str(part) for part in parts])
+    return int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big')
+
+
+def stream_rng(*parts) -> random.Random:
+    """Independent RNG stream keyed by arbitrary parts"""
+    return random.Random(stream_seed(*parts))
+
+
+def student_rng(username: str, stream: str, day: Optional[date] = None) -> random.Random:
+    """Per-student, per-day RNG stream.
+
+    The same student sees the same draws for a given stream all day (so paths
+    and quiz draws can be cached and reruns do not flicker) and new ones the
+    next day.
+    """
+    day = day or date.today()
+    return stream_rng('student', username, day.isoformat(), stream)
@@ -0,0 +1,227 @@
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_EASINESS = 2.5
+MIN_EASINESS = 1.3
+REVIEWS_PER_LESSON = 5
+# A reviewed item left overdue for more than this many of its intervals counts as forgotten
+LAPSE_GRACE_INTERVALS = 2
+RESCHEDULE_BATCH_ROWS = 50000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+REVIEW_COLUMNS = '''r.question_id, r.lesson_id, r.due_at, r.easiness, r.interval_days, r.repetitions, r.lapses,
+                    q.question, q.answer, q.hint, q.explanation, q.difficulty'''
+
+
+def timestamp(moment: Optional[datetime] = None) -> str:
+    """UTC time in the format SQLite's CURRENT_TIMESTAMP uses, so due dates compare as text"""
+    return (moment or datetime.now(timezone.utc)).strftime(TIMESTAMP_FORMAT)
+
+
+def sm2(easiness: float, interval_days: float, repetitions: int, quality: int) -> Tuple[float, float, int]:
+    """One SM-2 step for a recall graded 0-5; returns (easiness, interval_days, repetitions)"""
+    if quality < 3:
+        repetitions, interval_days = 0, 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval_days = 1
+        elif repetitions == 2:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * easiness)
+    easiness = max(MIN_EASINESS, easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return easiness, interval_days, repetitions
+
+
+def answer_quality(correct: bool, used_hint: bool = False) -> int:
+    """Grade a review answer for SM-2"""
+    if not correct:
+        return 1
+    return 3 if used_hint else 4
+
+
+def schedule_lesson_reviews(cursor, username: str, lesson_id: str, now: Optional[str] = None):
+    """Enroll a completed lesson's first practice questions for review from tomorrow, in the caller's transaction"""
+    cursor.execute('''
+        INSERT OR IGNORE INTO review_items (username, question_id, lesson_id, due_at)
+        SELECT ?, question_id, lesson_id, datetime(?, '+1 day')
+        FROM practice_questions
+        WHERE lesson_id = ?
+        ORDER BY question_id
+        LIMIT ?
+    ''', (username, now or timestamp(), lesson_id, REVIEWS_PER_LESSON))
+
+
+class DueQueue:
+    """A student's upcoming reviews as a min-heap on due time.
+
+    Loaded once per session from the (username, due_at) index; popping the
+    next due item and pushing it back with its new due time are O(log n),
+    so a review session never re-queries to find what comes next.
+    """
+
+    def __init__(self, items=()):
+        self._heap = [(item['due_at'], item['question_id']) for item in items]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, due_at: str, question_id: str):
+        heapq.heappush(self._heap, (due_at, question_id))
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self._heap[0] if self._heap else None
+
+    def pop_due(self, now: Optional[str] = None) -> Optional[str]:
+        """Question id of the most overdue item, or None if nothing is due yet"""
+        if self._heap and self._heap[0][0] <= (now or timestamp()):
+            return heapq.heappop(self._heap)[1]
+        return None
+
+    def due_count(self, now: Optional[str] = None) -> int:
+        now = now or timestamp()
+        return sum(1 for due_at, _ in self._heap if due_at <= now)
+
+
+class ReviewScheduler:
+    """SM-2 spaced repetition over (student, practice question) review items"""
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def _item_from_row(self, row) -> Dict:
+        return {
+            'question_id': row[0], 'lesson_id': row[1], 'due_at': row[2], 'easiness': row[3],
+            'interval_days': row[4], 'repetitions': row[5], 'lapses': row[6], 'question': row[7],
+            'answer': row[8], 'hint': row[9], 'explanation': row[10], 'difficulty': row[11]
+        }
+
+    def get_due(self, username: str, now: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Most overdue items first; a range scan on the (username, due_at) index"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {REVIEW_COLUMNS}
+            FROM review_items r JOIN practice_questions q ON q.question_id = r.question_id
+            WHERE r.username = ? AND r.due_at <= ?
+            ORDER BY r.due_at
+            LIMIT ?
+        ''', (username, now or timestamp(), limit))
+        items = [self._item_from_row(row) for row in cursor.fetchall()]
+        conn.close()
+        return items
+
+    def get_item(self, username: str, question_id: str) -> Optional[Dict]:
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {REVIEW_COLUMNS}
+            FROM review_items r JOIN practice_questions q ON q.question_id = r.question_id
+            WHERE r.username = ? AND r.question_id = ?
+        ''', (username, question_id))
+        row = cursor.fetchone()
+        conn.close()
+        return self._item_from_row(row) if row else None
+
+    def count_due(self, username: str, now: Optional[str] = None) -> int:
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM review_items WHERE username = ? AND due_at <= ?',
+                       (username, now or timestamp()))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+    def forecast(self, username: str, days: int = 7, now: Optional[str] = None) -> List[Tuple[str, int]]:
+        """(date, items due) for each of the next `days` days; overdue items count towards today"""
+        now = now or timestamp()
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT MAX(date(due_at), date(?)) AS day, COUNT(*)
+            FROM review_items
+            WHERE username = ? AND due_at < datetime(date(?), '+' || ? || ' days')
+            GROUP BY day
+        ''', (now, username, now, days))
+        counts = dict(cursor.fetchall())
+        conn.close()
+        today = datetime.strptime(now, TIMESTAMP_FORMAT).date()
+        return [(str(today + timedelta(days=offset)), counts.get(str(today + timedelta(days=offset)), 0))
+                for offset in range(days)]
+
+    def queue(self, username: str, horizon_days: int = 1, now: Optional[str] = None) -> DueQueue:
+        """Heap of every item due within `horizon_days`, for a review session"""
+        now = now or timestamp()
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT due_at, question_id FROM review_items
+            WHERE username = ? AND due_at <= datetime(?, '+' || ? || ' days')
+        ''', (username, now, horizon_days))
+        queue = DueQueue({'due_at': row[0], 'question_id': row[1]} for row in cursor.fetchall())
+        conn.close()
+        return queue
+
+    def record_review(self, username: str, question_id: str, quality: int, now: Optional[str] = None) -> Optional[Dict]:
+        """Apply one graded review and return the item's new schedule"""
+        now = now or timestamp()
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        while True:
+            cursor.execute('''
+                SELECT easiness, interval_days, repetitions, due_at FROM review_items
+                WHERE username = ? AND question_id = ?
+            ''', (username, question_id))
+            row = cursor.fetchone()
+            if not row:
+                conn.close()
+                return None
+            easiness, interval_days, repetitions = sm2(row[0], row[1], row[2], quality)
+            # Guarded on what was read, so a concurrent review of the same item re-grades from its result
+            cursor.execute('''
+                UPDATE review_items
+                SET easiness = ?, interval_days = ?, repetitions = ?, lapses = lapses + ?,
+                    due_at = datetime(?, '+' || ? || ' days'), last_reviewed_at = ?
+                WHERE username = ? AND question_id = ? AND repetitions = ? AND due_at = ?
+                RETURNING due_at
+            ''', (easiness, interval_days, repetitions, int(quality < 3), now, interval_days, now,
+                  username, question_id, row[2], row[3]))
+            updated = cursor.fetchone()
+            conn.commit()
+            if updated:
+                conn.close()
+                return {'question_id': question_id, 'easiness': easiness, 'interval_days': interval_days,
+                        'repetitions': repetitions, 'due_at': updated[0]}
+
+    def reschedule_all(self, now: Optional[str] = None, batch_rows: int = RESCHEDULE_BATCH_ROWS) -> Dict:
+        """Daily job: reset items left overdue long enough to count as forgotten.
+
+        Runs as one set-based UPDATE per `batch_rows` rowid range, each in
+        its own short transaction, so millions of items are rescheduled
+        without holding the write lock for the whole pass.
+        """
+        start = time.perf_counter()
+        now = now or timestamp()
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MIN(rowid), 0), COALESCE(MAX(rowid), -1) FROM review_items')
+        low, high = cursor.fetchone()
+
+        lapsed = 0
+        for first in range(low, high + 1, batch_rows):
+            cursor.execute('''
+                UPDATE review_items
+                SET repetitions = 0, interval_days = 1, easiness = MAX(?, easiness - 0.2),
+                    lapses = lapses + 1, due_at = ?
+                WHERE rowid BETWEEN ? AND ?
+                  AND repetitions > 0
+                  AND julianday(?) - julianday(due_at) > interval_days * ?
+            ''', (MIN_EASINESS, now, first, first + batch_rows - 1, now, LAPSE_GRACE_INTERVALS))
+            lapsed += cursor.rowcount
+            conn.commit()
+        conn.close()
+        return {'items': max(0, high - low + 1), 'lapsed': lapsed, 'seconds': time.perf_counter() - start}
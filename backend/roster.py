@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.security import UNUSABLE_PASSWORD, hash_password, is_hashed
+
+ROSTER_CHUNK_ROWS = 5000
+
+
+def _read_rows(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+    """Stream (line number, raw record) pairs from a CSV or JSONL roster"""
+    fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'jsonl':
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        yield line_number, None
+        else:
+            # Header is line 1, so the first record is line 2
+            for line_number, record in enumerate(csv.DictReader(f), 2):
+                yield line_number, record
+
+
+def _parse_completed(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(lesson_id) for lesson_id in value]
+    text = str(value).strip()
+    if text.startswith('['):
+        return [str(lesson_id) for lesson_id in json.loads(text)]
+    return [lesson_id.strip() for lesson_id in text.split(';') if lesson_id.strip()]
+
+
+def _clean(record, known_lessons, known_levels) -> Tuple[Optional[Dict], Optional[str]]:
+    """Validate one roster record into an add_students() dict, or return the reason it was rejected"""
+    if not isinstance(record, dict):
+        return None, "not a valid record"
+    username = str(record.get('username') or '').strip()
+    if not username:
+        return None, "missing username"
+
+    level = str(record.get('level') or 'beginner').strip().lower()
+    if level not in known_levels:
+        return None, f"unknown level '{level}'"
+    try:
+        age = int(record.get('age') or 15)
+        completed = _parse_completed(record.get('completed_lessons'))
+    except (TypeError, ValueError):
+        return None, "bad age or completed_lessons"
+    unknown = [lesson_id for lesson_id in completed if lesson_id not in known_lessons]
+    if unknown:
+        return None, f"unknown lessons {', '.join(unknown)}"
+
+    return {
+        'username': username,
+        'name': str(record.get('name') or username).strip(),
+        'password': str(record.get('password') or ''),
+        'level': level,
+        'age': age,
+        'completed_lessons': completed
+    }, None
+
+
+class RosterImporter:
+    """Provision students in bulk from a CSV or JSONL roster.
+
+    Columns: username (required), name, password, level, age and
+    completed_lessons (JSON list or ';'-separated ids). Records are
+    streamed and validated, plaintext passwords are hashed a chunk at a time
+    across a process pool, and everything is inserted by
+    SQLiteManager.add_students in a single transaction. Passwords that are
+    already scrypt hashes are kept as-is; rows without one get an unusable
+    password until it is set.
+
+    Only blank or pre-hashed rosters import at tens of thousands of rows per
+    second. Each plaintext password costs one full scrypt hash, so those
+    rosters run at about hash_workers / hash time rows per second, tens of
+    rows per second per core (benchmarks/bench_roster_import.py).
+    """
+
+    def __init__(self, db_manager, chunk_size: int = ROSTER_CHUNK_ROWS, hash_workers: Optional[int] = None):
+        self.db = db_manager
+        self.chunk_size = chunk_size
+        self.hash_workers = hash_workers if hash_workers is not None else (os.cpu_count() or 1)
+
+    def _hashed(self, chunk: List[Dict], pool: Optional[ProcessPoolExecutor]) -> List[Dict]:
+        plaintext = [student for student in chunk if student['password'] and not is_hashed(student['password'])]
+        passwords = [student['password'] for student in plaintext]
+        if pool and len(passwords) > 1:
+            hashes = pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (self.hash_workers * 4)))
+        else:
+            hashes = map(hash_password, passwords)
+        for student, hashed in zip(plaintext, hashes):
+            student['password'] = hashed
+        for student in chunk:
+            if not student['password']:
+                student['password'] = UNUSABLE_PASSWORD
+        return chunk
+
+    def _students(self, rows: Iterable[Tuple[int, Dict]], report: Dict, seen: Dict[str, int],
+                  pool: Optional[ProcessPoolExecutor]) -> Iterator[Dict]:
+        known_lessons = {lesson['lesson_id'] for lesson in self.db.get_all_lessons()}
+        known_levels = set(self.db.get_rules_engine().levels)
+        chunk = []
+        for line_number, record in rows:
+            student, reason = _clean(record, known_lessons, known_levels)
+            if not student:
+                report['invalid'].append((line_number, reason))
+                continue
+            if student['username'] in seen:
+                report['conflicts'].append((line_number, student['username'],
+                                            f"duplicate of line {seen[student['username']]}"))
+                continue
+            seen[student['username']] = line_number
+            chunk.append(student)
+            if len(chunk) >= self.chunk_size:
+                yield from self._hashed(chunk, pool)
+                chunk = []
+        if chunk:
+            yield from self._hashed(chunk, pool)
+
+    def import_file(self, path: str, fmt: Optional[str] = None) -> Dict:
+        """Import a roster and report {'imported', 'conflicts', 'invalid', 'seconds'}"""
+        return self.import_rows(_read_rows(path, fmt))
+
+    def import_rows(self, rows: Iterable[Tuple[int, Dict]]) -> Dict:
+        start = time.perf_counter()
+        report = {'imported': 0, 'conflicts': [], 'invalid': []}
+        lines: Dict[str, int] = {}
+
+        pool = ProcessPoolExecutor(self.hash_workers) if self.hash_workers > 1 else None
+        try:
+            imported, existing = self.db.add_students(self._students(rows, report, lines, pool), self.chunk_size)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        report['imported'] = imported
+        report['conflicts'].extend((lines.get(username), username, "username already exists")
+                                   for username in existing)
+        report['conflicts'].sort(key=lambda conflict: conflict[0] or 0)
+        report['seconds'] = time.perf_counter() - start
+        return report
+
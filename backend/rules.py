@@ -0,0 +1,162 @@
+import json
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# Seed rows for the level_rules table: what a student at `level` needs to reach `next_level`
+DEFAULT_LEVEL_RULES = (
+    {'level': 'beginner', 'next_level': 'intermediate', 'min_lessons': 2, 'min_score': 0, 'required_lessons': [],
+     'target_score': 50, 'description': 'Mastery of basic variables and simple equations'},
+    {'level': 'intermediate', 'next_level': 'advanced', 'min_lessons': 4, 'min_score': 0, 'required_lessons': [],
+     'target_score': 50, 'description': 'Proficiency with expressions and two-step equations'},
+    {'level': 'advanced', 'next_level': None, 'min_lessons': 6, 'min_score': 0, 'required_lessons': [],
+     'target_score': 50, 'description': 'Expertise in systems and quadratic equations'},
+)
+
+# How many levels above their own a student may open lessons from
+DEFAULT_LOOKAHEAD = 1
+
+# Columns of level_rules a rule may set
+RULE_FIELDS = ('next_level', 'min_lessons', 'min_score', 'required_lessons', 'target_score', 'description')
+
+# students.completed_lessons as a JSON array even when the stored value is malformed
+_COMPLETED_SQL = "CASE WHEN json_valid(completed_lessons) THEN completed_lessons ELSE '[]' END"
+
+
+def _compile_predicate(min_lessons: int, min_score: float, required: frozenset) -> Callable[[Mapping], bool]:
+    """Build the promotion test once, keeping only the checks this rule actually uses"""
+    checks = []
+    if min_lessons:
+        checks.append(lambda snapshot: len(snapshot['completed_lessons']) >= min_lessons)
+    if min_score:
+        checks.append(lambda snapshot: (snapshot.get('performance_score') or 0) >= min_score)
+    if required:
+        checks.append(lambda snapshot: required.issubset(snapshot['completed_lessons']))
+    if len(checks) == 1:
+        return checks[0]
+    return lambda snapshot: all(check(snapshot) for check in checks)
+
+
+class CompiledRule:
+    __slots__ = ('level', 'next_level', 'min_lessons', 'min_score', 'required_lessons', 'target_score',
+                 'description', 'promotes')
+
+    def __init__(self, rule: Mapping):
+        self.level = rule['level']
+        self.next_level = rule.get('next_level') or None
+        self.min_lessons = rule.get('min_lessons') or 0
+        self.min_score = rule.get('min_score') or 0
+        self.required_lessons = frozenset(rule.get('required_lessons') or ())
+        self.target_score = rule.get('target_score')
+        self.description = rule.get('description') or ''
+        # Terminal levels never promote
+        if self.next_level in (None, self.level):
+            self.next_level = None
+            self.promotes = lambda snapshot: False
+        else:
+            self.promotes = _compile_predicate(self.min_lessons, self.min_score, self.required_lessons)
+
+    def shortfall(self, snapshot: Mapping) -> Dict:
+        """What the student still needs for this rule's promotion"""
+        completed = snapshot['completed_lessons']
+        return {
+            'lessons_needed': max(0, self.min_lessons - len(completed)),
+            'score_needed': max(0, self.min_score - (snapshot.get('performance_score') or 0)),
+            'missing_lessons': sorted(self.required_lessons.difference(completed))
+        }
+
+    def sql_predicate(self) -> Tuple[str, List]:
+        """The promotion test as a WHERE clause over the students table"""
+        clauses, params = [], []
+        if self.min_lessons:
+            clauses.append(f"json_array_length({_COMPLETED_SQL}) >= ?")
+            params.append(self.min_lessons)
+        if self.min_score:
+            clauses.append("COALESCE(performance_score, 0) >= ?")
+            params.append(self.min_score)
+        if self.required_lessons:
+            clauses.append(f'''NOT EXISTS (
+                SELECT 1 FROM json_each(?) AS required
+                WHERE required.value NOT IN (SELECT value FROM json_each({_COMPLETED_SQL}))
+            )''')
+            params.append(json.dumps(sorted(self.required_lessons)))
+        return ' AND '.join(clauses) or '1', params
+
+
+class RulesEngine:
+    """Level progression rules compiled to closures, evaluated over a student snapshot.
+
+    A snapshot is any mapping with 'level', 'completed_lessons' and
+    'performance_score': a Student record, or an event-log projection
+    state. Rules promote one level per evaluation, like the live checks
+    after each quiz and lesson completion.
+    """
+
+    __slots__ = ('rules', 'ranks', 'levels')
+
+    def __init__(self, rules: Iterable[Mapping]):
+        self.rules = {rule['level']: CompiledRule(rule) for rule in rules}
+        for rule in self.rules.values():
+            if rule.next_level and rule.next_level not in self.rules:
+                raise ValueError(f"Level rule {rule.level} promotes to undefined level {rule.next_level}")
+        self.ranks = self._rank_levels()
+        # Lowest level first; the order every level list and comparison uses
+        self.levels = tuple(sorted(self.rules, key=lambda level: self.ranks[level]))
+
+    def _rank_levels(self) -> Dict[str, int]:
+        """Each level's distance from the bottom of its promotion chain"""
+        ranks = dict.fromkeys(self.rules, 0)
+        for _ in range(len(self.rules) + 1):
+            changed = False
+            for rule in self.rules.values():
+                if rule.next_level and ranks[rule.next_level] <= ranks[rule.level]:
+                    ranks[rule.next_level] = ranks[rule.level] + 1
+                    changed = True
+            if not changed:
+                return ranks
+        raise ValueError("Level rules promote in a cycle")
+
+    def rank(self, level: str) -> int:
+        return self.ranks.get(level, 0)
+
+    def level_allows(self, student_level: str, lesson_level: str, lookahead: int = DEFAULT_LOOKAHEAD) -> bool:
+        """A lesson is open to students at most `lookahead` levels below it"""
+        return self.rank(lesson_level) <= self.rank(student_level) + lookahead
+
+    def level_allows_sql(self, student_column: str, lesson_column: str,
+                         lookahead: int = DEFAULT_LOOKAHEAD) -> Tuple[str, List]:
+        """level_allows as a SQL condition over two level columns, and its params"""
+        student_rank, student_params = self.rank_sql(student_column)
+        lesson_rank, lesson_params = self.rank_sql(lesson_column)
+        return f"({lesson_rank} <= {student_rank} + ?)", lesson_params + student_params + [lookahead]
+
+    def rank_sql(self, column: str) -> Tuple[str, List]:
+        """A level column's rank as a CASE expression, and its params"""
+        cases, params = [], []
+        for level, rank in self.ranks.items():
+            cases.append('WHEN ? THEN ?')
+            params.extend([level, rank])
+        return f"(CASE {column} {' '.join(cases)} ELSE 0 END)", params
+
+    def rule(self, level: str) -> Optional[CompiledRule]:
+        return self.rules.get(level)
+
+    def next_level(self, snapshot: Mapping) -> Optional[str]:
+        """The level the student has earned, or None if they stay where they are"""
+        rule = self.rules.get(snapshot['level'])
+        if rule and rule.promotes(snapshot):
+            return rule.next_level
+        return None
+
+    def promotion_sql(self) -> Optional[Tuple[str, List, str, List]]:
+        """(new level CASE, its params, WHERE clause, its params) promoting every eligible student by one level"""
+        cases, case_params, conditions, where_params = [], [], [], []
+        for rule in self.rules.values():
+            if not rule.next_level:
+                continue
+            predicate, params = rule.sql_predicate()
+            cases.append('WHEN ? THEN ?')
+            case_params.extend([rule.level, rule.next_level])
+            conditions.append(f'(level = ? AND {predicate})')
+            where_params.extend([rule.level] + params)
+        if not cases:
+            return None
+        return f"CASE level {' '.join(cases)} END", case_params, ' OR '.join(conditions), where_params
@@ -0,0 +1,112 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+# scrypt work factor; raise SCRYPT_N as hardware allows (see benchmarks/bench_password_kdf.py).
+# Stored hashes carry their own parameters, so changing these only affects new hashes
+# and triggers a rehash on the next successful login.
+SCRYPT_N = int(os.environ.get('ITS_SCRYPT_N', 2 ** 14))
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# At most this many KDF evaluations run at once, so a login burst queues
+# instead of every request competing for CPU and 128·r·N bytes of memory
+KDF_CONCURRENCY = int(os.environ.get('ITS_KDF_CONCURRENCY', os.cpu_count() or 2))
+_kdf_slots = threading.BoundedSemaphore(KDF_CONCURRENCY)
+
+SESSION_TTL_SECONDS = 12 * 60 * 60
+
+# Stored for accounts created without a password; no input ever matches it
+UNUSABLE_PASSWORD = '!'
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    with _kdf_slots:
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * r * n, dklen=HASH_BYTES)
+
+
+def hash_password(password: str, n: int = None, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    """Salted scrypt hash encoded as 'scrypt$n$r$p$salt$hash'"""
+    n = n or SCRYPT_N
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def is_hashed(stored: str) -> bool:
+    return str(stored or '').startswith('scrypt$')
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check a password against a stored hash, or a legacy plaintext value"""
+    if stored == UNUSABLE_PASSWORD:
+        return False
+    if not is_hashed(stored):
+        return hmac.compare_digest(str(stored or '').encode('utf-8'), password.encode('utf-8'))
+    try:
+        _, n, r, p, salt, expected = stored.split('$')
+        derived = _scrypt(password, _unb64(salt), int(n), int(r), int(p))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(derived, _unb64(expected))
+
+
+def needs_rehash(stored: str) -> bool:
+    """True for plaintext rows and hashes made with an older work factor"""
+    if not is_hashed(stored):
+        return True
+    try:
+        _, n, r, p, _, _ = stored.split('$')
+    except ValueError:
+        return True
+    return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+class SessionTokens:
+    """HMAC-signed 'username.expiry.signature' tokens.
+
+    A token is issued once the password has been verified. Checking it on
+    later reruns needs only an HMAC, with no database read or KDF. The key
+    comes from ITS_SESSION_SECRET. Without it, each process uses a random
+    key, so sessions end on restart.
+    """
+
+    def __init__(self, secret: Optional[bytes] = None, ttl_seconds: int = SESSION_TTL_SECONDS):
+        env_secret = os.environ.get('ITS_SESSION_SECRET')
+        self.secret = secret or (env_secret.encode('utf-8') if env_secret else secrets.token_bytes(32))
+        self.ttl_seconds = ttl_seconds
+
+    def _sign(self, payload: str) -> str:
+        return _b64(hmac.new(self.secret, payload.encode('utf-8'), hashlib.sha256).digest())
+
+    def issue(self, username: str) -> str:
+        payload = f"{_b64(username.encode('utf-8'))}.{int(time.time()) + self.ttl_seconds}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: Optional[str]) -> Optional[str]:
+        """Username the token was issued for, or None if it is forged or expired"""
+        try:
+            encoded_username, expires, signature = str(token).split('.')
+        except ValueError:
+            return None
+        payload = f"{encoded_username}.{expires}"
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        if int(expires) < time.time():
+            return None
+        return _unb64(encoded_username).decode('utf-8')
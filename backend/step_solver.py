@@ -0,0 +1,311 @@
+import re
+from functools import lru_cache
+from math import gcd
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from backend.algebra import (
+    format_linear_expression,
+    format_number,
+    parse_linear_equation,
+    parse_number,
+    parse_quadratic,
+    parse_system,
+    parse_terms,
+    quadratic_roots,
+    solve_system,
+)
+
+# "(x+2)(x+6)=0" after normalisation
+_FACTOR = re.compile(r'\(([a-z])([+-]\d+(?:\.\d+)?)\)')
+_FACTORED = re.compile(r'^(?:\([a-z][+-]\d+(?:\.\d+)?\))+=0$')
+# "x+2=0orx+6=0": split on 'or' only where it follows a number
+_OR = re.compile(r'(?<=\d)or')
+
+
+def normalize_equation(text: str) -> str:
+    """Cache key for an equation: lowercase, no 'Solve:' prefix, no whitespace"""
+    compact = re.sub(r'\s+', '', str(text).lower())
+    for prefix in ('solve:', 'solve'):
+        if compact.startswith(prefix):
+            compact = compact[len(prefix):]
+            break
+    return compact.replace('·', '').replace('*', '').replace('−', '-')
+
+
+def _round(value: float) -> float:
+    # Answers are checked to within 0.001, so '0.667' and '2/3' are the same step
+    return round(value, 3) + 0.0
+
+
+def _linear_key(coefficients: Dict[str, float], left_constant: float, constant: float) -> Hashable:
+    return (frozenset((variable, _round(value)) for variable, value in coefficients.items() if _round(value)),
+            _round(left_constant), _round(constant))
+
+
+def _equation_key(equation: str) -> Optional[Hashable]:
+    """Key for one linear equation, e.g. '3x+2=14' -> ({x: 3}, 2, 14)"""
+    if equation.count('=') != 1:
+        return None
+    left, right = equation.split('=')
+    terms = parse_terms(left)
+    constant = parse_number(right)
+    if not terms or constant is None:
+        return None
+
+    coefficients: Dict[str, float] = {}
+    left_constant = 0.0
+    for coefficient, variable in terms:
+        if variable is None:
+            left_constant += coefficient
+        else:
+            coefficients[variable] = coefficients.get(variable, 0.0) + coefficient
+    return _linear_key(coefficients, left_constant, constant)
+
+
+def state_key(text: str) -> Hashable:
+    """Canonical form of a step so spacing, ordering and number formatting don't matter"""
+    compact = normalize_equation(text)
+
+    if _FACTORED.match(compact):
+        factors = _FACTOR.findall(compact)
+        return ('factored', factors[0][0], tuple(sorted(_round(float(offset)) for _, offset in factors)))
+
+    quadratic = parse_quadratic(compact)
+    if quadratic:
+        variable, p, q = quadratic
+        return ('quadratic', variable, _round(p), _round(q))
+
+    parts = [part for piece in compact.split(',') for part in _OR.split(piece)]
+    # "x=-2,-6" lists a second value for the same variable
+    if len(parts) > 1 and '=' in parts[0]:
+        variable = parts[0].split('=', 1)[0]
+        parts = [part if '=' in part else f"{variable}={part}" for part in parts]
+
+    keys = [_equation_key(part) for part in parts]
+    if all(key is not None for key in keys):
+        return keys[0] if len(keys) == 1 else frozenset(keys)
+    return ('text', compact)
+
+
+class Derivation:
+    """Worked steps for one equation plus the canonical key of every reachable state.
+
+    Steps are (description, state) pairs, or (description, state, key) when
+    the state is shown rounded and its key is built from the exact values.
+    """
+
+    __slots__ = ('steps', 'progress', 'labels', 'variable')
+
+    def __init__(self, variable: str, steps: List[Tuple],
+                 alternatives: Optional[List[Tuple[Hashable, int, str]]] = None):
+        self.variable = variable
+        self.steps: Tuple[Tuple[str, str], ...] = tuple((step[0], step[1]) for step in steps)
+        # state key -> how far along the derivation that state is, and how it was reached
+        self.progress: Dict[Hashable, int] = {}
+        self.labels: Dict[Hashable, str] = {}
+        for index, step in enumerate(steps):
+            key = step[2] if len(step) > 2 else state_key(step[1])
+            self.progress.setdefault(key, index)
+            self.labels.setdefault(key, step[0])
+        for key, index, description in alternatives or []:
+            self.progress.setdefault(key, index)
+            self.labels.setdefault(key, description)
+
+    @property
+    def final_step(self) -> int:
+        return len(self.steps) - 1
+
+    def agrees_with(self, answer: str) -> bool:
+        """Whether a stored answer such as '5', 'x=-2,-6' or 'x=6,y=4' is the state this derivation ends in"""
+        compact = normalize_equation(answer)
+        if '=' not in compact:
+            compact = f"{self.variable}={compact}"
+        return self.progress.get(state_key(compact)) == self.final_step
+
+
+def _linear_step(description: str, variable: str, a: float, b: float, c: float) -> Tuple[str, str, Hashable]:
+    return (description, f"{format_linear_expression(a, variable, b)} = {format_number(c)}",
+            _linear_key({variable: a}, b, c))
+
+
+def _derive_linear(equation: str) -> Optional[Derivation]:
+    parsed = parse_linear_equation(equation)
+    if not parsed:
+        return None
+    variable, a, b, c = parsed
+    if not a:
+        return None
+
+    steps = [_linear_step("Start with the equation", variable, a, b, c)]
+    alternatives = []
+    if b:
+        operation = f"Subtract {format_number(b)} from" if b > 0 else f"Add {format_number(-b)} to"
+        steps.append(_linear_step(f"{operation} both sides", variable, a, 0, c - b))
+        if a != 1:
+            # Dividing first is just as valid: 3x + 2 = 14 -> x + 2/3 = 14/3
+            alternatives.append((_linear_key({variable: 1}, b / a, c / a), 1,
+                                 f"Divide both sides by {format_number(a)}"))
+    if a != 1:
+        steps.append(_linear_step(f"Divide both sides by {format_number(a)}", variable, 1, 0, (c - b) / a))
+    return Derivation(variable, steps, alternatives)
+
+
+def _quadratic_state(variable: str, p: float, q: float) -> str:
+    text = f"{variable}²"
+    if p:
+        term = format_linear_expression(abs(p), variable, 0)
+        text += f" + {term}" if p > 0 else f" - {term}"
+    if q:
+        text += f" + {format_number(q)}" if q > 0 else f" - {format_number(-q)}"
+    return f"{text} = 0"
+
+
+def _derive_quadratic(equation: str) -> Optional[Derivation]:
+    parsed = parse_quadratic(equation)
+    if not parsed:
+        return None
+    variable, p, q = parsed
+
+    steps = [("Start with the equation", _quadratic_state(variable, p, q))]
+    roots = quadratic_roots(p, q)
+    if roots is None:
+        steps.append((f"The discriminant {format_number(p)}² - 4·{format_number(q)} is negative",
+                      "No real solutions"))
+        return Derivation(variable, steps)
+
+    solved = (' or '.join(f"{variable} = {format_number(root)}" for root in roots),
+              frozenset(_linear_key({variable: 1}, 0, root) for root in roots))
+    if all(abs(root - round(root)) < 1e-9 for root in roots):
+        factors = [format_linear_expression(1, variable, -root) for root in roots]
+        steps.append(("Factor the left side", ''.join(f"({factor})" for factor in factors) + " = 0"))
+        steps.append(("Set each factor equal to zero", ' or '.join(f"{factor} = 0" for factor in factors)))
+        steps.append(("Solve each equation",) + solved)
+    else:
+        discriminant = p * p - 4 * q
+        steps.append(("Apply the quadratic formula",
+                      f"{variable} = ({format_number(-p)} ± √{format_number(discriminant)}) / 2"))
+        steps.append(("Evaluate both signs",) + solved)
+    return Derivation(variable, steps)
+
+
+def _system_step(description: str, variables: Tuple[str, str], rows) -> Tuple[str, str, Hashable]:
+    x, y = variables
+    equations = []
+    for a, b, c in rows:
+        left = format_linear_expression(a, x, 0) if a else ''
+        if b:
+            term = format_linear_expression(abs(b), y, 0)
+            if left:
+                left += f" + {term}" if b > 0 else f" - {term}"
+            else:
+                left = term if b > 0 else f"-{term}"
+        equations.append(f"{left} = {format_number(c)}")
+    return description, ', '.join(equations), frozenset(_linear_key({x: a, y: b}, 0, c) for a, b, c in rows)
+
+
+def _derive_system(equation: str) -> Optional[Derivation]:
+    parsed = parse_system(equation)
+    if not parsed:
+        return None
+    (x, y), row1, row2 = parsed
+    solution = solve_system(row1, row2)
+    if not solution:
+        return None
+    x_value, y_value = solution
+
+    steps = [_system_step("Start with the system", (x, y), [row1, row2])]
+    (a1, b1, c1), (a2, b2, c2) = row1, row2
+
+    if not b1 or not b2:
+        a, c = (a1, c1) if not b1 else (a2, c2)
+        steps.append(_linear_step(f"Equation {1 if not b1 else 2} already has no {y}", x, a, 0, c))
+    else:
+        if float(b1).is_integer() and float(b2).is_integer():
+            multiple = abs(int(b1) * int(b2)) // gcd(int(b1), int(b2))
+            k1, k2 = multiple / abs(b1), multiple / abs(b2)
+        else:
+            k1, k2 = abs(b2), abs(b1)
+        scaled1 = (a1 * k1, b1 * k1, c1 * k1)
+        scaled2 = (a2 * k2, b2 * k2, c2 * k2)
+        scalings = [f"equation {number} by {format_number(k)}" for number, k in ((1, k1), (2, k2)) if k != 1]
+        if scalings:
+            steps.append(_system_step(f"Multiply {' and '.join(scalings)} so the {y} terms match",
+                                      (x, y), [scaled1, scaled2]))
+        if (scaled1[1] > 0) != (scaled2[1] > 0):
+            a, c = scaled1[0] + scaled2[0], scaled1[2] + scaled2[2]
+            steps.append(_linear_step(f"Add the equations to eliminate {y}", x, a, 0, c))
+        else:
+            a, c = scaled1[0] - scaled2[0], scaled1[2] - scaled2[2]
+            steps.append(_linear_step(f"Subtract equation 2 from equation 1 to eliminate {y}", x, a, 0, c))
+    if a != 1:
+        steps.append(_linear_step(f"Divide both sides by {format_number(a)}", x, 1, 0, x_value))
+
+    # Back-substitute into an equation that still contains y
+    number, (a, b, c) = (1, row1) if b1 else (2, row2)
+    steps.append(_linear_step(f"Substitute {x} = {format_number(x_value)} into equation {number}",
+                              y, b, 0, c - a * x_value))
+    if b != 1:
+        steps.append(_linear_step(f"Divide both sides by {format_number(b)}", y, 1, 0, y_value))
+    steps.append(("Write the solution", f"{x} = {format_number(x_value)}, {y} = {format_number(y_value)}",
+                  frozenset([_linear_key({x: 1}, 0, x_value), _linear_key({y: 1}, 0, y_value)])))
+    return Derivation(x, steps)
+
+
+@lru_cache(maxsize=2048)
+def derive(normalized_equation: str) -> Optional[Derivation]:
+    """Worked derivation for a normalised equation; cached so each equation is solved once"""
+    if '²' in normalized_equation:
+        return _derive_quadratic(normalized_equation)
+    if ',' in normalized_equation:
+        return _derive_system(normalized_equation)
+    return _derive_linear(normalized_equation)
+
+
+def _derivation_for(question: str, answer: Optional[str]) -> Optional[Derivation]:
+    """The question's derivation, or None when it can't be solved or doesn't reach the stored answer"""
+    derivation = derive(normalize_equation(question))
+    if derivation and answer is not None and not derivation.agrees_with(answer):
+        return None
+    return derivation
+
+
+def solution_steps(question: str, answer: Optional[str] = None) -> List[Dict[str, str]]:
+    """Worked steps for a question as [{'description', 'state'}], empty if it can't be solved.
+
+    With `answer`, questions whose equations don't lead to it get no steps,
+    so a worked solution never contradicts the answer checking.
+    """
+    derivation = _derivation_for(question, answer)
+    if not derivation:
+        return []
+    return [{'description': description, 'state': state} for description, state in derivation.steps]
+
+
+def check_step(question: str, student_step: str, current_step: int = 0, answer: Optional[str] = None) -> Dict:
+    """Check a student's next line of working: the step after `current_step`, or an equivalent form of it.
+
+    Returns {'valid', 'step', 'solved', 'message'} where 'step' is the
+    progress index to pass back in as `current_step` next time.
+    """
+    derivation = _derivation_for(question, answer)
+    if not derivation:
+        return {'valid': False, 'step': current_step, 'solved': False,
+                'message': "Step checking isn't available for this question yet."}
+
+    key = state_key(student_step)
+    index = derivation.progress.get(key)
+    next_step = derivation.steps[min(current_step + 1, derivation.final_step)][0]
+    if index is None:
+        return {'valid': False, 'step': current_step, 'solved': False,
+                'message': f"🤔 That doesn't follow from your last step. Try this: {next_step.lower()}."}
+    if index <= current_step:
+        return {'valid': False, 'step': current_step, 'solved': False,
+                'message': f"↩️ You already have that. Next: {next_step.lower()}."}
+    if index > current_step + 1:
+        return {'valid': False, 'step': current_step, 'solved': False,
+                'message': f"⏭️ That's further ahead. Show the step in between first: {next_step.lower()}."}
+
+    solved = index == derivation.final_step
+    message = "🎉 Solved! That's the final answer." if solved else \
+        f"✅ Valid step: {derivation.labels[key].lower()}."
+    return {'valid': True, 'step': index, 'solved': solved, 'message': message}
@@ -0,0 +1,114 @@
+"""Benchmark the constraint engine against the imperative CSPSolver checks.
+
+Builds a large synthetic curriculum and class in memory, then times
+    * current: CSPSolver.generate_learning_path for every student
+    * engine:  CSPSolver.schedule_class (AC-3 + MRV/forward checking)
+
+    python benchmarks/bench_csp_engine.py --lessons 300 --students 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.csp_solver import CSPSolver
+from backend.csp_engine import build_schedule_csp
+from backend.curriculum import CompiledCurriculum
+from backend.rules import DEFAULT_LEVEL_RULES, RulesEngine
+
+LEVELS = ['beginner', 'intermediate', 'advanced']
+
+
+class SyntheticDB:
+    """Just enough of SQLiteManager for CSPSolver, backed by dicts"""
+
+    def __init__(self, lesson_count, student_count, seed=0):
+        rng = random.Random(seed)
+        self.rules = RulesEngine(DEFAULT_LEVEL_RULES)
+        self.lessons = {}
+        for i in range(lesson_count):
+            window = range(max(0, i - 12), i)
+            prerequisites = [f"L{j}" for j in rng.sample(window, min(len(window), rng.randint(0, 3)))]
+            self.lessons[f"L{i}"] = {
+                'lesson_id': f"L{i}",
+                'title': f"Lesson {i}",
+                'level': LEVELS[min(2, i * 3 // lesson_count)],
+                'prerequisites': prerequisites,
+                'duration_minutes': rng.randint(20, 90),
+                'tags': [rng.choice(['variables', 'expressions', 'systems', 'quadratic'])],
+            }
+
+        self.students = {}
+        for i in range(student_count):
+            progress = rng.randint(0, lesson_count // 3)
+            self.students[f"s{i}"] = {
+                'username': f"s{i}",
+                'level': LEVELS[min(2, progress * 3 // max(1, lesson_count // 3))],
+                'completed_lessons': [f"L{j}" for j in range(progress)],
+                'performance_score': rng.randint(0, 100),
+            }
+
+    def get_student(self, username):
+        return self.students.get(username)
+
+    def get_lesson(self, lesson_id):
+        return self.lessons.get(lesson_id)
+
+    def get_all_lessons(self):
+        return list(self.lessons.values())
+
+    def get_students_progress(self, usernames=None):
+        if usernames is None:
+            return list(self.students.values())
+        return [self.students[username] for username in usernames if username in self.students]
+
+    def get_rules_engine(self):
+        return self.rules
+
+    def get_compiled_curriculum(self):
+        return CompiledCurriculum.compile(self.get_all_lessons(), self.rules)
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lessons', type=int, default=300)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--weeks', type=int, default=8)
+    parser.add_argument('--minutes-per-week', type=int, default=240)
+    parser.add_argument('--max-lessons-per-week', type=int, default=4)
+    args = parser.parse_args()
+
+    db = SyntheticDB(args.lessons, args.students)
+    solver = CSPSolver(db)
+    usernames = list(db.students)
+    print(f"Synthetic curriculum: {args.lessons} lessons, {args.students} students")
+
+    timed("current generate_learning_path",
+          lambda: [solver.generate_learning_path(username) for username in usernames])
+    schedules = timed("engine schedule_class",
+                      lambda: solver.schedule_class(usernames, args.weeks, args.minutes_per_week,
+                                                    args.max_lessons_per_week))
+
+    placed = sum(len(week) for schedule in schedules.values() for week in schedule.values())
+    print(f"Lessons placed across class: {placed}")
+
+    student = db.students[usernames[0]]
+    csp = build_schedule_csp(db.get_all_lessons(), db.rules, student['level'], student['completed_lessons'],
+                             args.weeks, args.minutes_per_week, args.max_lessons_per_week)
+    timed("engine single solve", csp.solve)
+    print(f"Search stats: {csp.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark password hashing cost and login latency under a burst.
+
+    * kdf:   time one scrypt hash for each candidate work factor
+    * burst: --logins concurrent logins against a temporary database, first
+             while every row is legacy plaintext (verify + rehash), then again
+             once all rows are hashed
+
+Pick the largest N whose burst p95 stays within your login budget and set
+ITS_SCRYPT_N; --concurrency mirrors ITS_KDF_CONCURRENCY.
+
+    python benchmarks/bench_password_kdf.py --logins 50 --threads 16
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from backend import security
+
+
+def time_kdf(n, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        security.hash_password("correct horse battery staple", n=n)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def burst(db, usernames, threads):
+    latencies = []
+    lock = threading.Lock()
+    pending = list(usernames)
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                username = pending.pop()
+            start = time.perf_counter()
+            assert db.authenticate_student(username, f"pw-{username}")
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return wall, statistics.median(latencies), p95, latencies[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--work-factors', default='13,14,15', help="comma-separated log2(N) values")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--logins', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--concurrency', type=int, default=None, help="override ITS_KDF_CONCURRENCY")
+    args = parser.parse_args()
+
+    print(f"{'N':>8} {'hash ms':>9}")
+    for exponent in (int(value) for value in args.work_factors.split(',')):
+        print(f"{2 ** exponent:>8} {time_kdf(2 ** exponent, args.repeats) * 1000:>9.1f}")
+
+    if args.concurrency:
+        security._kdf_slots = threading.BoundedSemaphore(args.concurrency)
+    concurrency = args.concurrency or security.KDF_CONCURRENCY
+
+    from backend.database import SQLiteManager
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLiteManager(os.path.join(directory, 'bench.db'))
+        usernames = [f"bench{i}" for i in range(args.logins)]
+        conn = db.get_connection()
+        # Insert legacy plaintext rows directly so the first burst exercises the upgrade path
+        conn.executemany('''
+            INSERT INTO students (student_id, name, username, password) VALUES (?, ?, ?, ?)
+        ''', [(str(uuid.uuid4()), username, username, f"pw-{username}") for username in usernames])
+        conn.commit()
+        conn.close()
+
+        print(f"\n{args.logins} logins, {args.threads} threads, N={security.SCRYPT_N}, "
+              f"KDF concurrency {concurrency}")
+        print(f"{'phase':<16} {'wall s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for phase in ('plaintext+rehash', 'hashed'):
+            wall, p50, p95, worst = burst(db, usernames, args.threads)
+            print(f"{phase:<16} {wall:>8.2f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} {worst * 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
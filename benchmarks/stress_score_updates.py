@@ -0,0 +1,102 @@
+"""Stress concurrent score updates against one student and check for lost updates.
+
+    * atomic: --writers threads each apply --updates +1/-1 pairs through
+              adjust_performance_score and record a unique exercise through
+              update_student_progress
+    * legacy: the same load through the old read-in-Python, write-back
+              pattern, for comparison (expect lost updates)
+
+Every +1 is followed by the same writer's -1, so the score never reaches the
+0-100 clamp and must end where it started; `version` must have advanced once
+per update and every exercise must have been recorded.
+
+    python benchmarks/stress_score_updates.py --writers 64 --updates 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+START_SCORE = 20
+
+
+def legacy_adjust(db, username, delta):
+    student = db.get_student(username)
+    conn = db.get_connection()
+    conn.execute("UPDATE students SET performance_score = ? WHERE username = ?",
+                 (min(100, max(0, student['performance_score'] + delta)), username))
+    conn.commit()
+    conn.close()
+
+
+def run(db, username, writers, updates, legacy):
+    errors = []
+    barrier = threading.Barrier(writers)
+
+    def writer(number):
+        try:
+            barrier.wait()
+            for _ in range(updates):
+                for delta in (1, -1):
+                    if legacy:
+                        legacy_adjust(db, username, delta)
+                    else:
+                        db.adjust_performance_score(username, delta)
+            if not legacy:
+                db.update_student_progress(username, completed_exercise=f"stress-{number}")
+        except Exception as e:
+            errors.append(e)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=64)
+    parser.add_argument('--updates', type=int, default=50, help="+1/-1 pairs per writer")
+    parser.add_argument('--legacy', action='store_true', help="use the old read-modify-write path")
+    args = parser.parse_args()
+
+    from backend.database import SQLiteManager
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLiteManager(os.path.join(directory, 'stress.db'))
+        db.add_student("Stress Test", "beginner", "stress", password="stress")
+        conn = db.get_connection()
+        conn.execute("UPDATE students SET performance_score = ? WHERE username = 'stress'", (START_SCORE,))
+        conn.commit()
+        conn.close()
+        version = db.get_student('stress')['version']
+
+        wall, errors = run(db, 'stress', args.writers, args.updates, args.legacy)
+        student = db.get_student('stress')
+
+        writes = args.writers * args.updates * 2
+        print(f"{args.writers} writers x {args.updates * 2} updates ({'legacy' if args.legacy else 'atomic'}): "
+              f"{wall:.2f}s, {writes / wall:.0f} updates/s")
+        print(f"final score {student['performance_score']} (expected {START_SCORE})")
+        failed = bool(errors) or student['performance_score'] != START_SCORE
+        if not args.legacy:
+            bumps = student['version'] - version
+            recorded = sum(exercise.startswith('stress-') for exercise in student['completed_exercises'])
+            print(f"version advanced {bumps} (expected {writes + args.writers})")
+            print(f"exercises recorded {recorded} (expected {args.writers})")
+            failed = failed or bumps != writes + args.writers or recorded != args.writers
+        for error in errors[:5]:
+            print(f"error: {error!r}")
+
+    print("FAIL: lost updates" if failed else "OK: no lost updates")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from backend.database import SQLiteManager
 from backend.csp_solver import CSPSolver
 from backend.student_model import StudentModel
+from backend.item_selector import AdaptiveItemSelector
+from backend.leaderboard import Leaderboard
+from backend.analytics import TeacherAnalytics, is_teacher
+from backend.security import SessionTokens
+from backend.randomness import student_rng
+from backend.review import ReviewScheduler, answer_quality
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
@@ -15,6 +21,13 @@ import time
 db = SQLiteManager()
 csp_solver = CSPSolver(db)
 student_model = StudentModel(db)
+item_selector = AdaptiveItemSelector(db)
+leaderboard = Leaderboard(db)
+teacher_analytics = TeacherAnalytics(db)
+session_tokens = SessionTokens()
+review_scheduler = ReviewScheduler(db)
+
+BROWSE_PAGE_SIZE = 20
 
 def init_session_state():
     """Initialize session state"""
@@ -32,6 +45,14 @@ def init_session_state():
         st.session_state.quiz_data = {}
     if 'quiz_submitted' not in st.session_state:
         st.session_state.quiz_submitted = False
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = None
+    if 'review_queue' not in st.session_state:
+        st.session_state.review_queue = None
+    if 'review_current' not in st.session_state:
+        st.session_state.review_current = None
+    if 'review_result' not in st.session_state:
+        st.session_state.review_result = None
 
 def clear_quiz_state(lesson_id):
     """Clear quiz state for a specific lesson"""
@@ -54,10 +75,11 @@ def login_page():
             
             if login_btn:
                 if username.strip() and password.strip():
-                    student = db.get_student(username)
-                    if student and db.verify_student_password(username, password):
+                    student = db.authenticate_student(username, password)
+                    if student:
                         st.session_state.logged_in = True
                         st.session_state.username = username
+                        st.session_state.session_token = session_tokens.issue(username)
                         st.session_state.user_id = student['student_id']
                         st.session_state.current_page = "dashboard"
                         st.success(f"Welcome back, {student['name']}!")
@@ -108,7 +130,7 @@ def display_quiz_interface(lesson_id):
         
         # Show what's needed
         student = db.get_student(st.session_state.username)
-        lesson = db.get_lesson(lesson_id)
+        lesson = db.get_lesson_metadata(lesson_id)
         
         if lesson:
             st.warning(f"**This quiz requires:** {lesson['level'].title()} level")
@@ -117,7 +139,7 @@ def display_quiz_interface(lesson_id):
             if lesson.get('prerequisites'):
                 st.write("**Prerequisite lessons:**")
                 for prereq_id in lesson['prerequisites']:
-                    prereq_lesson = db.get_lesson(prereq_id)
+                    prereq_lesson = db.get_lesson_metadata(prereq_id)
                     if prereq_lesson:
                         completed = prereq_id in student.get('completed_lessons', [])
                         status = "✅ Completed" if completed else "❌ Not Completed"
@@ -134,7 +156,7 @@ def display_quiz_interface(lesson_id):
                 st.rerun()
         return
     
-    lesson = db.get_lesson(lesson_id)
+    lesson = db.get_lesson_metadata(lesson_id)
     if not lesson:
         st.error("Lesson not found!")
         return
@@ -161,8 +183,9 @@ def display_quiz_interface(lesson_id):
         # Get previous quiz attempts to exclude those questions
         previous_attempts = db.get_student_quiz_history(st.session_state.username, lesson_id)
         
-        # Get new quiz questions excluding previous ones
-        quiz_questions = db.get_quiz_questions(
+        # Get new quiz questions excluding previous ones, matched to the student's mastery
+        quiz_questions = item_selector.select_quiz_questions(
+            st.session_state.username,
             lesson_id, 
             count=5,  # 5 questions per quiz
             exclude_previous=previous_attempts
@@ -171,7 +194,9 @@ def display_quiz_interface(lesson_id):
         if not quiz_questions:
             st.warning("⚠️ You've attempted most available quiz questions!")
             # Fallback: allow repeating questions if all have been used
-            quiz_questions = db.get_quiz_questions(lesson_id, count=5)
+            quiz_questions = db.get_quiz_questions(
+                lesson_id, count=5, rng=student_rng(st.session_state.username, f"quiz:{lesson_id}")
+            )
         
         if quiz_questions:
             quiz_state['questions'] = quiz_questions
@@ -232,6 +257,7 @@ def display_quiz_interface(lesson_id):
                 else:
                     score = 0
                     total = len(quiz_state['questions'])
+                    attempt_results = []
 
                     for i, question in enumerate(quiz_state['questions'], 1):
                         answer_key = f"q{i}"
@@ -239,8 +265,13 @@ def display_quiz_interface(lesson_id):
                         correct_answer = question['answer']
                         
                         # Check if answer is correct
-                        if csp_solver._flexible_answer_match(user_answer, correct_answer):
+                        is_correct = csp_solver._flexible_answer_match(user_answer, correct_answer)
+                        if is_correct:
                             score += 1
+                        attempt_results.append((question['ex_id'], is_correct))
+
+                    # Feed per-question outcomes back into difficulty calibration
+                    item_selector.record_attempts(st.session_state.username, lesson_id, 'quiz', attempt_results)
 
                     quiz_state['score'] = score
                     quiz_state['submitted'] = True
@@ -385,10 +416,7 @@ def display_lesson_interface(lesson_id):
     prerequisites_met = all(prereq in completed_lessons for prereq in lesson_prerequisites)
     
     # Check level appropriateness
-    level_weights = {'beginner': 0, 'intermediate': 1, 'advanced': 2}
-    student_level_num = level_weights.get(student['level'], 0)
-    lesson_level_num = level_weights.get(lesson['level'], 0)
-    level_appropriate = lesson_level_num <= student_level_num + 1
+    level_appropriate = db.get_rules_engine().level_allows(student['level'], lesson['level'])
     
     if not prerequisites_met or not level_appropriate:
         st.error("🚫 Access Denied! You don't meet the requirements for this lesson.")
@@ -396,7 +424,7 @@ def display_lesson_interface(lesson_id):
         if not prerequisites_met and lesson_prerequisites:
             st.warning("**Complete these prerequisite lessons first:**")
             for prereq_id in lesson_prerequisites:
-                prereq_lesson = db.get_lesson(prereq_id)
+                prereq_lesson = db.get_lesson_metadata(prereq_id)
                 if prereq_lesson:
                     completed = prereq_id in completed_lessons
                     status = "✅ Completed" if completed else "❌ Missing"
@@ -493,8 +521,9 @@ def display_lesson_interface(lesson_id):
         session_data = db.get_student_practice_session(st.session_state.username, lesson_id)
         used_questions = session_data['used_questions']
         
-        # Get new practice questions excluding used ones
-        new_questions = db.get_practice_questions(
+        # Get new practice questions excluding used ones, matched to the student's mastery
+        new_questions = item_selector.select_practice_questions(
+            st.session_state.username,
             lesson_id, 
             count=5,  # 5 questions per session
             exclude_used=used_questions
@@ -555,21 +584,27 @@ def display_lesson_interface(lesson_id):
                 check_key = f"check_{answer_key}"
                 if st.button(f"Check Answer", key=check_key):
                     if user_answer.strip():
-                        is_correct = csp_solver._flexible_answer_match(user_answer.strip(), question['answer'])
+                        is_correct, feedback = csp_solver.check_exercise_answer(
+                            question, user_answer.strip(),
+                            rng=student_rng(st.session_state.username, f"feedback:{question['question_id']}")
+                        )
+                        first_check = question['question_id'] not in practice_state['checked_questions']
                         practice_state['checked_questions'].add(question['question_id'])
                         
                         # Mark as completed when checked 
                         practice_state['completed_questions'].add(question['question_id'])
                         
                         db.mark_practice_completed(st.session_state.username, question['question_id'], is_correct)
+                        if first_check:
+                            item_selector.record_attempts(
+                                st.session_state.username, lesson_id, 'practice', [(question['question_id'], is_correct)]
+                            )
                         
+                        # Feedback already carries the hint and explanation
                         if is_correct:
-                            st.success("✅ Correct! Well done!")
+                            st.success(feedback)
                         else:
-                            st.error(f"❌ Not quite right. The correct answer is: {question['answer']}")
-                        
-                        if question.get('explanation'):
-                            st.info(f"**Explanation:** {question['explanation']}")
+                            st.error(feedback)
                     else:
                         st.warning("Please enter an answer before checking.")
             
@@ -578,6 +613,38 @@ def display_lesson_interface(lesson_id):
                 if st.button(f"💡 Hint", key=hint_key):
                     st.info(f"**Hint:** {question.get('hint', 'Think step by step!')}")
             
+            # Line-by-line working for equations the step solver can derive
+            solution_steps = csp_solver.get_solution_steps(question)
+            if solution_steps:
+                with st.expander("🪜 Work it step by step"):
+                    progress_key = f"step_progress_{answer_key}"
+                    current_step = st.session_state.get(progress_key, 0)
+                    for step in solution_steps[1:current_step + 1]:
+                        st.markdown(f"✔️ {step['description']}: `{step['state']}`")
+                    
+                    step_input = st.text_input(
+                        "Your next line of working:",
+                        key=f"step_input_{answer_key}",
+                        placeholder="e.g. 3x = 12"
+                    )
+                    
+                    step_col1, step_col2 = st.columns(2)
+                    with step_col1:
+                        if st.button("Check Step", key=f"check_step_{answer_key}"):
+                            if step_input.strip():
+                                result = csp_solver.check_solution_step(question, step_input.strip(), current_step)
+                                st.session_state[progress_key] = result['step']
+                                if result['valid']:
+                                    st.success(result['message'])
+                                else:
+                                    st.warning(result['message'])
+                            else:
+                                st.warning("Please enter a step before checking.")
+                    with step_col2:
+                        if st.button("Show Full Solution", key=f"show_steps_{answer_key}"):
+                            for number, step in enumerate(solution_steps, 1):
+                                st.markdown(f"**{number}. {step['description']}:** `{step['state']}`")
+            
             # Show previous result if already checked
             if question['question_id'] in practice_state['checked_questions']:
                 # Re-check to show persistent result
@@ -691,6 +758,7 @@ def main_dashboard():
     with col2:
         st.metric("Performance", f"{student.get('performance_score', 0)}%")
         st.metric("Exercises", len(student.get('completed_exercises', [])))
+    st.sidebar.metric("🔁 Reviews Due", review_scheduler.count_due(st.session_state.username))
     
     # Quick actions
     st.sidebar.markdown("---")
@@ -704,6 +772,11 @@ def main_dashboard():
             else:
                 st.sidebar.warning("Complete more lessons for better recommendations")
     
+    if is_teacher(st.session_state.username):
+        if st.sidebar.button("📈 Teacher Analytics", use_container_width=True):
+            st.session_state.current_page = "teacher"
+            st.rerun()
+    
     # FIXED LOGOUT BUTTON
     st.sidebar.markdown("---")
     st.sidebar.subheader("Account")
@@ -714,19 +787,25 @@ def main_dashboard():
         st.session_state.logged_in = False
         st.session_state.username = ""
         st.session_state.user_id = None
+        st.session_state.session_token = None
         st.session_state.current_page = "dashboard"
         st.session_state.current_lesson = None
         st.session_state.quiz_data = {}
         st.session_state.quiz_submitted = False
+        st.session_state.review_queue = None
+        st.session_state.review_current = None
+        st.session_state.review_result = None
         
         st.success("Logged out successfully!")
         st.rerun()
     
     # Main content tabs
-    tab1, tab2, tab3 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "🎯 Learning Path",  
         "📚 Curriculum", 
-        "🏆 Achievements"
+        "🏆 Achievements",
+        "🏅 Leaderboard",
+        "🔁 Reviews"
     ])
     
     with tab1:
@@ -737,6 +816,12 @@ def main_dashboard():
     
     with tab3:
         display_achievements(student)
+    
+    with tab4:
+        display_leaderboard(student)
+    
+    with tab5:
+        display_reviews(student)
 
 def display_learning_path(student):
     """Display personalized learning path with intelligent recommendations"""
@@ -775,7 +860,7 @@ def display_learning_path(student):
     st.success(f"🌟 Personalized path with {len(learning_path)} recommended lessons")
     
     for i, lesson_id in enumerate(learning_path, 1):
-        lesson = db.get_lesson(lesson_id)
+        lesson = db.get_lesson_metadata(lesson_id)
         if not lesson:
             continue
             
@@ -825,61 +910,85 @@ def display_learning_path(student):
     st.metric("Path Completion", f"{completion_rate:.1f}%")
     st.progress(completion_rate / 100)
 
+    # Full planned route to the next level
+    level_rule = db.get_rules_engine().rule(student['level'])
+    if level_rule and level_rule.next_level:
+        planned_route = csp_solver.plan_learning_path(st.session_state.username)
+        if planned_route:
+            st.markdown("### 🗺️ Fastest Route to Next Level")
+            total_minutes = csp_solver.planner.path_duration(planned_route)
+            st.write(f"**{len(planned_route)} lessons | ⏱️ {total_minutes} min total**")
+            for step, lesson_id in enumerate(planned_route, 1):
+                lesson = db.get_lesson_metadata(lesson_id)
+                if lesson:
+                    st.write(f"{step}. {lesson['title']} ({lesson['duration_minutes']} min)")
+
 def display_curriculum_browser(student):
     """Enhanced curriculum browser with CSP filtering"""
     st.header("📚 Algebra Curriculum")
     st.write("Browse lessons available to you based on your progress")
     
+    search_query = st.text_input(
+        "🔍 Search lessons and practice questions",
+        placeholder="e.g. quadratic, substitute, 2x + 1"
+    )
+    
     # Filters
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         level_filter = st.selectbox(
             "Filter by Level",
-            ["all", "beginner", "intermediate", "advanced"]
+            ["all"] + list(db.get_rules_engine().levels)
         )
     
     with col2:
         status_filter = st.selectbox(
             "Filter by Status",
-            ["all", "completed", "accessible", "locked"]
+            ["all", "completed", "accessible", "locked", "quiz_passed"],
+            format_func=lambda status: "quiz passed" if status == "quiz_passed" else status
         )
     
-    # Get accessible lessons based on CSP
-    accessible_lessons = csp_solver.get_accessible_lessons(st.session_state.username)
-    all_lessons = db.get_all_lessons()
-    
-    filtered_lessons = []
-    for lesson in all_lessons:
-        # Check accessibility
-        is_accessible = any(acc_lesson['lesson_id'] == lesson['lesson_id'] for acc_lesson in accessible_lessons)
-        is_completed = lesson['lesson_id'] in student.get('completed_lessons', [])
-        
-        # Level filter
-        if level_filter != "all" and lesson['level'] != level_filter:
-            continue
-        
-        # Status filter
-        if status_filter == "completed" and not is_completed:
-            continue
-        elif status_filter == "accessible" and (not is_accessible or is_completed):
-            continue
-        elif status_filter == "locked" and is_accessible:
-            continue
-        
-        # Add accessibility info
-        lesson['accessible'] = is_accessible
-        filtered_lessons.append(lesson)
+    with col3:
+        sort_options = ["relevance", "level", "title", "duration"] if search_query.strip() else ["level", "title", "duration"]
+        sort_order = st.selectbox("Sort by", sort_options)
+    
+    # Full-text search narrows the list to matching lessons
+    search_matches = {}
+    lesson_ids = None
+    if search_query.strip():
+        for hit in db.search_catalog(search_query, kinds=('lesson', 'practice'), limit=50):
+            search_matches.setdefault(hit['lesson_id'], []).append(hit)
+        lesson_ids = list(search_matches)
+    
+    # Keyset pagination: remember the cursor of every page visited, restart when filters change
+    browse_filters = (search_query.strip(), level_filter, status_filter, sort_order)
+    if st.session_state.get('browse_filters') != browse_filters:
+        st.session_state.browse_filters = browse_filters
+        st.session_state.browse_cursors = [None]
+    
+    page = db.browse_lessons(
+        st.session_state.username,
+        level=None if level_filter == "all" else level_filter,
+        status=None if status_filter == "all" else status_filter,
+        sort=sort_order,
+        after=st.session_state.browse_cursors[-1],
+        limit=BROWSE_PAGE_SIZE,
+        lesson_ids=lesson_ids
+    )
+    filtered_lessons = page['lessons']
     
     # Display lessons with accessibility status
     if not filtered_lessons:
         st.info("No lessons match your filters. Try adjusting your search criteria.")
         return
     
-    st.write(f"**Found {len(filtered_lessons)} lessons**")
+    page_number = len(st.session_state.browse_cursors)
+    first = (page_number - 1) * BROWSE_PAGE_SIZE + 1
+    st.write(f"**Found {page['total']} lessons** (showing {first}-{first + len(filtered_lessons) - 1})")
     
     for lesson in filtered_lessons:
-        completed = lesson['lesson_id'] in student.get('completed_lessons', [])
+        completed = lesson['completed']
         accessible = lesson['accessible']
         
         col1, col2, col3 = st.columns([3, 1, 1])
@@ -902,10 +1011,16 @@ def display_curriculum_browser(student):
             level_badge = f"**Level:** {lesson['level'].title()}"
             duration_badge = f"**Duration:** {lesson['duration_minutes']} min"
             
-            st.write(f"{level_badge} | {duration_badge} | **Status:** {status_text}")
+            quiz_badge = " | 🏅 Quiz passed" if lesson['quiz_passed'] else ""
+            
+            st.write(f"{level_badge} | {duration_badge} | **Status:** {status_text}{quiz_badge}")
             
             if not accessible and lesson.get('prerequisites'):
                 st.write("**Requires:** " + ", ".join(lesson['prerequisites']))
+            
+            for hit in search_matches.get(lesson['lesson_id'], [])[:3]:
+                source = "Lesson" if hit['kind'] == 'lesson' else "Practice"
+                st.caption(f"{source}: {hit['snippet']}")
         
         with col2:
             # Access information
@@ -932,17 +1047,36 @@ def display_curriculum_browser(student):
                 st.button("Locked", key=f"locked_{lesson['lesson_id']}", disabled=True)
         
         st.divider()
+    
+    # Page navigation
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if page_number > 1 and st.button("⬅️ Previous", key="browse_previous"):
+            st.session_state.browse_cursors.pop()
+            st.rerun()
+    with col2:
+        st.write(f"Page {page_number}")
+    with col3:
+        if page['next_cursor'] and st.button("Next ➡️", key="browse_next"):
+            st.session_state.browse_cursors.append(page['next_cursor'])
+            st.rerun()
 
 def display_achievements(student):
     """Display student achievements and progress analytics"""
     st.header("🏆 Your Learning Achievements")
     
+    # Cached totals, refreshed by the backend whenever progress is written
+    totals = db.get_progress_totals(st.session_state.username) or {
+        'total_lessons': 0, 'completed_lessons': 0, 'quizzes_passed': 0,
+        'quiz_attempts': 0, 'practice_count': 0, 'average_best_score': None
+    }
+    
     # Overall progress
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total_lessons = len(db.get_all_lessons())
-        completed_lessons = len(student.get('completed_lessons', []))
+        total_lessons = totals['total_lessons']
+        completed_lessons = totals['completed_lessons']
         completion_rate = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
         st.metric("Course Completion", f"{completion_rate:.1f}%")
     
@@ -953,20 +1087,7 @@ def display_achievements(student):
         performance = student.get('performance_score', 0)
         st.metric("Performance Score", f"{performance}%")
     
-    # Practice Questions Progress (Simplified - no JSON parsing)
-    practice_count = 0
-    practice_sessions = student.get('practice_sessions', {})
-    
-    # Handle both string and dict formats safely
-    if isinstance(practice_sessions, str):
-        # If it's a string, try to count questions from all lessons
-        # This is a fallback - ideally practice_sessions should be a dict
-        practice_count = len(student.get('completed_exercises', []))  # Fallback count
-    else:
-        # If it's already a dict, count questions normally
-        for lesson_id, session_data in practice_sessions.items():
-            if isinstance(session_data, dict):
-                practice_count += len(session_data.get('used_questions', []))
+    practice_count = totals['practice_count']
     
     # Show practice progress
     st.subheader("📊 Practice Progress")
@@ -1000,8 +1121,6 @@ def display_achievements(student):
     st.subheader("🎖️ Your Badges")
     
     badges = []
-    completed_lessons = len(student.get('completed_lessons', []))
-    performance = student.get('performance_score', 0)
     
     # Lesson-based badges
     if completed_lessons >= 1:
@@ -1039,6 +1158,218 @@ def display_achievements(student):
     else:
         st.info("Complete algebra lessons and practice questions to earn badges!")
 
+def display_leaderboard(student):
+    """Class rankings and cohort percentiles"""
+    st.header("🏅 Class Leaderboard")
+    
+    metric_labels = {
+        'performance': "Performance Score",
+        'lessons': "Lessons Completed",
+        'pass_rate': "Quiz Pass Rate"
+    }
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        metric = st.selectbox("Rank by", list(metric_labels), format_func=metric_labels.get)
+    with col2:
+        cohort = st.selectbox("Compare with", ["all", student['level']],
+                              format_func=lambda c: "Everyone" if c == "all" else f"{c.title()} students")
+    level = None if cohort == "all" else cohort
+    
+    def format_value(value):
+        if value is None:
+            return "-"
+        return f"{value * 100:.0f}%" if metric == 'pass_rate' else f"{value:g}"
+    
+    # Your standing
+    standing = leaderboard.rank(st.session_state.username, metric, level)
+    if standing:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Your Rank", f"#{standing['rank']} of {standing['total']}")
+        with col2:
+            st.metric(metric_labels[metric], format_value(standing['value']))
+        with col3:
+            st.metric("Ahead Of", f"{standing['percentile']:.0f}% of students")
+    elif metric == 'pass_rate':
+        st.info("Take a quiz to appear on the pass rate leaderboard!")
+    
+    # Cohort distribution
+    percentiles = leaderboard.percentiles(metric, level)
+    if percentiles:
+        st.subheader("📊 Cohort Percentiles")
+        cols = st.columns(len(percentiles))
+        for col, (point, value) in zip(cols, percentiles.items()):
+            with col:
+                st.metric(f"{point}th percentile", format_value(value))
+    
+    # Top students, one keyset page at a time
+    st.subheader("🥇 Top Students")
+    board_key = (metric, level)
+    if st.session_state.get('leaderboard_key') != board_key:
+        st.session_state.leaderboard_key = board_key
+        st.session_state.leaderboard_cursors = [None]
+    
+    page = leaderboard.top(metric, level, after=st.session_state.leaderboard_cursors[-1], limit=10)
+    offset = (len(st.session_state.leaderboard_cursors) - 1) * 10
+    column = {'performance': 'performance_score', 'lessons': 'lessons_completed', 'pass_rate': 'pass_rate'}[metric]
+    rows = [{
+        "Position": offset + i,
+        "Student": entry['name'] + (" (you)" if entry['username'] == st.session_state.username else ""),
+        "Level": (entry['level'] or "").title(),
+        metric_labels[metric]: format_value(entry[column])
+    } for i, entry in enumerate(page['entries'], 1)]
+    
+    if rows:
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    else:
+        st.info("No students on this leaderboard yet.")
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if len(st.session_state.leaderboard_cursors) > 1 and st.button("⬅️ Previous", key="leaderboard_previous"):
+            st.session_state.leaderboard_cursors.pop()
+            st.rerun()
+    with col3:
+        if page['next_cursor'] and st.button("Next ➡️", key="leaderboard_next"):
+            st.session_state.leaderboard_cursors.append(page['next_cursor'])
+            st.rerun()
+
+def display_reviews(student):
+    """Spaced-repetition review queue for completed lessons"""
+    st.header("🔁 Review Queue")
+    st.write("Questions from lessons you've completed come back just before you'd forget them")
+    
+    username = st.session_state.username
+    forecast = review_scheduler.forecast(username, days=7)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Due Now", review_scheduler.count_due(username))
+    with col2:
+        st.metric("Due This Week", sum(count for _, count in forecast))
+    
+    if any(count for _, count in forecast):
+        st.bar_chart(pd.DataFrame(forecast, columns=['Day', 'Reviews']).set_index('Day'))
+    
+    # The session works through a heap of due items, reloaded only when it runs dry
+    queue = st.session_state.review_queue
+    if queue is None or (st.session_state.review_current is None and not queue.due_count()):
+        queue = st.session_state.review_queue = review_scheduler.queue(username)
+    if st.session_state.review_current is None:
+        st.session_state.review_current = queue.pop_due()
+    
+    question_id = st.session_state.review_current
+    item = review_scheduler.get_item(username, question_id) if question_id else None
+    if not item:
+        st.session_state.review_current = None
+        st.success("🎉 You're all caught up! Complete more lessons to add questions to your reviews.")
+        return
+    
+    st.markdown("---")
+    st.subheader(f"📝 {item['question']}")
+    st.caption(f"From {item['lesson_id']} • {item['repetitions']} successful reviews in a row")
+    
+    result = st.session_state.review_result
+    if result is None:
+        user_answer = st.text_input("Your answer:", key=f"review_answer_{question_id}")
+        show_hint = st.checkbox("💡 Show hint", key=f"review_hint_{question_id}")
+        if show_hint and item['hint']:
+            st.info(item['hint'])
+        
+        if st.button("Check Answer", key=f"review_check_{question_id}") and user_answer.strip():
+            is_correct, feedback = csp_solver.check_exercise_answer(
+                item, user_answer.strip(), rng=student_rng(username, f"review:{question_id}")
+            )
+            schedule = review_scheduler.record_review(username, question_id, answer_quality(is_correct, show_hint))
+            item_selector.record_attempts(username, item['lesson_id'], 'practice', [(question_id, is_correct)])
+            st.session_state.review_result = (is_correct, feedback, schedule['due_at'] if schedule else None)
+            st.rerun()
+    else:
+        is_correct, feedback, due_at = result
+        if is_correct:
+            st.success(feedback)
+        else:
+            st.error(feedback)
+        if due_at:
+            st.caption(f"Next review: {due_at[:10]}")
+        
+        if st.button("➡️ Next Review", key=f"review_next_{question_id}"):
+            if due_at:
+                queue.push(due_at, question_id)
+            st.session_state.review_current = None
+            st.session_state.review_result = None
+            st.rerun()
+
+def display_teacher_analytics():
+    """Class-wide analytics computed from the columnar snapshot"""
+    st.title("📈 Teacher Analytics")
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        level = st.selectbox("Students", ["all"] + list(db.get_rules_engine().levels),
+                             format_func=lambda l: "All levels" if l == "all" else l.title())
+    level = None if level == "all" else level
+    with col2:
+        if st.button("🔄 Refresh Snapshot", use_container_width=True):
+            with st.spinner("Exporting snapshot..."):
+                teacher_analytics.refresh()
+    with col3:
+        if st.button("← Back to Dashboard", use_container_width=True):
+            st.session_state.current_page = "dashboard"
+            st.rerun()
+    
+    pass_rates = teacher_analytics.lesson_pass_rates(level)
+    snapshot_time = teacher_analytics.snapshot_time()
+    if snapshot_time:
+        st.caption(f"Snapshot taken {datetime.fromtimestamp(snapshot_time).strftime('%Y-%m-%d %H:%M')}")
+    
+    if pass_rates.empty:
+        st.info("No quiz results yet. Analytics appear once students start taking quizzes.")
+        return
+    
+    # Pass rate per lesson
+    st.subheader("✅ Pass Rate by Lesson")
+    pass_rates['pass_percent'] = pass_rates['pass_rate'] * 100
+    fig = px.bar(pass_rates, x='lesson_id', y='pass_percent', hover_name='title',
+                 hover_data={'attempts': True, 'mean_score_percent': ':.0f'},
+                 labels={'lesson_id': "Lesson", 'pass_percent': "Pass Rate (%)"})
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Score distribution
+    st.subheader("📊 Quiz Score Distribution")
+    scores = teacher_analytics.score_distribution(level)
+    fig = px.histogram(scores, x='score_percent', nbins=10, range_x=[0, 100],
+                       labels={'score_percent': "Score (%)"})
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Time to mastery
+    st.subheader("⏱️ Time to Mastery")
+    mastery = teacher_analytics.time_to_mastery(level)
+    if mastery.empty:
+        st.info("No student has passed a quiz yet.")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Median Hours to Pass", f"{mastery['hours_to_mastery'].median():.1f}")
+        with col2:
+            st.metric("Median Attempts to Pass", f"{mastery['attempts_to_pass'].median():.0f}")
+        fig = px.box(mastery, x='lesson_id', y='attempts_to_pass', hover_name='title',
+                     labels={'lesson_id': "Lesson", 'attempts_to_pass': "Attempts to Pass"})
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Hardest questions
+    st.subheader("🧩 Hardest Questions")
+    difficulty = teacher_analytics.question_difficulty()
+    if difficulty.empty:
+        st.info("Not enough question attempts yet.")
+    else:
+        difficulty['correct_rate'] = (difficulty['correct_rate'] * 100).round(0)
+        st.dataframe(difficulty.rename(columns={
+            'question_id': "Question", 'question_type': "Type", 'lesson_id': "Lesson",
+            'attempts': "Attempts", 'correct_rate': "Correct (%)"
+        }), hide_index=True, use_container_width=True)
+
 def main():
     """Main application entry point"""
     st.set_page_config(
@@ -1067,6 +1398,14 @@ def main():
     
     init_session_state()
     
+    # Reruns trust the signed session token instead of re-checking the password
+    if st.session_state.logged_in and session_tokens.verify(st.session_state.session_token) != st.session_state.username:
+        st.session_state.logged_in = False
+        st.session_state.username = ""
+        st.session_state.user_id = None
+        st.session_state.session_token = None
+        st.warning("Your session has expired. Please log in again.")
+    
     # Application routing
     if not st.session_state.logged_in:
         login_page()
@@ -1075,6 +1414,8 @@ def main():
             display_quiz_interface(st.session_state.current_lesson)
         elif st.session_state.current_page == "lesson" and st.session_state.current_lesson:
             display_lesson_interface(st.session_state.current_lesson)
+        elif st.session_state.current_page == "teacher" and is_teacher(st.session_state.username):
+            display_teacher_analytics()
         else:
             main_dashboard()
 
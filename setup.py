@@ -1,5 +1,7 @@
+from backend.curriculum import describe_problems, describe_warnings
 from backend.database import SQLiteManager
 import os
+import sqlite3
 
 def setup_system():
     """Setup with comprehensive question pools"""
@@ -8,30 +10,22 @@ def setup_system():
     print("🎓 Algebra ITS - Complete Question Pool System")
     print("=" * 55)
     
-    # Check questions per lesson
-    lessons = db.get_all_lessons()
-    practice_stats = {}
-    quiz_stats = {}
-    
-    for lesson in lessons:
-        all_practice = db.get_all_practice_questions(lesson['lesson_id'])
-        practice_stats[lesson['lesson_id']] = len(all_practice)
-        
-        all_quiz = db.get_all_quiz_questions(lesson['lesson_id'])
-        quiz_stats[lesson['lesson_id']] = len(all_quiz)
+    # Pool sizes for every lesson in a few aggregate queries
+    stats = db.get_catalog_stats()
+    lessons = stats['lessons']
     
     print("\n📊 Complete Question Pool Statistics:")
     print(f"{'Lesson':<15} {'Practice Qs':<12} {'Quiz Qs':<10} {'Total':<8}")
     print("-" * 50)
-    for lesson_id in practice_stats:
-        practice_count = practice_stats[lesson_id]
-        quiz_count = quiz_stats[lesson_id]
+    for lesson in lessons:
+        practice_count = lesson['practice']
+        quiz_count = lesson['quiz']
         total = practice_count + quiz_count
         status = "✅" if practice_count >= 20 and quiz_count >= 20 else "⚠️"
-        print(f"{status} {lesson_id:<13} {practice_count:<11} {quiz_count:<9} {total:<7}")
+        print(f"{status} {lesson['lesson_id']:<13} {practice_count:<11} {quiz_count:<9} {total:<7}")
     
-    total_practice = sum(practice_stats.values())
-    total_quiz = sum(quiz_stats.values())
+    total_practice = stats['totals']['practice']
+    total_quiz = stats['totals']['quiz']
     grand_total = total_practice + total_quiz
     
     print(f"{'TOTAL':<15} {total_practice:<11} {total_quiz:<9} {grand_total:<7}")
@@ -40,7 +34,8 @@ def setup_system():
     print(f"   - Practice questions: {total_practice} total")
     print(f"   - Quiz questions: {total_quiz} total")
     print(f"   - Grand total: {grand_total} questions")
-    print(f"   - Average per lesson: {total_practice//len(lessons)} practice + {total_quiz//len(lessons)} quiz")
+    if lessons:
+        print(f"   - Average per lesson: {total_practice//len(lessons)} practice + {total_quiz//len(lessons)} quiz")
 
 def reset_database():
     """Completely reset the database and recreate all tables with fresh data"""
@@ -48,14 +43,22 @@ def reset_database():
     
     # Close any existing connections first
     try:
-        import sqlite3
         conn = sqlite3.connect(db_path)
         conn.close()
     except:
         pass
     
-    # Remove the database file if it exists
+    # Remove the database file if it exists, keeping a backup of it first
     if os.path.exists(db_path):
+        from backend.backup import BackupManager
+        try:
+            # By path, with plain sqlite3: a corrupt or outdated file must not run SQLiteManager's migrations
+            BackupManager(db_path).backup(label='pre-reset')
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️  Could not back up the old database: {e}")
+            if input("Reset without a backup? (y/N): ").strip().lower() != 'y':
+                print("❌ Reset cancelled")
+                return
         os.remove(db_path)
         print("🗑️  Old database removed")
     else:
@@ -81,47 +84,48 @@ def check_system_health():
     
     issues = []
     
+    try:
+        stats = db.get_catalog_stats()
+    except Exception as e:
+        print("\n🚨 Issues Found (1):")
+        print(f"   ❌ Database connection error: {e}")
+        print("\n💡 Run the reset function to fix these issues.")
+        return
+    
     # Check lessons
-    lessons = db.get_all_lessons()
+    lessons = stats['lessons']
     if len(lessons) == 0:
         issues.append("❌ No lessons found in database")
     else:
         print(f"✅ Lessons: {len(lessons)} loaded")
     
-    practice_total = 0
     for lesson in lessons:
-        practice_count = len(db.get_all_practice_questions(lesson['lesson_id']))
-        practice_total += practice_count
-        if practice_count == 0:
+        if lesson['practice'] == 0:
             issues.append(f"❌ No practice questions for {lesson['lesson_id']}")
     
-    if practice_total > 0:
-        print(f"✅ Practice Questions: {practice_total} total")
-    
-    quiz_total = 0
-    for lesson in lessons:
-        quiz_count = len(db.get_all_quiz_questions(lesson['lesson_id']))
-        quiz_total += quiz_count
+    if stats['totals']['practice'] > 0:
+        print(f"✅ Practice Questions: {stats['totals']['practice']} total")
     
-    if quiz_total > 0:
-        print(f"✅ Quiz Questions: {quiz_total} total")
+    if stats['totals']['quiz'] > 0:
+        print(f"✅ Quiz Questions: {stats['totals']['quiz']} total")
     
     # Check tables
-    try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        required_tables = ['students', 'lessons', 'practice_questions', 'quiz_questions', 'chats', 'quiz_results']
-        for table in required_tables:
-            cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
-            if not cursor.fetchone():
-                issues.append(f"❌ Missing table: {table}")
-        
-        conn.close()
+    for table in stats['missing_tables']:
+        issues.append(f"❌ Missing table: {table}")
+    if not stats['missing_tables']:
         print("✅ Database tables: All present")
-        
-    except Exception as e:
-        issues.append(f"❌ Database connection error: {e}")
+    
+    # Check catalog integrity
+    for kind, question_id, lesson_id in stats['orphan_questions']:
+        issues.append(f"❌ {kind.title()} question {question_id} belongs to missing lesson {lesson_id}")
+    # Same split as validate_curriculum: errors are issues, level inversions only warnings
+    curriculum = stats['curriculum']
+    for problem in describe_problems(curriculum):
+        issues.append(f"❌ {problem}")
+    for warning in describe_warnings(curriculum):
+        print(f"⚠️  {warning}")
+    if curriculum['valid']:
+        print("✅ Curriculum: prerequisite graph is a valid DAG")
     
     # Report issues
     if issues:
@@ -132,15 +136,162 @@ def check_system_health():
     else:
         print(f"\n🎉 System is healthy! All components are ready.")
 
+def run_analytics_etl():
+    """Copy new quiz results and question attempts into the analytics database"""
+    from backend.etl import TAILED_SOURCES, QuizResultsETL
+    
+    db = SQLiteManager()
+    etl = QuizResultsETL(db)
+    
+    print("📥 Analytics ETL")
+    print("=" * 30)
+    
+    loaded = etl.run_once()
+    print(f"✅ Loaded {loaded} new rows into {etl.analytics_path}")
+    for source in TAILED_SOURCES:
+        checkpoint = etl.get_checkpoint(source)
+        print(f"   - {source}: high-water mark id = {checkpoint['high_water_mark']}, "
+              f"{checkpoint['rows_loaded']} rows loaded")
+    
+    report = etl.get_lesson_report()
+    if report:
+        print("\n📊 Quiz results by lesson (from the analytics database):")
+        for row in report:
+            print(f"   - {row['lesson_id']}: {row['attempts']} attempts by {row['students']} students, "
+                  f"{row['pass_rate'] * 100:.0f}% passed, mean score {row['mean_score_percent'] or 0:.1f}%")
+
+def import_student_roster(path):
+    """Create student accounts from a CSV or JSONL roster"""
+    from backend.roster import RosterImporter
+    
+    db = SQLiteManager()
+    
+    print("👥 Roster Import")
+    print("=" * 30)
+    
+    if not os.path.exists(path):
+        print(f"❌ File not found: {path}")
+        return
+    
+    report = RosterImporter(db).import_file(path)
+    print(f"✅ Imported {report['imported']} students in {report['seconds']:.1f}s")
+    
+    if report['conflicts']:
+        print(f"\n⚠️  Skipped {len(report['conflicts'])} conflicting rows:")
+        for line, username, reason in report['conflicts'][:20]:
+            print(f"   line {line}: {username} - {reason}")
+    if report['invalid']:
+        print(f"\n❌ Rejected {len(report['invalid'])} invalid rows:")
+        for line, reason in report['invalid'][:20]:
+            print(f"   line {line}: {reason}")
+
+def backup_database():
+    """Take an online, compressed backup of the live database"""
+    from backend.backup import BackupManager
+    
+    backups = BackupManager(SQLiteManager())
+    
+    print("💾 Database Backup")
+    print("=" * 30)
+    
+    result = backups.backup()
+    print(f"✅ Copied {result['pages']} pages ({result['restarts']} restarts due to concurrent writes)")
+    removed = backups.prune()
+    if removed:
+        print(f"🗑️  Removed {removed} old backups")
+
+def restore_database():
+    """Restore the live database from one of its backups"""
+    from backend.backup import BackupManager
+    
+    backups = BackupManager(SQLiteManager())
+    available = backups.list_backups()
+    
+    print("♻️  Database Restore")
+    print("=" * 30)
+    
+    if not available:
+        print(f"❌ No backups found in {backups.backup_dir}")
+        return
+    for i, backup in enumerate(available, 1):
+        print(f"{i}. {backup['name']} ({backup['bytes'] // 1024} KB)")
+    
+    choice = input(f"\nRestore which backup? (1-{len(available)}, Enter to cancel): ").strip()
+    if not choice.isdigit() or not 1 <= int(choice) <= len(available):
+        print("❌ Restore cancelled.")
+        return
+    backups.restore(available[int(choice) - 1]['path'])
+    print("✅ Restore complete! The replaced database was backed up first.")
+
+def rebuild_progress_projections():
+    """Replay the progress event log and apply promotions the current rules grant"""
+    from backend.events import ProgressProjector
+    
+    projector = ProgressProjector(SQLiteManager())
+    
+    print("🔁 Progress Projection Rebuild")
+    print("=" * 30)
+    
+    result = projector.rebuild()
+    resumed = " (resumed from checkpoint)" if result['resumed'] else ""
+    print(f"✅ Replayed {result['events']} events for {result['students']} students in {result['seconds']:.1f}s{resumed}")
+    
+    changes = projector.level_changes()
+    if not changes:
+        print("📊 Every student's level already matches the progression rules")
+        return
+    print(f"\n⚠️  {len(changes)} students would be promoted under the current rules:")
+    for username, level, projected in changes[:20]:
+        print(f"   {username}: {level} -> {projected}")
+    confirm = input("\nApply the promotions? (y/N): ").strip().lower()
+    if confirm == 'y' or confirm == 'yes':
+        print(f"✅ Promoted {projector.apply_levels()} students")
+    else:
+        print("❌ Levels left unchanged.")
+
+def reevaluate_student_levels():
+    """Promote every student the current level rules say has earned it"""
+    db = SQLiteManager()
+    
+    print("📐 Level Re-evaluation")
+    print("=" * 30)
+    
+    for rule in db.get_level_rules():
+        if rule['next_level']:
+            required = f", lessons {', '.join(rule['required_lessons'])}" if rule['required_lessons'] else ""
+            print(f"   {rule['level']} -> {rule['next_level']}: {rule['min_lessons']} lessons, "
+                  f"{rule['min_score']}% score{required}")
+    
+    promoted = db.reevaluate_levels()
+    print(f"\n✅ {promoted} promotions applied")
+
+def run_review_rescheduling():
+    """Daily job: reset spaced-repetition reviews left overdue for too long"""
+    from backend.review import ReviewScheduler
+    
+    print("🔁 Review Rescheduling")
+    print("=" * 30)
+    
+    result = ReviewScheduler(SQLiteManager()).reschedule_all()
+    print(f"✅ Checked {result['items']} review items in {result['seconds']:.1f}s")
+    print(f"   - Reset as forgotten: {result['lapsed']}")
+
 if __name__ == "__main__":
     print("🎓 Algebra ITS - Setup & Maintenance")
     print("=" * 40)
     print("1. Setup system (normal verification)")
-    print("2. Reset database (delete and recreate)")
+    print("2. Reset database (back up, delete and recreate)")
     print("3. Check system health")
     print("4. Quick setup verification")
+    print("5. Run analytics ETL (load new quiz results)")
+    print("6. Import student roster (CSV or JSONL)")
+    print("7. Back up database")
+    print("8. Restore database from backup")
+    print("9. Rebuild progress projections from the event log")
+    print("10. Re-evaluate student levels against the level rules")
+    print("11. Run daily review rescheduling")
     
-    choice = input("\nEnter choice (1-4): ").strip()
+    choice = input("\nEnter choice (1-11): ").strip()
     
     if choice == "2":
         confirm = input("⚠️  Are you sure you want to reset the database? This will delete ALL data! (y/N): ").strip().lower()
@@ -152,5 +303,19 @@ if __name__ == "__main__":
         check_system_health()
     elif choice == "4":
         setup_system()
+    elif choice == "5":
+        run_analytics_etl()
+    elif choice == "6":
+        import_student_roster(input("Roster file path: ").strip())
+    elif choice == "7":
+        backup_database()
+    elif choice == "8":
+        restore_database()
+    elif choice == "9":
+        rebuild_progress_projections()
+    elif choice == "10":
+        reevaluate_student_levels()
+    elif choice == "11":
+        run_review_rescheduling()
     else:
         setup_system()
\ No newline at end of file